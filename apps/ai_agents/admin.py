@@ -4,8 +4,9 @@ from .models import RoastRequest
 
 @admin.register(RoastRequest)
 class RoastRequestAdmin(admin.ModelAdmin):
-    list_display = ("url", "ip_address", "was_successful", "created_at")
-    list_filter = ("was_successful", "created_at")
+    list_display = ("url", "ip_address", "status", "attempts", "was_successful", "created_at")
+    list_filter = ("status", "was_successful", "created_at")
     search_fields = ("url", "ip_address")
-    readonly_fields = ("id", "created_at")
+    readonly_fields = ("id", "created_at", "url_key", "page_fingerprint", "attempts", "locked_until", "last_error")
+    exclude = ("result_compressed",)
     ordering = ("-created_at",)
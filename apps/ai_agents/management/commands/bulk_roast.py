@@ -0,0 +1,197 @@
+import csv
+import sys
+import threading
+import time
+from collections import Counter, deque
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import URLValidator
+from django.db import close_old_connections
+
+from apps.ai_agents.models import RoastRequest
+from apps.ai_agents.utils import roast_cache, roast_jobs
+
+URL_COLUMNS = ("url", "website", "site", "domain")
+LLM_SHARE = 0.5  # Of the groq per_minute budget — the rest stays free for live chat and roasts
+
+
+def _host(url: str) -> str:
+    return (urlsplit(url).hostname or "").removeprefix("www.")
+
+
+class _Pacer:
+    """Spaces Groq calls at least 60/per_minute seconds apart across all threads."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        time.sleep(slot - now)  # Outside the lock, so later callers can book the slots after this one
+
+
+class _HostScheduler:
+    """
+    Hands out URLs so no host has more than `per_host` roasts in flight. A
+    thread only waits when every pending URL is on a busy host.
+    """
+
+    def __init__(self, urls, per_host: int):
+        self._pending = deque(urls)
+        self._busy = Counter()
+        self._per_host = per_host
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def take(self):
+        with self._cond:
+            while not self._stopped and self._pending:
+                for index, url in enumerate(self._pending):
+                    if self._busy[_host(url)] < self._per_host:
+                        del self._pending[index]
+                        self._busy[_host(url)] += 1
+                        return url
+                self._cond.wait()
+            return None
+
+    def done(self, url: str):
+        with self._cond:
+            self._busy[_host(url)] -= 1
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Roast a list of prospect sites (CSV with a url/website column, or one URL per line). "
+        "Scrapes run concurrently with per-host limits; Groq calls are paced to the upstream quota."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="CSV or text file of URLs, or - for stdin")
+        parser.add_argument("--concurrency", type=int, default=8, help="Roasts in flight at once")
+        parser.add_argument("--per-host", type=int, default=1, help="Roasts in flight per host")
+        parser.add_argument(
+            "--llm-per-minute", type=float, default=None,
+            help=f"Groq calls per minute (default: {LLM_SHARE:.0%}% of the groq per_minute budget in UPSTREAM_QUOTAS)",
+        )
+        parser.add_argument("--ip", default="127.0.0.1", help="ip_address recorded on the RoastRequest rows")
+        parser.add_argument("--dry-run", action="store_true", help="Only list the URLs that would be roasted")
+
+    def handle(self, *args, **options):
+        urls, invalid, duplicates = self._read(options["source"])
+        self.stdout.write(f"{len(urls)} unique URLs ({invalid} invalid, {duplicates} duplicates after canonicalizing)")
+        if options["dry_run"] or not urls:
+            for url in urls:
+                self.stdout.write(f"  {url}")
+            return
+
+        per_minute = options["llm_per_minute"]
+        if not per_minute:
+            budget = settings.UPSTREAM_QUOTAS.get("groq", {}).get("per_minute")
+            per_minute = budget * LLM_SHARE if budget else None
+        self._pacer = _Pacer(per_minute)
+        self._scheduler = _HostScheduler(urls, max(1, options["per_host"]))
+        self._ip = options["ip"]
+        self._total = len(urls)
+        self._outcomes = Counter()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+        threads = [
+            threading.Thread(target=self._work, name=f"bulk-roast-{n}")
+            for n in range(max(1, min(options["concurrency"], len(urls))))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stderr.write("Stopping — waiting for the roasts in flight…")
+            self._scheduler.stop()
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.monotonic() - self._started
+        finished = sum(self._outcomes.values())
+        self.stdout.write(
+            f"\n{finished}/{self._total} in {elapsed:.0f}s ({finished / elapsed * 60:.1f}/min): "
+            + ", ".join(f"{n} {status}" for status, n in sorted(self._outcomes.items()))
+        )
+        if self._outcomes[RoastRequest.QUEUED]:
+            self.stdout.write("Queued jobs hit a transient error — `manage.py roast_worker` will retry them.")
+
+    def _read(self, source: str) -> tuple:
+        try:
+            handle = sys.stdin if source == "-" else open(source, newline="", encoding="utf-8-sig")
+        except OSError as e:
+            raise CommandError(f"Can't read {source}: {e}") from e
+        with handle:
+            rows = [row for row in csv.reader(handle) if row and row[0].strip() and not row[0].startswith("#")]
+
+        column = 0
+        header = [cell.strip().lower() for cell in rows[0]] if rows else []
+        named = [name for name in URL_COLUMNS if name in header]
+        if named:
+            column = header.index(named[0])
+            rows = rows[1:]
+
+        validate = URLValidator(schemes=["http", "https"])
+        urls, seen, invalid, duplicates = [], set(), 0, 0
+        for row in rows:
+            url = row[column].strip() if len(row) > column else ""
+            if url and "://" not in url:
+                url = f"https://{url}"
+            try:
+                validate(url)
+            except ValidationError:
+                invalid += 1
+                continue
+            key = roast_cache.url_key(url)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            urls.append(url)
+        return urls, invalid, duplicates
+
+    def _work(self):
+        try:
+            while (url := self._scheduler.take()) is not None:
+                close_old_connections()
+                started = time.monotonic()
+                job = roast_jobs.claimed_job(url, self._ip, roast_cache.url_key(url))
+                try:
+                    job.save()
+                    roast_jobs.process(job, before_llm=self._pacer.wait)
+                finally:
+                    self._scheduler.done(url)
+                self._report(job, time.monotonic() - started)
+        finally:
+            close_old_connections()
+
+    def _report(self, job, seconds: float):
+        with self._lock:
+            self._outcomes[job.status] += 1
+            finished = sum(self._outcomes.values())
+            rate = finished / (time.monotonic() - self._started)
+            eta = (self._total - finished) / rate if rate else 0
+            detail = f" — {job.failure}" if job.status != RoastRequest.DONE else ""
+            self.stdout.write(
+                f"[{finished:>{len(str(self._total))}}/{self._total}] {job.status:<7} {job.url}  "
+                f"{seconds:.1f}s{detail}  (ETA {eta / 60:.0f}m)"
+            )
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_agents.utils import (
+    chat_sessions, circuit_breaker, http_cache, intent_router, llm_client, metrics, prompt_budget, quota, rate_limit,
+    response_cache, roast_cache, roast_jobs,
+)
+from apps.widgets.utils import weather_cache
+
+
+class Command(BaseCommand):
+    help = "Print upstream quota usage, cache hit rates, breaker state, token usage and chat latency as JSON for capacity planning."
+
+    def handle(self, *args, **options):
+        report = {
+            "quota": quota.usage_report(),
+            "weather_cache": weather_cache.stats(),
+            "circuit_breakers": circuit_breaker.report(),
+            "rate_limits": rate_limit.stats(),
+            "llm_models": llm_client.stats(),
+            "chat_cache": response_cache.stats(),
+            "chat_sessions": chat_sessions.stats(),
+            "intent_router": intent_router.stats(),
+            "roast_cache": roast_cache.stats(),
+            "scraper_cache": http_cache.stats(),
+            "roast_jobs": roast_jobs.stats(),
+            "tokens": prompt_budget.stats(),
+            "chat_latency": {
+                "time_to_first_token": metrics.histogram("chat.ttft"),
+                "total": metrics.histogram("chat.total"),
+            },
+        }
+        self.stdout.write(json.dumps(report, indent=2, default=str))
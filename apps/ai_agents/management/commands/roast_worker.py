@@ -0,0 +1,55 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.ai_agents.utils import roast_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued website roasts (RoastRequest jobs) — keep one or more of these next to the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Jobs processed in parallel (threads)")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the queue, then exit")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())  # Finish in-flight jobs, claim nothing new
+
+        threads = [
+            threading.Thread(target=self._loop, args=(stop, options["poll"], options["once"]), name=f"roast-{n}")
+            for n in range(max(1, options["concurrency"]))
+        ]
+        self.stdout.write(
+            f"roast_worker: {len(threads)} thread(s), visibility {roast_jobs.visibility()}s, "
+            f"max {settings.ROAST_JOB_MAX_ATTEMPTS} attempts"
+        )
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)  # Short joins keep the main thread responsive to signals
+        self.stdout.write("roast_worker: stopped")
+
+    def _loop(self, stop, poll, once):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                job = roast_jobs.claim()
+                if job is None:
+                    if once:
+                        break
+                    roast_jobs.expire_abandoned()
+                    stop.wait(poll)
+                    continue
+                roast_jobs.process(job)
+                self.stdout.write(
+                    f"[{threading.current_thread().name}] {job.url} → {job.status} (attempt {job.attempts})"
+                )
+        finally:
+            close_old_connections()
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_agents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roastrequest',
+            name='page_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='result_compressed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='url_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:35
+
+from django.db import migrations, models
+
+
+def settle_existing_rows(apps, schema_editor):
+    """Rows from before the queue already ran inline — don't let a worker pick them up."""
+    RoastRequest = apps.get_model("ai_agents", "RoastRequest")
+    RoastRequest.objects.filter(was_successful=True).update(status="done")
+    RoastRequest.objects.filter(was_successful=False).update(status="failed", failure="unreachable")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_agents', '0002_roast_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roastrequest',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='failure',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='locked_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roastrequest',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='roastrequest',
+            index=models.Index(fields=['status', 'locked_until'], name='roast_job_claim_idx'),
+        ),
+        migrations.RunPython(settle_existing_rows, migrations.RunPython.noop),
+    ]
@@ -4,16 +4,46 @@ from django.utils import timezone
 
 
 class RoastRequest(models.Model):
-    """Tracks website roast requests for rate-limiting and audit."""
+    """Tracks website roast requests for rate-limiting and audit; doubles as the roast job queue."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     url = models.URLField(max_length=2000)
     ip_address = models.GenericIPAddressField()
     created_at = models.DateTimeField(default=timezone.now)
     was_successful = models.BooleanField(default=False)
     result_preview = models.TextField(blank=True, default="")
+    # Roast cache (see utils/roast_cache.py): sha256 of the canonical URL, fingerprint
+    # of the scraped page, and the full critique HTML zlib-compressed
+    url_key = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    page_fingerprint = models.CharField(max_length=64, blank=True, default="")
+    result_compressed = models.BinaryField(null=True, blank=True)
+    # Job queue (see utils/roast_jobs.py): a running job whose locked_until has
+    # passed is claimable again, up to ROAST_JOB_MAX_ATTEMPTS
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    failure = models.CharField(max_length=20, blank=True, default="")  # Which message the visitor sees
+    last_error = models.TextField(blank=True, default="")
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "locked_until"], name="roast_job_claim_idx")]
 
     def __str__(self):
         return f"Roast: {self.url} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
+class RateLimitCounter(models.Model):
+    """One fixed window of a rate-limit counter — only used with RATE_LIMIT_STORAGE='db'."""
+    key = models.CharField(max_length=200)  # "<scope>:<client ip>"
+    window = models.BigIntegerField()  # Unix time // period
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["key", "window"], name="ratelimit_key_window_uniq")]
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.count}"
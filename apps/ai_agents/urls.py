@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = "ai_agents"
 
+# Under ASGI (AI_ASYNC_VIEWS) the LLM/scrape round trips await instead of holding a thread
 urlpatterns = [
-    path("chat/", views.chat_view, name="chat"),
-    path("roast/", views.roast_view, name="roast"),
+    path("chat/", views.achat_view if settings.AI_ASYNC_VIEWS else views.chat_view, name="chat"),
+    path("roast/", views.aroast_view if settings.AI_ASYNC_VIEWS else views.roast_view, name="roast"),
+    path("roast/<uuid:job_id>/", views.roast_status, name="roast_status"),
 ]
@@ -0,0 +1,24 @@
+"""
+Helpers for the async (ASGI) code paths.
+
+httpx.AsyncClient and AsyncGroq pool connections on the event loop that
+created them, so shared clients are kept per running loop:
+
+    get_client = loop_local(lambda: httpx.AsyncClient())
+    resp = await get_client().get(url)
+"""
+import asyncio
+import weakref
+
+
+def loop_local(factory):
+    """Return a getter that builds one factory() instance per running event loop."""
+    instances = weakref.WeakKeyDictionary()
+
+    def get():
+        loop = asyncio.get_running_loop()
+        if loop not in instances:
+            instances[loop] = factory()
+        return instances[loop]
+
+    return get
@@ -0,0 +1,120 @@
+"""
+Sales Director conversations kept server-side, so the widget only sends the new message.
+
+A conversation is one entry in the default cache (Redis in production),
+keyed chat_session:<id> and stored as compact JSON: a rolling summary plus
+the most recent turns. Every write renews CHAT_SESSION_TTL.
+
+The stored turns never exceed CHAT_HISTORY_TOKENS, so the whole tail is
+always sent to Groq. Exchanges that push it over are folded, oldest first,
+into the summary as one short line each ("Visitor: … / You: …"), and the
+summary keeps only its newest CHAT_SUMMARY_CHARS. Summaries are extractive
+and built locally, so compacting never spends Groq quota. The prompt stays
+bounded however long the conversation runs:
+
+    system prompt + summary (≤ CHAT_SUMMARY_CHARS) + turns (≤ CHAT_HISTORY_TOKENS) + message
+
+Ids are random tokens issued by the server. A missing, malformed or expired
+id starts a new conversation, and the reply carries the id to use next.
+
+    conversation = chat_sessions.load(body.get("conversation_id"))
+    messages = conversation.prompt(SALES_SYSTEM_PROMPT, user_message)
+    ...
+    conversation.record(reply)
+"""
+import json
+import re
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, prompt_budget
+
+MAX_REPLY_CHARS = 1000  # Stored assistant turns, same cap the old client-sent history had
+USER_GIST = 140  # Characters kept of a folded visitor message
+REPLY_GIST = 160  # …and of the first sentence of a folded reply
+
+_ID = re.compile(r"^[A-Za-z0-9_-]{22}$")  # secrets.token_urlsafe(16)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _key(conversation_id: str) -> str:
+    return f"chat_session:{conversation_id}"
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= limit:
+        return text
+    return text[:limit - 1].rsplit(" ", 1)[0] + "…"
+
+
+def _gist(user_message: str, reply: str) -> str:
+    first_sentence = _SENTENCE_END.split(" ".join(reply.split()), 1)[0]
+    return f"Visitor: {_clip(user_message, USER_GIST)} / You: {_clip(first_sentence, REPLY_GIST)}"
+
+
+class Conversation:
+    def __init__(self, conversation_id: str, summary: str = "", turns=None):
+        self.id = conversation_id
+        self.summary = summary
+        self.turns = turns or []  # [role, content] pairs, oldest first
+        self._pending = None
+
+    @property
+    def history(self) -> list:
+        """What Groq sees before the new message — also what the response cache keys on."""
+        history = [{"role": role, "content": content} for role, content in self.turns]
+        if self.summary:
+            history.insert(0, {"role": "system", "content": f"Summary of the conversation so far:\n{self.summary}"})
+        return history
+
+    def prompt(self, system_prompt: str, user_message: str) -> list:
+        self._pending = user_message
+        return [{"role": "system", "content": system_prompt}, *self.history, {"role": "user", "content": user_message}]
+
+    def record(self, reply: str):
+        """Append the exchange started by prompt(), compact, and save."""
+        if self._pending is None or not reply:
+            return
+        self.turns += [["user", self._pending], ["assistant", reply[:MAX_REPLY_CHARS]]]
+        self._pending = None
+        self._compact()
+        self.save()
+
+    def _compact(self):
+        messages = [{"content": content} for _, content in self.turns]
+        cut = len(self.turns) - len(prompt_budget.pack_history(messages, settings.CHAT_HISTORY_TOKENS))
+        cut += cut % 2  # Whole exchanges only
+        if not cut:
+            return
+        exchanges = zip(self.turns[:cut:2], self.turns[1:cut:2])
+        folded = [_gist(user_message, reply) for (_, user_message), (_, reply) in exchanges]
+        del self.turns[:cut]
+        lines = self.summary.splitlines() + folded
+        while len(lines) > 1 and len("\n".join(lines)) > settings.CHAT_SUMMARY_CHARS:
+            del lines[0]
+        self.summary = "\n".join(lines)[-settings.CHAT_SUMMARY_CHARS:]
+        metrics.incr("chat_sessions.folded", len(folded))
+
+    def save(self):
+        payload = json.dumps([self.summary, self.turns], ensure_ascii=False, separators=(",", ":"))
+        cache.set(_key(self.id), payload, timeout=settings.CHAT_SESSION_TTL)
+
+
+def load(conversation_id) -> Conversation:
+    """The stored conversation for this id, or a new one under a fresh id."""
+    if isinstance(conversation_id, str) and _ID.match(conversation_id):
+        payload = cache.get(_key(conversation_id))
+        if payload:
+            summary, turns = json.loads(payload)
+            metrics.incr("chat_sessions.resumed")
+            return Conversation(conversation_id, summary, turns)
+        metrics.incr("chat_sessions.expired")
+    metrics.incr("chat_sessions.started")
+    return Conversation(secrets.token_urlsafe(16))
+
+
+def stats() -> dict:
+    return {name: metrics.get(f"chat_sessions.{name}") for name in ("started", "resumed", "expired", "folded")}
@@ -0,0 +1,241 @@
+"""
+Circuit breakers and adaptive timeouts for outbound calls.
+
+Breaker state lives in the Django cache, so one worker tripping a breaker
+fast-fails that upstream for every worker:
+
+  cb:<name>:open_until   — set when tripped; open before that time, half-open after it
+  cb:<name>:probe        — cache.add lock so only one half-open probe goes out
+  cb:<name>:calls:<n>    — call / failure counters in WINDOW_BUCKETS slices of the failure window
+  cb:<name>:fails:<n>
+
+Timeouts adapt per worker: each breaker keeps its last LATENCY_SAMPLES
+successful latencies and uses p95 × TIMEOUT_P95_MULTIPLIER, clamped to the
+configured min/max. Before enough samples exist the configured default is used.
+
+    breaker = circuit_breaker.get("alpha_vantage")
+    data = breaker.call(fetch)  # fetch(timeout=...) — raises CircuitOpenError while open
+    data = breaker.call(fetch, cap=remaining)  # never wait past the caller's deadline
+    data = await breaker.acall(afetch)  # same, for coroutine functions
+    stream = breaker.call(open_stream, timed=False)  # returns before the work is done — keep it out of p95
+
+Breaker bookkeeping is a handful of cache round-trips (Redis in production),
+so acall() runs it through sync_to_async — only the call itself is awaited
+on the event loop.
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import counters
+from .pinned_transport import BlockedHost
+from .quota import QuotaExceeded
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+WINDOW_BUCKETS = 6
+LATENCY_SAMPLES = 64
+MIN_SAMPLES = 10
+TIMEOUT_P95_MULTIPLIER = 2.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit open for {name}")
+        self.name = name
+
+
+def counts_as_failure(exc: Exception) -> bool:
+    """Only upstream health problems trip a breaker — not our own budget, SSRF guard or a 4xx answer."""
+    if isinstance(exc, (QuotaExceeded, CircuitOpenError, BlockedHost)):
+        return False
+    # requests/httpx HTTP errors carry .response; Groq's APIStatusError carries .status_code
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500 or status == 429
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.failure_rate = config["failure_rate"]
+        self.min_calls = config["min_calls"]
+        self.window = config["window"]
+        self.open_for = config["open_for"]
+        self.default_timeout = config["timeout"]
+        self.min_timeout = config["min_timeout"]
+        self.max_timeout = config["max_timeout"]
+        self._latencies = array("d")
+        self._lock = threading.Lock()
+
+    def _key(self, suffix: str) -> str:
+        return f"cb:{self.name}:{suffix}"
+
+    # ── state ──
+    def state(self) -> str:
+        open_until = cache.get(self._key("open_until"))
+        if open_until is None:
+            return CLOSED
+        return OPEN if time.time() < open_until else HALF_OPEN
+
+    def _admit(self):
+        """None if the call is refused, else whether it is the half-open probe."""
+        state = self.state()
+        if state == CLOSED:
+            return False
+        # One probe at a time; it holds the slot for at most one timeout
+        if state == HALF_OPEN and cache.add(self._key("probe"), 1, timeout=int(self.max_timeout) + 1):
+            return True
+        return None
+
+    def allow(self) -> bool:
+        return self._admit() is not None
+
+    def _trip(self):
+        cache.set(self._key("open_until"), time.time() + self.open_for, timeout=self.open_for + self.window)
+        cache.delete(self._key("probe"))
+
+    def _reset(self):
+        cache.delete_many([self._key("open_until"), self._key("probe")])
+
+    # ── failure-rate window ──
+    def _bucket(self, now: float) -> int:
+        return int(now // (self.window / WINDOW_BUCKETS))
+
+    def _count(self, kind: str, now: float):
+        counters.incr(self._key(f"{kind}:{self._bucket(now)}"), timeout=int(self.window) + 60)
+
+    def _window_totals(self, now: float) -> tuple:
+        current = self._bucket(now)
+        buckets = range(current - WINDOW_BUCKETS + 1, current + 1)
+        counts = cache.get_many([self._key(f"{kind}:{b}") for kind in ("calls", "fails") for b in buckets])
+        calls = sum(v for k, v in counts.items() if ":calls:" in k)
+        fails = sum(v for k, v in counts.items() if ":fails:" in k)
+        return calls, fails
+
+    def record_success(self, latency: float = None, probe: bool = False):
+        """Count a success. Only the half-open probe closes the breaker — a slow call that
+        started before the trip and finishes while it is open says nothing about the upstream now."""
+        now = time.time()
+        self._count("calls", now)
+        if latency is not None:
+            with self._lock:
+                self._latencies.append(latency)
+                if len(self._latencies) > LATENCY_SAMPLES:
+                    del self._latencies[0]
+        if probe:
+            self._reset()
+
+    def record_failure(self):
+        now = time.time()
+        self._count("calls", now)
+        self._count("fails", now)
+        open_until = cache.get(self._key("open_until"))
+        if open_until is not None:
+            if now >= open_until:
+                self._trip()  # Half-open probe failed — stay open for another period
+            return
+        calls, fails = self._window_totals(now)
+        if calls >= self.min_calls and fails / calls >= self.failure_rate:
+            self._trip()
+
+    # ── adaptive timeout ──
+    def p95(self):
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def timeout(self) -> float:
+        p95 = self.p95()
+        if p95 is None:
+            return self.default_timeout
+        return max(self.min_timeout, min(self.max_timeout, p95 * TIMEOUT_P95_MULTIPLIER))
+
+    # ── call wrapper ──
+    def _timeout(self, cap):
+        return self.timeout() if cap is None else min(self.timeout(), cap)
+
+    def call(self, fn, *args, cap: float = None, timed: bool = True, **kwargs):
+        """
+        Run fn(*args, timeout=<adaptive, at most cap>, **kwargs) through the breaker.
+        timed=False counts the call but keeps its latency out of the adaptive timeout.
+        """
+        probe = self._admit()
+        if probe is None:
+            raise CircuitOpenError(self.name)
+        started = time.perf_counter()
+        try:
+            result = fn(*args, timeout=self._timeout(cap), **kwargs)
+        except Exception as e:
+            if counts_as_failure(e):
+                self.record_failure()
+            else:
+                cache.delete(self._key("probe"))  # Inconclusive probe — let the next one through
+            raise
+        self.record_success(time.perf_counter() - started if timed else None, probe)
+        return result
+
+    async def acall(self, fn, *args, cap: float = None, timed: bool = True, **kwargs):
+        """Async twin of call() — awaits fn(*args, timeout=<adaptive, at most cap>, **kwargs)."""
+        probe = await sync_to_async(self._admit)()
+        if probe is None:
+            raise CircuitOpenError(self.name)
+        started = time.perf_counter()
+        try:
+            result = await fn(*args, timeout=self._timeout(cap), **kwargs)
+        except Exception as e:
+            if counts_as_failure(e):
+                await sync_to_async(self.record_failure)()
+            else:
+                await sync_to_async(cache.delete)(self._key("probe"))
+            raise
+        await sync_to_async(self.record_success)(time.perf_counter() - started if timed else None, probe)
+        return result
+
+    def report(self) -> dict:
+        calls, fails = self._window_totals(time.time())
+        p95 = self.p95()
+        return {
+            "state": self.state(),
+            "window_calls": calls,
+            "window_failures": fails,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "timeout_s": round(self.timeout(), 3),
+        }
+
+
+_breakers = OrderedDict()
+_breakers_lock = threading.Lock()
+MAX_BREAKERS = 512  # Scraped hosts each get one; oldest are dropped from this worker's registry
+
+
+def get(name: str, config_name: str = None) -> CircuitBreaker:
+    """Breaker for `name`, configured from settings.CIRCUIT_BREAKERS[config_name or name]."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            config = {**settings.CIRCUIT_BREAKER_DEFAULTS, **settings.CIRCUIT_BREAKERS.get(config_name or name, {})}
+            breaker = _breakers[name] = CircuitBreaker(name, config)
+            if len(_breakers) > MAX_BREAKERS:
+                _breakers.popitem(last=False)
+        else:
+            _breakers.move_to_end(name)
+        return breaker
+
+
+# Config entries that only seed per-host / per-model breakers (scraper:<host>, groq:<model>)
+TEMPLATES = ("scraper", "groq")
+
+
+def report() -> dict:
+    """State of every configured upstream — used by `manage.py ops_report`."""
+    return {name: get(name).report() for name in settings.CIRCUIT_BREAKERS if name not in TEMPLATES}
@@ -0,0 +1,30 @@
+"""
+Atomic counters in the Django cache, shared by every worker.
+
+cache.add() seeds a key at 0 and cache.incr() bumps it. Both are atomic on
+Redis/Memcached, so concurrent workers never lose an update. A key that
+expires between the two calls is seeded again. Quota windows, rate-limit
+windows, breaker call counts and metrics all count through here.
+
+    used = counters.incr(f"quota:groq:per_minute:{window}", timeout=120)
+    counters.decr(key)  # give it back; a key that already expired is ignored
+"""
+from django.core.cache import cache
+
+
+def incr(key: str, delta: int = 1, timeout=None) -> int:
+    """Add `delta` to the counter at `key` (created at 0 with `timeout`) and return the new value."""
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Expired between add() and incr() — seed it again
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, delta)
+
+
+def decr(key: str, delta: int = 1):
+    try:
+        cache.decr(key, delta)
+    except ValueError:
+        pass  # Already expired; nothing to give back
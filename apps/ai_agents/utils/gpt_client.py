@@ -1,7 +1,7 @@
-from groq import Groq
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-client = Groq(api_key=settings.GROQ_API_KEY)
+from . import llm_client, prompt_budget
 
 ROAST_PROMPT = """
 You are a brutally honest but witty digital strategist.
@@ -33,15 +33,29 @@ Max 250 words total.
 """.strip()
 
 
+_ROAST_PARAMS = {"max_tokens": 500, "temperature": 0.85}
+
+
+def _roast_messages(scraped_data: dict) -> list:
+    return [
+        {"role": "system", "content": ROAST_PROMPT},
+        {"role": "user", "content": prompt_budget.compact_scrape(scraped_data, settings.ROAST_INPUT_TOKENS)},
+    ]
+
+
 def roast_website(scraped_data: dict) -> str:
     """Send scraped website data to Groq (Llama) for a roast critique."""
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": ROAST_PROMPT},
-            {"role": "user", "content": str(scraped_data)},
-        ],
-        max_tokens=500,
-        temperature=0.85,
-    )
+    llm_client.admit()
+    messages = _roast_messages(scraped_data)
+    response = llm_client.complete("roast", messages, **_ROAST_PARAMS)
+    prompt_budget.record("roast", messages, response.usage)
+    return response.choices[0].message.content
+
+
+async def aroast_website(scraped_data: dict) -> str:
+    """Async roast_website() on this event loop's AsyncGroq client — breaker, quota and token bookkeeping off the loop."""
+    await sync_to_async(llm_client.admit)()
+    messages = _roast_messages(scraped_data)
+    response = await llm_client.acomplete("roast", messages, **_ROAST_PARAMS)
+    await sync_to_async(prompt_budget.record)("roast", messages, response.usage)
     return response.choices[0].message.content
@@ -0,0 +1,256 @@
+"""
+Roast-page extraction backends, fed chunk by chunk while the page downloads.
+
+The roast prompt only needs a title, the meta description, a few headings and
+BODY_TEXT_CHARS of visible text, so scrape_website stops reading as soon as an
+extractor reports `done` — or at SCRAPER_MAX_BYTES, whichever comes first.
+
+  stream — stdlib html.parser tokenizer; incremental, stops early (default)
+  lxml   — libxml2 over the buffered bytes; fastest per byte (`pip install lxml`)
+  bs4    — the original BeautifulSoup(html.parser) extraction, kept for comparison
+
+    extractor = html_extract.get_extractor(encoding="utf-8")
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    data = extractor.result()
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+SKIP_TAGS = ("script", "style", "nav", "footer", "header")  # Never part of the body copy
+BODY_TEXT_CHARS = 2000
+MAX_H1, MAX_H2 = 3, 5
+EARLY_STOP_SLACK = 128 * 1024  # Bytes read past a full body text while still looking for headings
+
+_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.IGNORECASE)
+
+
+def charset_from_content_type(content_type: str):
+    match = re.search(r"charset\s*=\s*[\"']?([\w-]+)", content_type or "", re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def _codec(name, head: bytes = b"") -> str:
+    """Validated codec name: explicit header charset, else <meta charset> in the first bytes, else utf-8."""
+    if not name:
+        match = _CHARSET.search(head[:4096])
+        name = match.group(1).decode("ascii", "ignore") if match else None
+    try:
+        return codecs.lookup(name).name if name else "utf-8"
+    except LookupError:
+        return "utf-8"
+
+
+class Extractor:
+    """Base class: subclasses implement feed()/result(); `done` means stop reading."""
+
+    def __init__(self, encoding: str = None):
+        self.encoding = encoding
+        self.bytes_seen = 0
+
+    @property
+    def done(self) -> bool:
+        return False
+
+    def feed(self, chunk: bytes):
+        raise NotImplementedError
+
+    def result(self) -> dict:
+        raise NotImplementedError
+
+
+class _BufferedExtractor(Extractor):
+    """Collects the (capped) bytes and parses them in one go in result()."""
+
+    def __init__(self, encoding: str = None):
+        super().__init__(encoding)
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes):
+        self.bytes_seen += len(chunk)
+        self._buffer += chunk
+
+    def _text(self) -> str:
+        return bytes(self._buffer).decode(_codec(self.encoding, self._buffer), errors="replace")
+
+
+class StreamExtractor(Extractor, HTMLParser):
+    """Incremental tokenizer: keeps only what the roast needs, never builds a tree."""
+
+    def __init__(self, encoding: str = None):
+        Extractor.__init__(self, encoding)
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self._decoder = None
+        self._skip = 0
+        self._in_title = False
+        self._title = None
+        self._meta_desc = None
+        self._heading = None  # (tag, parts) while inside an h1/h2
+        self._h1, self._h2 = [], []
+        self._text, self._text_len = [], 0
+        self._text_full_at = None
+        self._has_cta = False
+        self._pending = []  # Text split across feed() calls is one string until the next tag
+
+    @property
+    def done(self) -> bool:
+        if self._text_full_at is None:
+            return False
+        headings_full = len(self._h1) >= MAX_H1 and len(self._h2) >= MAX_H2
+        return headings_full or self.bytes_seen - self._text_full_at >= EARLY_STOP_SLACK
+
+    def feed(self, chunk: bytes):
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder(_codec(self.encoding, chunk))(errors="replace")
+        self.bytes_seen += len(chunk)
+        HTMLParser.feed(self, self._decoder.decode(chunk))
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIP_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if tag == "title" and self._title is None:
+            self._in_title, self._title = True, []
+        elif tag == "meta" and self._meta_desc is None:
+            attrs = dict(attrs)
+            if (attrs.get("name") or "").lower() == "description":
+                self._meta_desc = (attrs.get("content") or "")[:300]
+        elif tag in ("h1", "h2") and self._heading is None:
+            self._heading = (tag, [])
+        elif tag == "button":
+            self._has_cta = True
+        elif tag == "a" and "cta" in (dict(attrs).get("class") or "").lower():
+            self._has_cta = True
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif self._heading and tag == self._heading[0]:
+            target = self._h1 if tag == "h1" else self._h2
+            if len(target) < (MAX_H1 if tag == "h1" else MAX_H2):
+                target.append("".join(self._heading[1]))
+            self._heading = None
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending)
+        self._pending.clear()
+        if self._skip:
+            return
+        text = data.strip()
+        if not text:
+            return
+        if self._in_title:
+            self._title.append(data)
+        if self._heading:
+            self._heading[1].append(text)
+        if self._text_len < BODY_TEXT_CHARS:
+            self._text.append(text)
+            self._text_len += len(text) + 1
+            if self._text_len >= BODY_TEXT_CHARS:
+                self._text_full_at = self.bytes_seen
+
+    def result(self) -> dict:
+        self._flush()
+        return {
+            "title": "".join(self._title or []).strip()[:200],
+            "meta_desc": self._meta_desc or "",
+            "h1_tags": self._h1,
+            "h2_tags": self._h2,
+            "body_text": " ".join(self._text)[:BODY_TEXT_CHARS],
+            "has_cta": self._has_cta,
+        }
+
+
+class LxmlExtractor(_BufferedExtractor):
+    def __init__(self, encoding: str = None):
+        super().__init__(encoding)
+        try:
+            import lxml.html  # noqa: F401
+        except ImportError as e:
+            raise ImproperlyConfigured("SCRAPER_PARSER='lxml' needs `pip install lxml`.") from e
+
+    def result(self) -> dict:
+        import lxml.html
+        from lxml import etree
+
+        if not self._buffer.strip():
+            return StreamExtractor().result()
+        doc = lxml.html.document_fromstring(self._text())
+        etree.strip_elements(doc, etree.Comment, *SKIP_TAGS, with_tail=False)
+
+        def text_of(el):
+            return "".join(s.strip() for s in el.itertext())
+
+        title = doc.find(".//title")
+        meta = doc.xpath('//meta[@name="description"]/@content')
+        return {
+            "title": (title.text or "").strip()[:200] if title is not None else "",
+            "meta_desc": meta[0][:300] if meta else "",
+            "h1_tags": [text_of(h) for h in doc.iter("h1")][:MAX_H1],
+            "h2_tags": [text_of(h) for h in doc.iter("h2")][:MAX_H2],
+            "body_text": " ".join(s.strip() for s in doc.itertext() if s.strip())[:BODY_TEXT_CHARS],
+            "has_cta": bool(doc.xpath('//button | //a[contains(translate(@class, "CTA", "cta"), "cta")]')),
+        }
+
+
+class SoupExtractor(_BufferedExtractor):
+    def result(self) -> dict:
+        soup = BeautifulSoup(self._text(), "html.parser")
+        # Remove nav, footer, scripts — get body copy only
+        for tag in soup(list(SKIP_TAGS)):
+            tag.decompose()
+
+        return {
+            "title": (soup.title.string or "").strip()[:200] if soup.title else "",
+            "meta_desc": (soup.find("meta", attrs={"name": "description"}) or {}).get("content", "")[:300],
+            "h1_tags": [h.get_text(strip=True) for h in soup.find_all("h1")[:MAX_H1]],
+            "h2_tags": [h.get_text(strip=True) for h in soup.find_all("h2")[:MAX_H2]],
+            "body_text": soup.get_text(separator=" ", strip=True)[:BODY_TEXT_CHARS],
+            "has_cta": bool(soup.find("button") or soup.find("a", class_=lambda c: c and "cta" in c.lower())),
+        }
+
+
+PARSERS = {
+    "stream": StreamExtractor,
+    "lxml": LxmlExtractor,
+    "bs4": SoupExtractor,
+}
+
+
+def get_extractor(encoding: str = None, name: str = None) -> Extractor:
+    """New extractor for one page, using settings.SCRAPER_PARSER unless `name` is given."""
+    name = name or settings.SCRAPER_PARSER
+    if name not in PARSERS:
+        raise ImproperlyConfigured(f"Unknown SCRAPER_PARSER {name!r} — choose from {', '.join(PARSERS)}.")
+    return PARSERS[name](encoding)
+
+
+def extract(html: bytes, encoding: str = None, name: str = None) -> dict:
+    """One-shot extraction of an already-downloaded page (same limits as a streamed fetch)."""
+    extractor = get_extractor(encoding, name)
+    for start in range(0, min(len(html), settings.SCRAPER_MAX_BYTES), 64 * 1024):
+        extractor.feed(html[start:min(start + 64 * 1024, settings.SCRAPER_MAX_BYTES)])
+        if extractor.done:
+            break
+    return extractor.result()
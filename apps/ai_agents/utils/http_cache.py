@@ -0,0 +1,206 @@
+"""
+On-disk HTTP cache for scraped pages: conditional GETs, max-age, LRU under a size cap.
+
+Entries hold the bytes the scraper actually read (zlib-compressed) plus the
+response's validators and freshness:
+
+  fresh   — within Cache-Control max-age (or Expires): no request at all
+  stale   — refetched with If-None-Match / If-Modified-Since; a 304 refreshes
+            the entry and the stored body is parsed again
+  missing — normal fetch, stored if the response carries a validator or a
+            max-age and isn't no-store
+
+Each entry is one file under SCRAPER_CACHE_DIR, replaced atomically, so all
+workers on a host share it. File mtime is the LRU clock: once the directory
+passes SCRAPER_CACHE_MAX_BYTES, the least recently used files are deleted
+down to 90% of it. Entries are keyed by URL and extraction backend, because
+the stored body stops wherever that backend stopped reading.
+
+    entry = http_cache.get(url)
+    if entry and entry.fresh:
+        data = html_extract.extract(entry.body, entry.encoding)
+    headers = entry.validators() if entry else {}
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+from . import metrics
+
+EVICT_TO = 0.9  # Fraction of SCRAPER_CACHE_MAX_BYTES left after an eviction pass
+
+
+def enabled() -> bool:
+    return bool(settings.SCRAPER_CACHE_DIR)
+
+
+def _path(url: str) -> str:
+    key = hashlib.sha256(f"{settings.SCRAPER_PARSER}:{url}".encode("utf-8")).hexdigest()
+    return os.path.join(settings.SCRAPER_CACHE_DIR, f"{key}.entry")
+
+
+class Entry:
+    def __init__(self, path: str, meta: dict, compressed: bytes):
+        self.path = path
+        self.meta = meta
+        self.compressed = compressed
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.meta["expires_at"]
+
+    @property
+    def final_url(self) -> str:
+        """Where the last fetch ended up after redirects — revalidation goes straight there."""
+        return self.meta["final_url"]
+
+    @property
+    def encoding(self):
+        return self.meta.get("encoding")
+
+    @property
+    def body(self) -> bytes:
+        return zlib.decompress(self.compressed)
+
+    def served_fresh(self):
+        metrics.incr("scraper_cache.fresh_hits")
+        metrics.incr("scraper_cache.bytes_saved", self.meta.get("size", 0))
+
+    def validators(self) -> dict:
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+
+def _cache_control(headers) -> dict:
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    return directives
+
+
+def _expires_at(headers, now: float):
+    """Absolute expiry for a response, or None if it must not be stored."""
+    directives = _cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now  # Storable, but revalidate every time
+    if directives.get("max-age", "").isdigit():
+        age = headers.get("Age", "")
+        return now + int(directives["max-age"]) - (int(age) if age.isdigit() else 0)
+    try:
+        expires = parsedate_to_datetime(headers["Expires"]).timestamp()
+        date = parsedate_to_datetime(headers["Date"]).timestamp() if headers.get("Date") else now
+        return now + (expires - date)  # Relative to the server's clock, not ours
+    except (KeyError, TypeError, ValueError):
+        return now
+
+
+def _write(path: str, meta: dict, compressed: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+            f.write(compressed)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def get(url: str):
+    """Stored entry for url, or None. Never raises — a broken cache just means a normal fetch."""
+    if not enabled():
+        return None
+    path = _path(url)
+    try:
+        with open(path, "rb") as f:
+            meta = json.loads(f.readline())
+            compressed = f.read()
+        os.utime(path)  # LRU clock
+    except (OSError, ValueError):
+        return None
+    return Entry(path, meta, compressed)
+
+
+def store(url: str, final_url: str, headers, body: bytes, encoding=None):
+    """Save a 200 response's body if it can be revalidated or reused."""
+    if not enabled() or not body:
+        return
+    now = time.time()
+    expires_at = _expires_at(headers, now)
+    etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+    if expires_at is None or not (etag or last_modified or expires_at > now):
+        return  # Nothing to gain: no validator and no freshness lifetime
+    meta = {
+        "url": url, "final_url": final_url, "stored_at": now, "expires_at": expires_at,
+        "etag": etag, "last_modified": last_modified, "encoding": encoding, "size": len(body),
+    }
+    try:
+        _write(_path(url), meta, zlib.compress(body, 6))
+        metrics.incr("scraper_cache.stored")
+        _evict()
+    except OSError:
+        pass
+
+
+def revalidated(entry: Entry, headers):
+    """A 304 came back: take its validators and freshness, keep the stored body."""
+    now = time.time()
+    expires_at = _expires_at(headers, now)
+    meta = {
+        **entry.meta,
+        "stored_at": now,
+        "expires_at": now if expires_at is None else expires_at,
+        "etag": headers.get("ETag") or entry.meta.get("etag"),
+        "last_modified": headers.get("Last-Modified") or entry.meta.get("last_modified"),
+    }
+    try:
+        _write(entry.path, meta, entry.compressed)
+    except OSError:
+        pass
+    metrics.incr("scraper_cache.revalidated")
+    metrics.incr("scraper_cache.bytes_saved", entry.meta.get("size", 0))
+
+
+def _evict():
+    entries, total = [], 0
+    with os.scandir(settings.SCRAPER_CACHE_DIR) as it:
+        for item in it:
+            if item.name.endswith(".entry"):
+                stat = item.stat()
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+    if total <= settings.SCRAPER_CACHE_MAX_BYTES:
+        return
+    target = settings.SCRAPER_CACHE_MAX_BYTES * EVICT_TO
+    for _, size, path in sorted(entries):
+        try:
+            os.unlink(path)
+            metrics.incr("scraper_cache.evicted")
+        except FileNotFoundError:
+            pass  # Another worker evicted it first
+        total -= size
+        if total <= target:
+            break
+
+
+def stats() -> dict:
+    return {name: metrics.get(f"scraper_cache.{name}")
+            for name in ("fresh_hits", "revalidated", "misses", "stored", "evicted", "bytes_saved")}
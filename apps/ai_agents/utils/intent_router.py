@@ -0,0 +1,258 @@
+"""
+Answer the Sales Director's stock questions locally, before any Groq call.
+
+Two small models, both built once from the service catalog
+(apps.website.context_processors.SERVICES) and kept in memory:
+
+  intent  — TF-IDF over word unigrams and bigrams. The message is scored
+            against hand-written example phrasings of each intent (pricing,
+            details, catalog, booking, affirm) and the best cosine
+            similarity is the confidence. Service names are taken out
+            first, so "how much is SEO" and "how much is social" read the
+            same. Words no example uses count against the match; unseen
+            pairs of known words don't.
+  service — IDF-weighted keyword overlap with each service's title, slug
+            and SERVICE_ALIASES. A service is picked only when it carries
+            at least SERVICE_SHARE of the matched weight.
+
+A message is routed only if it is at most CHAT_ROUTER_MAX_WORDS words, its
+intent scores CHAT_ROUTER_MIN_CONFIDENCE or more, and the intent has what
+it needs (details needs a service named by its title or slug — an alias
+alone, as in "what is google", isn't enough; affirm only counts right after
+the discovery-call offer). Everything else falls through to Groq. Routed turns
+are templated from SERVICES, so prices can never drift from the site.
+
+    answer = intent_router.route(user_message, conversation.turns)
+    if answer:
+        return answer.reply  # answer.intent, answer.confidence for the caller's logs
+"""
+import math
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+
+from apps.website.context_processors import SERVICES, contact_form_context
+
+from . import metrics
+
+SERVICE_SHARE = 0.7  # Below this, the message is about several services (or none) — answer for all of them
+NEAR_MISS = 0.1  # Fell-through messages within this of the threshold are counted, for tuning it
+
+INTENT_EXAMPLES = {
+    "pricing": [
+        "how much", "how much is it", "how much does it cost", "what does it cost", "what are your prices",
+        "pricing", "price", "prices please", "what do you charge", "your rates", "what are the fees",
+        "cost", "starting price", "is it expensive", "how much do you charge for", "what is the price of",
+        "give me a quote", "budget for", "how much per month",
+    ],
+    "details": [
+        "what do you do for", "what is", "what is included in", "what's included", "tell me about", "tell me more about",
+        "what does the package include", "deliverables", "what do i get with", "explain your",
+        "how does your work", "what's in the", "details on", "more info on",
+    ],
+    "catalog": [
+        "what services do you offer", "what services", "what do you do", "what can you help with", "list your services",
+        "services", "what do you offer", "what does digitally do", "your offerings", "what can you do for me",
+        "what kind of work do you do", "how can you help",
+    ],
+    "booking": [
+        "book a call", "schedule a call", "schedule a meeting", "talk to someone", "speak to a human",
+        "i want to get started", "how do i get started", "discovery call", "set up a call", "send me the link",
+        "can we talk", "let's talk", "book a meeting", "contact you",
+    ],
+    "affirm": [
+        "yes", "yes please", "sure", "ok", "okay", "sounds good", "let's do it", "go ahead", "yeah", "yep",
+        "please do", "that works",
+    ],
+}
+
+SERVICE_ALIASES = {
+    "website-management": "website site hosting host backup uptime ssl maintenance security speed wordpress",
+    "social-media": "social instagram linkedin twitter facebook post posts smm",
+    "seo": "seo search google ranking rank gmb backlink keywords",
+    "content-marketing": "content blog blogs newsletter writing articles copy email",
+    "graphic-design": "graphic design logo branding brand identity deck templates collateral",
+}
+
+STOPWORDS = frozenset(
+    "a an and the of for to in on with your our you we my me i is are it per month monthly report doc "
+    "management 24h response".split()
+)
+OFFER = "discovery call"  # SALES_SYSTEM_PROMPT's closing offer — "yes" after it means book
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _words(text: str) -> list:
+    return [_stem(w) for w in _WORD.findall(text.lower().replace("’", "'").replace("'", ""))]
+
+
+def _features(words: list) -> list:
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass
+class Answer:
+    intent: str
+    confidence: float
+    reply: str
+
+
+class _Model:
+    def __init__(self):
+        # Service side: which words name which service, weighted by how few services share them
+        self.service_terms, self.service_names = {}, {}
+        for service in SERVICES:
+            name = f"{service['title']} {service['slug'].replace('-', ' ')}"
+            self.service_names[service["slug"]] = self._terms(name)
+            self.service_terms[service["slug"]] = self._terms(f"{name} {SERVICE_ALIASES.get(service['slug'], '')}")
+        vocabulary = set().union(*self.service_terms.values())
+        count = len(SERVICES)
+        self.service_idf = {
+            term: math.log(1 + count / sum(term in terms for terms in self.service_terms.values()))
+            for term in vocabulary
+        }
+
+        # Intent side: TF-IDF vectors of the example phrasings
+        examples = [(intent, _features(_words(text))) for intent, texts in INTENT_EXAMPLES.items() for text in texts]
+        df = {}
+        for _, features in examples:
+            for feature in set(features):
+                df[feature] = df.get(feature, 0) + 1
+        self.idf = {feature: math.log((1 + len(examples)) / (1 + n)) + 1 for feature, n in df.items()}
+        self.unknown_idf = math.log(1 + len(examples)) + 1  # Words never seen in an example weigh the most
+        self.examples = [(intent, self._vector(features)) for intent, features in examples]
+
+    @staticmethod
+    def _terms(text: str) -> set:
+        return {w for w in _words(text) if w not in STOPWORDS and not w.isdigit() and len(w) > 1}
+
+    def _vector(self, features: list) -> dict:
+        vector = {}
+        for feature in features:
+            if feature not in self.idf and " " in feature:
+                continue  # An unseen pairing of known words isn't evidence against a match; unseen words are
+            vector[feature] = vector.get(feature, 0.0) + self.idf.get(feature, self.unknown_idf)
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {feature: v / norm for feature, v in vector.items()}
+
+    def intent(self, words: list) -> tuple:
+        """(intent, cosine similarity of the closest example), service names left out."""
+        query = self._vector(_features([w for w in words if w not in self.service_idf]))
+        best, score = None, 0.0
+        for intent, example in self.examples:
+            similarity = sum(weight * example.get(feature, 0.0) for feature, weight in query.items())
+            if similarity > score:
+                best, score = intent, similarity
+        return best, score
+
+    def service(self, words: list):
+        """The one service the message is about, or None."""
+        weights = {
+            slug: sum(self.service_idf[w] for w in set(words) if w in terms)
+            for slug, terms in self.service_terms.items()
+        }
+        total = sum(weights.values())
+        slug = max(weights, key=weights.get)
+        if total and weights[slug] / total >= SERVICE_SHARE:
+            return next(s for s in SERVICES if s["slug"] == slug)
+        return None
+
+    def named(self, service, words: list) -> bool:
+        """Whether the message uses the service's own title or slug, not just an alias."""
+        return service is not None and not self.service_names[service["slug"]].isdisjoint(words)
+
+
+@lru_cache(maxsize=1)
+def _model() -> _Model:
+    return _Model()
+
+
+# ── templated replies ──
+_CLOSE = "Want to book a free 15-minute discovery call? Just say the word and I'll get you a link."
+
+
+def _contact(label: str) -> tuple:
+    """(detail, url) for one of the site's contact alternates, e.g. "Book a Call"."""
+    for _, name, detail, url in contact_form_context(None)["contact_alternates"]:
+        if name == label:
+            return detail, url
+    return "", ""
+
+
+def _join(items: list) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _reply(intent: str, service) -> str:
+    if intent == "pricing" and service:
+        includes = _join([d if d[:2].isupper() else d[0].lower() + d[1:] for d in service["deliverables"][:3]])
+        return (f"{service['title']} starts from {service['starting_from']} — that covers {includes}, and more. "
+                f"Exact pricing depends on scope. {_CLOSE}")
+    if intent == "pricing":
+        prices = _join([f"{s['title']} from {s['starting_from']}" for s in SERVICES])
+        return f"Starting prices: {prices}. Exact pricing depends on scope. {_CLOSE}"
+    if intent == "details":
+        return (f"{service['title']} — {service['tagline']} {service['description']} "
+                f"Starts from {service['starting_from']}. Want the details for your business? {_CLOSE}")
+    if intent == "catalog":
+        titles = _join([s["title"] for s in SERVICES])
+        return f"We do five things, and do them properly: {titles}. Which one's on your mind? I'll give you scope and starting prices."
+    # booking / affirm
+    email, _ = _contact("Email Us")
+    _, booking_url = _contact("Book a Call")
+    return f"Here you go — pick any slot for a free 15-minute discovery call: {booking_url}. Prefer email? Reach us at {email}."
+
+
+def _routable(intent: str, service, named: bool, turns: list) -> bool:
+    if intent == "details":
+        return named  # A whole service description needs the service asked about by name
+    if intent == "affirm":
+        return bool(turns) and turns[-1][0] == "assistant" and OFFER in turns[-1][1].lower()
+    return intent is not None
+
+
+def route(message: str, turns=()):
+    """An Answer for a stock question, or None to let Groq handle it. `turns` are the conversation's [role, content] pairs."""
+    if not settings.CHAT_ROUTER_ENABLED:
+        return None
+    started = time.perf_counter()
+    words = _words(message)
+    answer = None
+    if 0 < len(words) <= settings.CHAT_ROUTER_MAX_WORDS:
+        model = _model()
+        intent, confidence = model.intent(words)
+        service = model.service(words)
+        threshold = settings.CHAT_ROUTER_MIN_CONFIDENCE
+        if confidence >= threshold and _routable(intent, service, model.named(service, words), list(turns)):
+            answer = Answer(intent, round(confidence, 3), _reply(intent, service))
+        elif confidence >= threshold - NEAR_MISS:
+            metrics.incr("intent_router.near_miss")
+    metrics.incr("intent_router.micros", round((time.perf_counter() - started) * 1e6))  # Far below the histogram's buckets
+    if answer:
+        metrics.incr(f"intent_router.routed.{answer.intent}")
+    else:
+        metrics.incr("intent_router.fell_through")
+    return answer
+
+
+def stats() -> dict:
+    routed = {intent: metrics.get(f"intent_router.routed.{intent}") for intent in INTENT_EXAMPLES}
+    fell_through = metrics.get("intent_router.fell_through")
+    total = sum(routed.values()) + fell_through
+    return {
+        "routed": routed,
+        "fell_through": fell_through,
+        "near_miss": metrics.get("intent_router.near_miss"),
+        "routed_share": f"{sum(routed.values()) / total:.1%}" if total else None,
+        "avg_us": round(metrics.get("intent_router.micros") / total) if total else 0,
+    }
@@ -0,0 +1,255 @@
+"""
+The one Groq client layer. Chat and roasts both call through here.
+
+Clients are built on first use, so nothing connects at import time. They are
+then reused, which lets keep-alive connections carry over between calls.
+Every call has a deadline (LLM_DEADLINE, per purpose). Within it, up to
+LLM_MAX_ATTEMPTS attempts walk the ordered LLM_MODELS list, sleeping a
+jittered backoff between attempts:
+
+  llama-3.3-70b-versatile → llama-3.1-8b-instant → llama-3.3-70b-versatile
+
+Each model has its own breaker (groq:<model>, configured from
+CIRCUIT_BREAKERS["groq"]), so a model that is down or rate-limited (429) is
+skipped while the next one answers. A model whose p95 latency over the last
+STATS_WINDOW seconds misses LLM_LATENCY_SLO[purpose] moves behind the
+others. Every LLM_PROBE_EVERY-th call keeps the configured order, so a
+demoted model keeps getting re-measured.
+
+    response = llm_client.complete("chat", messages, max_tokens=200, temperature=0.7)
+    stream = llm_client.complete("chat", messages, stream=True, max_tokens=200)
+    for chunk in stream: ...
+"""
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from groq import AsyncGroq, Groq
+
+from . import circuit_breaker, metrics, quota
+from .aio import loop_local
+
+STATS_WINDOW = 300  # Seconds of latency samples behind each model's p95
+MIN_SAMPLES = 10
+MAX_SAMPLES = 512
+
+
+def _build(cls):
+    # Retries and timeouts are ours (across models, within the deadline) — not the SDK's
+    return cls(api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL, max_retries=0)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def client() -> Groq:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build(Groq)
+    return _client
+
+
+async_client = loop_local(lambda: _build(AsyncGroq))
+
+
+# ── per-model latency (this worker) ──
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))  # (purpose, model) -> (monotonic, seconds)
+_samples_lock = threading.Lock()
+_calls = itertools.count()
+
+
+def _observe(purpose: str, model: str, seconds: float):
+    metrics.observe(f"llm.{purpose}.{model}", seconds)
+    with _samples_lock:
+        _samples[(purpose, model)].append((time.monotonic(), seconds))
+
+
+def p95(purpose: str, model: str):
+    """Recent full-completion p95 for this model, or None until MIN_SAMPLES calls in the window."""
+    cutoff = time.monotonic() - STATS_WINDOW
+    with _samples_lock:
+        samples = _samples[(purpose, model)]
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        if len(samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(seconds for _, seconds in samples)
+    return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+
+def plan(purpose: str) -> list:
+    """Models to try, in order: LLM_MODELS, with any model over its latency SLO moved last."""
+    models = list(settings.LLM_MODELS)
+    if next(_calls) % settings.LLM_PROBE_EVERY == 0:
+        return models
+    slo = settings.LLM_LATENCY_SLO[purpose]
+    slow = {model for model in models if (p95(purpose, model) or 0) > slo}
+    return [m for m in models if m not in slow] + [m for m in models if m in slow]
+
+
+def _breaker(model: str):
+    return circuit_breaker.get(f"groq:{model}", "groq")
+
+
+def available() -> bool:
+    """False while every model's breaker is open."""
+    return any(_breaker(model).state() != circuit_breaker.OPEN for model in settings.LLM_MODELS)
+
+
+def admit():
+    """Fail fast without spending quota while no model can take a call, then take one from the Groq budget."""
+    if not available():
+        raise circuit_breaker.CircuitOpenError("groq")
+    if not quota.reserve("groq"):
+        raise quota.QuotaExceeded("groq")
+
+
+def _retryable(exc: Exception) -> bool:
+    return isinstance(exc, circuit_breaker.CircuitOpenError) or circuit_breaker.counts_as_failure(exc)
+
+
+def _attempts(purpose: str):
+    """(attempt, model, seconds to sleep first) — the plan cycled up to LLM_MAX_ATTEMPTS times."""
+    models = plan(purpose)
+    for attempt in range(settings.LLM_MAX_ATTEMPTS):
+        # Full jitter, so workers that failed together don't retry in lockstep
+        pause = random.uniform(0, settings.LLM_RETRY_BACKOFF * 2 ** (attempt - 1)) if attempt else 0
+        yield attempt, models[attempt % len(models)], pause
+
+
+def _served(purpose: str, model: str, attempt: int):
+    metrics.incr(f"llm.{purpose}.served.{model}")
+    if attempt:
+        metrics.incr(f"llm.{purpose}.retried")
+
+
+def complete(purpose: str, messages: list, stream: bool = False, **params):
+    """
+    Chat completion for `purpose` ("chat" / "roast"). Raises the last
+    attempt's error once attempts or the deadline run out; 4xx answers
+    other than 429 are raised straight away.
+    """
+    deadline = time.monotonic() + settings.LLM_DEADLINE[purpose]
+    last_error = None
+    for attempt, model, pause in _attempts(purpose):
+        if isinstance(last_error, circuit_breaker.CircuitOpenError):
+            pause = 0  # Nothing was sent — move on to the next model now
+        remaining = deadline - time.monotonic() - pause
+        if remaining <= 0:
+            break
+        time.sleep(pause)
+        started = time.perf_counter()
+        try:
+            response = _breaker(model).call(
+                client().chat.completions.create, cap=remaining, timed=not stream,
+                model=model, messages=messages, stream=stream, **params,
+            )
+        except Exception as e:
+            if not _retryable(e):
+                raise
+            last_error = e
+            continue
+        _served(purpose, model, attempt)
+        if stream:
+            return Stream(response, purpose, model, started)
+        _observe(purpose, model, time.perf_counter() - started)
+        return response
+    raise last_error or circuit_breaker.CircuitOpenError("groq")
+
+
+async def acomplete(purpose: str, messages: list, stream: bool = False, **params):
+    """complete() on this event loop's AsyncGroq client. Metrics (cache writes) go through sync_to_async."""
+    deadline = time.monotonic() + settings.LLM_DEADLINE[purpose]
+    last_error = None
+    for attempt, model, pause in _attempts(purpose):
+        if isinstance(last_error, circuit_breaker.CircuitOpenError):
+            pause = 0
+        remaining = deadline - time.monotonic() - pause
+        if remaining <= 0:
+            break
+        await asyncio.sleep(pause)
+        started = time.perf_counter()
+        try:
+            response = await _breaker(model).acall(
+                async_client().chat.completions.create, cap=remaining, timed=not stream,
+                model=model, messages=messages, stream=stream, **params,
+            )
+        except Exception as e:
+            if not _retryable(e):
+                raise
+            last_error = e
+            continue
+        await sync_to_async(_served)(purpose, model, attempt)
+        if stream:
+            return AsyncStream(response, purpose, model, started)
+        await sync_to_async(_observe)(purpose, model, time.perf_counter() - started)
+        return response
+    raise last_error or circuit_breaker.CircuitOpenError("groq")
+
+
+class Stream:
+    """
+    Chunks of a streamed completion. Fallback only happens before the first
+    byte; a failure mid-stream counts against the model's breaker and is raised.
+    """
+
+    def __init__(self, stream, purpose: str, model: str, started: float):
+        self._stream = stream
+        self.purpose, self.model = purpose, model
+        self._started = started
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except Exception as e:
+            if circuit_breaker.counts_as_failure(e):
+                _breaker(self.model).record_failure()
+            raise
+        _observe(self.purpose, self.model, time.perf_counter() - self._started)
+
+    def close(self):
+        self._stream.close()
+
+
+class AsyncStream(Stream):
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception as e:
+            if circuit_breaker.counts_as_failure(e):
+                await sync_to_async(_breaker(self.model).record_failure)()
+            raise
+        await sync_to_async(_observe)(self.purpose, self.model, time.perf_counter() - self._started)
+
+    async def close(self):
+        await self._stream.close()
+
+
+def stats() -> dict:
+    """Per-model breaker state, latency and share of calls served — used by `manage.py ops_report`."""
+    purposes = list(settings.LLM_LATENCY_SLO)
+    return {
+        "models": {
+            model: {
+                "breaker": _breaker(model).report(),
+                **{
+                    purpose: {
+                        "served": metrics.get(f"llm.{purpose}.served.{model}"),
+                        "latency": metrics.histogram(f"llm.{purpose}.{model}"),
+                    }
+                    for purpose in purposes
+                },
+            }
+            for model in settings.LLM_MODELS
+        },
+        "retried": {purpose: metrics.get(f"llm.{purpose}.retried") for purpose in purposes},
+    }
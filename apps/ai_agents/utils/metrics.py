@@ -0,0 +1,57 @@
+"""
+Cache-backed counters shared by every worker. Never raises — stats must not break a request.
+
+    metrics.incr("weather_cache.hits")
+    metrics.get("weather_cache.hits")
+"""
+from django.core.cache import cache
+
+from . import counters
+
+
+def _key(name: str) -> str:
+    return f"metrics:{name}"
+
+
+def incr(name: str, n: int = 1):
+    try:
+        counters.incr(_key(name), n)
+    except Exception:
+        pass
+
+
+def get(name: str) -> int:
+    try:
+        return cache.get(_key(name), 0)
+    except Exception:
+        return 0
+
+
+# Latency histograms — fixed millisecond buckets, so every worker adds into the same keys.
+#     metrics.observe("chat.ttft", 0.42)
+#     metrics.histogram("chat.ttft")  ->  {"count": 12, "avg_ms": 380, "p50_ms": 500, "p95_ms": 1000, ...}
+BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def observe(name: str, seconds: float):
+    ms = seconds * 1000
+    bucket = next((b for b in BUCKETS_MS if ms <= b), "inf")
+    incr(f"{name}.le_{bucket}")
+    incr(f"{name}.count")
+    incr(f"{name}.sum_ms", int(ms))
+
+
+def histogram(name: str) -> dict:
+    """Count, mean and bucket-resolution p50/p95 (upper bound of the bucket)."""
+    count = get(f"{name}.count")
+    buckets = {str(b): get(f"{name}.le_{b}") for b in (*BUCKETS_MS, "inf")}
+    report = {"count": count, "avg_ms": round(get(f"{name}.sum_ms") / count) if count else None}
+    for label, q in (("p50_ms", 0.5), ("p95_ms", 0.95)):
+        seen, report[label] = 0, None
+        for bound, n in buckets.items():
+            seen += n
+            if count and seen >= q * count:
+                report[label] = bound
+                break
+    report["buckets"] = buckets
+    return report
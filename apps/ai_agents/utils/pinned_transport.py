@@ -0,0 +1,271 @@
+"""
+HTTP transport for the roast scraper: validated DNS, pinned connections, pooled sockets.
+
+resolve_public(host) resolves a host once per SCRAPER_DNS_TTL and rejects it
+if *any* of its addresses is private or internal. Connections, both sync
+(urllib3 under a shared requests.Session) and async (httpcore under
+httpx), dial only those validated addresses. A rebinding DNS server
+therefore can't swap in 127.0.0.1 between the check and the connect.
+Redirects are followed by hand, and every hop is validated again.
+
+    resp = pinned_transport.get(url, timeout=5)                  # streamed requests.Response
+    resp = await pinned_transport.aget(client, url, timeout=5)   # streamed httpx.Response
+"""
+import asyncio
+import ipaddress
+import socket
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from urllib.parse import urljoin, urlparse
+
+import httpcore
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection
+
+PRIVATE_RANGES = [
+    ipaddress.ip_network("10.0.0.0/8"),
+    ipaddress.ip_network("172.16.0.0/12"),
+    ipaddress.ip_network("192.168.0.0/16"),
+    ipaddress.ip_network("127.0.0.0/8"),
+    ipaddress.ip_network("169.254.0.0/16"),  # AWS metadata
+    ipaddress.ip_network("::1/128"),
+]
+MAX_CACHED_HOSTS = 1024
+REDIRECT_DRAIN_BYTES = 64 * 1024  # Small redirect bodies are read so the connection goes back to the pool
+
+
+class BlockedHost(ValueError):
+    """The host resolves (at least partly) to a private/internal address, or doesn't resolve at all."""
+
+    def __init__(self, host: str):
+        super().__init__("Private/internal URLs are not allowed.")
+        self.host = host
+
+
+# ── DNS cache ──
+_dns = OrderedDict()  # host -> (expires_at, addresses)
+_dns_lock = threading.Lock()
+
+
+def _is_blocked(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])  # Drop an IPv6 zone id
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return not ip.is_global or any(ip in net for net in PRIVATE_RANGES)
+
+
+def _cached(host: str):
+    with _dns_lock:
+        entry = _dns.get(host)
+        if entry and entry[0] > time.monotonic():
+            _dns.move_to_end(host)
+            return entry[1]
+    return None
+
+
+def _store(host: str, infos: list) -> list:
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    with _dns_lock:
+        _dns[host] = (time.monotonic() + settings.SCRAPER_DNS_TTL, addresses)
+        _dns.move_to_end(host)
+        while len(_dns) > MAX_CACHED_HOSTS:
+            _dns.popitem(last=False)
+    return addresses
+
+
+def _validated(host: str, addresses: list) -> list:
+    if not addresses:
+        raise BlockedHost(host)
+    if not settings.SCRAPER_ALLOW_PRIVATE_HOSTS and any(_is_blocked(a) for a in addresses):
+        raise BlockedHost(host)
+    return addresses
+
+
+def resolve_public(host: str) -> list:
+    """All addresses for host — raises BlockedHost if any is private or it doesn't resolve."""
+    addresses = _cached(host)
+    if addresses is None:
+        try:
+            addresses = _store(host, socket.getaddrinfo(host, None, type=socket.SOCK_STREAM))
+        except (OSError, UnicodeError) as e:
+            raise BlockedHost(host) from e  # Fail closed
+    return _validated(host, addresses)
+
+
+async def aresolve_public(host: str) -> list:
+    """resolve_public() without blocking the event loop."""
+    addresses = _cached(host)
+    if addresses is None:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError) as e:
+            raise BlockedHost(host) from e
+        addresses = _store(host, infos)
+    return _validated(host, addresses)
+
+
+def _drainable(resp) -> bool:
+    length = resp.headers.get("Content-Length")
+    return length is not None and length.isdigit() and int(length) <= REDIRECT_DRAIN_BYTES
+
+
+def check_url(url: str) -> str:
+    """Validate one request target (every redirect hop goes through here). Returns the hostname."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("Only HTTP/HTTPS URLs are allowed.")
+    return parsed.hostname
+
+
+# ── sync: requests + urllib3 ──
+class _PinnedConnectionMixin:
+    """
+    Dial the validated addresses instead of letting urllib3 resolve the name
+    again. Only the socket is pinned: in urllib3 2.x `host` reads `_dns_host`,
+    so that stays the hostname and the Host header, SNI and certificate check
+    keep using it (HTTPSConnection wraps this socket with server_hostname=host).
+    """
+
+    def _new_conn(self):
+        last_error = None
+        for address in resolve_public(self.host):
+            try:
+                return connection.create_connection(
+                    (address, self.port), self.timeout,
+                    source_address=self.source_address, socket_options=self.socket_options,
+                )
+            except socket.timeout as e:
+                last_error = ConnectTimeoutError(
+                    self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})",
+                )
+                last_error.__cause__ = e
+            except OSError as e:
+                last_error = NewConnectionError(self, f"Failed to establish a new connection: {e}")
+                last_error.__cause__ = e
+        raise last_error
+
+
+class PinnedHTTPConnection(_PinnedConnectionMixin, HTTPConnection):
+    pass
+
+
+class PinnedHTTPSConnection(_PinnedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class PinnedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = PinnedHTTPConnection
+
+
+class PinnedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = PinnedHTTPSConnection
+
+
+class PinnedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": PinnedHTTPConnectionPool,
+            "https": PinnedHTTPSConnectionPool,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Shared keep-alive session — no env proxies (they'd bypass pinning), no cookies kept between roasts."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.trust_env = False
+                session.verify = settings.SCRAPER_CA_BUNDLE or True
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = PinnedAdapter(pool_connections=64, pool_maxsize=settings.SCRAPER_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get(url: str, timeout: float, headers: dict = None) -> requests.Response:
+    """GET with every redirect hop validated; the final response is streamed (caller closes it)."""
+    session = _get_session()
+    for _ in range(settings.SCRAPER_MAX_REDIRECTS + 1):
+        resolve_public(check_url(url))
+        resp = session.get(url, timeout=timeout, headers=headers, allow_redirects=False, stream=True)
+        if not resp.is_redirect:
+            return resp
+        if _drainable(resp):
+            resp.content
+        resp.close()
+        url = urljoin(resp.url, resp.headers["Location"])
+    raise requests.TooManyRedirects(f"More than {settings.SCRAPER_MAX_REDIRECTS} redirects")
+
+
+# ── async: httpx + httpcore ──
+class _PinnedAsyncBackend(httpcore.AsyncNetworkBackend):
+    """Wraps httpcore's backend so TCP connects go to validated addresses; TLS still verifies the hostname."""
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        last_error = None
+        for address in await aresolve_public(host):
+            try:
+                return await self._inner.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options,
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        raise last_error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix sockets are not allowed.")
+
+    async def sleep(self, seconds):
+        await self._inner.sleep(seconds)
+
+
+def async_client(headers: dict = None) -> httpx.AsyncClient:
+    """Pinned, pooled httpx client — build one per event loop (see aio.loop_local)."""
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_keepalive_connections=settings.SCRAPER_POOL_SIZE),
+        verify=ssl.create_default_context(cafile=settings.SCRAPER_CA_BUNDLE) if settings.SCRAPER_CA_BUNDLE else True,
+    )
+    # httpx has no public hook for the network backend; wrap the one its pool already uses
+    transport._pool._network_backend = _PinnedAsyncBackend(transport._pool._network_backend)
+    return httpx.AsyncClient(
+        transport=transport,
+        headers=headers,
+        trust_env=False,
+        follow_redirects=False,
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+    )
+
+
+async def aget(client: httpx.AsyncClient, url: str, timeout: float, headers: dict = None) -> httpx.Response:
+    """Async get(): redirect hops validated by hand, final response streamed (caller acloses it)."""
+    for _ in range(settings.SCRAPER_MAX_REDIRECTS + 1):
+        await aresolve_public(check_url(url))
+        resp = await client.send(client.build_request("GET", url, timeout=timeout, headers=headers), stream=True)
+        if not resp.has_redirect_location:  # httpx's is_redirect is any 3xx, 304 included
+            return resp
+        if _drainable(resp):
+            await resp.aread()
+        await resp.aclose()
+        url = str(resp.url.join(resp.headers["Location"]))
+    raise httpx.TooManyRedirects(f"More than {settings.SCRAPER_MAX_REDIRECTS} redirects")
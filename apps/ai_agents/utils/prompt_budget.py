@@ -0,0 +1,120 @@
+"""
+Token budgets for the Groq prompts, estimated locally — no tokenizer download.
+
+estimate() approximates Llama 3's BPE: one token per common word, number group
+or punctuation mark, and roughly one per four characters of long words. That
+is close enough to keep prompt size predictable; Groq's reported usage is
+recorded next to every estimate, so drift shows up in ops_report.
+
+    recent = prompt_budget.pack_history(turns, settings.CHAT_HISTORY_TOKENS)
+    content = prompt_budget.compact_scrape(scraped, settings.ROAST_INPUT_TOKENS)
+    prompt_budget.record("chat", messages, response.usage)
+"""
+import logging
+import re
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD = 4  # Header/role/end-of-turn tokens around every chat message
+SHORT_WORD = 7  # Letters — anything longer tends to split into ~4-char pieces
+
+# Llama 3 pre-tokenization: letter runs, digit groups of up to 3, everything else one char at a time
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|\S")
+
+
+def _cost(piece: str) -> int:
+    if len(piece) > SHORT_WORD and piece.isalpha():
+        return -(-len(piece) // 4)
+    return 1
+
+
+def estimate(text: str) -> int:
+    return sum(_cost(piece) for piece in _PIECES.findall(text or ""))
+
+
+def message_tokens(message: dict) -> int:
+    return estimate(message["content"]) + MESSAGE_OVERHEAD
+
+
+def prompt_tokens(messages: list) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def truncate(text: str, budget: int) -> str:
+    """Cut text at the last whole piece that fits in `budget` tokens."""
+    used = 0
+    for match in _PIECES.finditer(text):
+        used += _cost(match.group())
+        if used > budget:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def pack_history(history: list, budget: int) -> list:
+    """The most recent messages that fit in `budget` tokens, oldest first — never a gap in between."""
+    packed, used = [], 0
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        packed.append(message)
+        used += cost
+    packed.reverse()
+    return packed
+
+
+def compact_scrape(data: dict, budget: int) -> str:
+    """
+    Scraped page as labelled lines instead of a dict repr (no quotes, keys or
+    escapes to pay for). Body text gets whatever is left of `budget`.
+    """
+    lines = [
+        f"Title: {data.get('title') or '(none)'}",
+        f"Meta description: {data.get('meta_desc') or '(none)'}",
+        f"H1: {' | '.join(data.get('h1_tags') or []) or '(none)'}",
+        f"H2: {' | '.join(data.get('h2_tags') or []) or '(none)'}",
+        f"Has CTA button/link: {'yes' if data.get('has_cta') else 'no'}",
+    ]
+    head = "\n".join(lines)
+    label = "\nBody text: "
+    room = budget - estimate(head) - estimate(label)
+    body = truncate(data.get("body_text") or "", max(room, 0))
+    return head + label + (body or "(none)")
+
+
+def _usage_dict(usage):
+    if usage is None or isinstance(usage, dict):
+        return usage
+    return usage.to_dict()
+
+
+def record(kind: str, messages: list, usage):
+    """Log one call's prompt/completion tokens (Groq usage object or dict) against the local estimate."""
+    usage = _usage_dict(usage)
+    if not usage:
+        return
+    estimated = prompt_tokens(messages)
+    prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+    logger.info("%s tokens: prompt=%s (estimated %s) completion=%s", kind, prompt, estimated, completion)
+    metrics.incr(f"tokens.{kind}.calls")
+    metrics.incr(f"tokens.{kind}.prompt", prompt)
+    metrics.incr(f"tokens.{kind}.estimated", estimated)
+    metrics.incr(f"tokens.{kind}.completion", completion)
+
+
+def stats(kinds=("chat", "roast")) -> dict:
+    report = {}
+    for kind in kinds:
+        calls = metrics.get(f"tokens.{kind}.calls")
+        prompt = metrics.get(f"tokens.{kind}.prompt")
+        estimated = metrics.get(f"tokens.{kind}.estimated")
+        report[kind] = {
+            "calls": calls,
+            "avg_prompt": round(prompt / calls) if calls else 0,
+            "avg_completion": round(metrics.get(f"tokens.{kind}.completion") / calls) if calls else 0,
+            # Positive means the local estimate over-counts
+            "estimate_error": f"{estimated / prompt - 1:+.1%}" if prompt else None,
+        }
+    return report
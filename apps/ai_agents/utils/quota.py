@@ -0,0 +1,90 @@
+"""
+Cross-worker upstream quota budgets (Alpha Vantage, OpenWeather, Groq).
+
+Usage is counted in fixed per-minute and per-day (UTC) windows stored in the
+Django cache as atomic counters (see counters.py), so every worker draws from
+the same budget once a shared cache is configured (REDIS_URL in production).
+
+    if not quota.reserve("groq"):
+        ...serve cached / placeholder data...
+
+Limits live in settings.UPSTREAM_QUOTAS. A provider with no entry is unmetered.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import counters
+
+WINDOWS = (("per_minute", 60), ("per_day", 86400))
+
+
+class QuotaExceeded(Exception):
+    """Raised by call sites that cannot degrade gracefully when a budget is spent."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Upstream quota exhausted for {provider}")
+        self.provider = provider
+
+
+def _limits(provider: str) -> dict:
+    return settings.UPSTREAM_QUOTAS.get(provider, {})
+
+
+def _window_key(provider: str, name: str, seconds: int, now: float) -> str:
+    return f"quota:{provider}:{name}:{int(now // seconds)}"
+
+
+def reserve(provider: str, cost: int = 1) -> bool:
+    """
+    Atomically take `cost` calls from every window of the provider's budget.
+    Returns False (and takes nothing) if any window would go over its limit.
+    """
+    limits = _limits(provider)
+    now = time.time()
+    taken = []
+    for name, seconds in WINDOWS:
+        limit = limits.get(name)
+        if not limit:
+            continue
+        key = _window_key(provider, name, seconds, now)
+        used = counters.incr(key, cost, timeout=seconds + 60)
+        taken.append(key)
+        if used > limit:
+            for k in taken:
+                counters.decr(k, cost)
+            return False
+    return True
+
+
+def usage(provider: str) -> dict:
+    """Current usage per window: {"per_minute": {"used", "limit", "remaining"}, ...}."""
+    limits = _limits(provider)
+    now = time.time()
+    report = {}
+    for name, seconds in WINDOWS:
+        limit = limits.get(name)
+        if not limit:
+            continue
+        used = cache.get(_window_key(provider, name, seconds, now), 0)
+        report[name] = {"used": used, "limit": limit, "remaining": max(limit - used, 0)}
+    return report
+
+
+def degraded(provider: str) -> bool:
+    """
+    True once any window has used UPSTREAM_QUOTA_DEGRADE_AT of its limit.
+    Optional refreshes should stop here and serve cached or placeholder data,
+    leaving the tail of the budget for requests that have nothing cached.
+    """
+    threshold = settings.UPSTREAM_QUOTA_DEGRADE_AT
+    return any(w["used"] >= w["limit"] * threshold for w in usage(provider).values())
+
+
+def usage_report() -> dict:
+    """Usage for every configured provider — used by `manage.py ops_report`."""
+    return {
+        provider: {"windows": usage(provider), "degraded": degraded(provider)}
+        for provider in settings.UPSTREAM_QUOTAS
+    }
@@ -0,0 +1,230 @@
+"""
+Per-client rate limits shared by every worker: sliding-window counters over pluggable storage.
+
+Each limit in settings.RATE_LIMITS is (requests, period seconds). A hit
+atomically increments the counter for the current fixed window, then weighs
+in the previous window by how much of it still overlaps the sliding period:
+
+    estimate = previous × (1 − elapsed fraction) + current
+
+Over the limit, the hit is given back (so hammering doesn't extend the
+lockout) and the caller gets the seconds until the estimate drops again,
+for Retry-After. Nothing is read-then-written: two workers racing on one key
+can both be refused near the edge, but the limit is never over-admitted.
+
+  cache — counters.incr() on the default cache (Redis in production)
+  redis — one MULTI round trip against RATE_LIMIT_REDIS_URL (`pip install redis`)
+  db    — RateLimitCounter rows bumped with UPDATE … SET count = count + 1
+
+    @rate_limit("chat", denied=lambda request, retry_after: JsonResponse({...}, status=429))
+    def chat_view(request): ...
+
+A view that turns the request away before doing any work (e.g. an invalid
+URL) calls refund(request), so rejected input doesn't use up the visitor's limit.
+"""
+import functools
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+
+from apps.website.views import get_client_ip
+
+from . import counters, metrics
+
+PURGE_CHANCE = 0.01  # DB storage: roughly one hit in a hundred deletes expired counters
+
+
+class CacheStorage:
+    def _key(self, key: str, window: int) -> str:
+        return f"ratelimit:{key}:{window}"
+
+    def hit(self, key: str, window: int, ttl: int) -> tuple:
+        current = counters.incr(self._key(key, window), timeout=ttl)
+        return current, cache.get(self._key(key, window - 1), 0)
+
+    def undo(self, key: str, window: int):
+        counters.decr(self._key(key, window))
+
+
+class RedisStorage(CacheStorage):
+    def __init__(self):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured("RATE_LIMIT_STORAGE='redis' needs `pip install redis`.") from e
+        if not settings.RATE_LIMIT_REDIS_URL:
+            raise ImproperlyConfigured("RATE_LIMIT_STORAGE='redis' needs RATE_LIMIT_REDIS_URL.")
+        self._redis = redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL)
+
+    def hit(self, key: str, window: int, ttl: int) -> tuple:
+        current_key = self._key(key, window)
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.incr(current_key)
+        pipe.expire(current_key, ttl)
+        pipe.get(self._key(key, window - 1))
+        current, _, previous = pipe.execute()
+        return current, int(previous or 0)
+
+    def undo(self, key: str, window: int):
+        self._redis.decr(self._key(key, window))
+
+
+class DatabaseStorage:
+    def hit(self, key: str, window: int, ttl: int) -> tuple:
+        from ..models import RateLimitCounter
+
+        counters = RateLimitCounter.objects.filter(key=key)
+        if not counters.filter(window=window).update(count=F("count") + 1):
+            try:
+                with transaction.atomic():
+                    counters.create(
+                        key=key, window=window, count=1, expires_at=timezone.now() + timedelta(seconds=ttl),
+                    )
+            except IntegrityError:
+                counters.filter(window=window).update(count=F("count") + 1)  # Another worker created it first
+        if random.random() < PURGE_CHANCE:
+            RateLimitCounter.objects.filter(expires_at__lt=timezone.now()).delete()
+        counts = dict(counters.filter(window__in=(window - 1, window)).values_list("window", "count"))
+        return counts.get(window, 0), counts.get(window - 1, 0)
+
+    def undo(self, key: str, window: int):
+        from ..models import RateLimitCounter
+
+        RateLimitCounter.objects.filter(key=key, window=window).update(count=F("count") - 1)
+
+
+STORAGES = {
+    "cache": CacheStorage,
+    "redis": RedisStorage,
+    "db": DatabaseStorage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                name = settings.RATE_LIMIT_STORAGE
+                if name not in STORAGES:
+                    raise ImproperlyConfigured(
+                        f"Unknown RATE_LIMIT_STORAGE {name!r} — choose from {', '.join(STORAGES)}."
+                    )
+                _storage = STORAGES[name]()
+    return _storage
+
+
+def _retry_after(previous: int, current: int, limit: int, period: int, elapsed: float) -> int:
+    """Seconds until one more hit fits: previous × (1 − f) + current + 1 ≤ limit."""
+    if current < limit:
+        # Still in this window, once enough of the previous one has slid out
+        needed = 1 - (limit - current - 1) / previous
+        wait = (needed - elapsed) * period
+    else:
+        # Only after this window closes and becomes the "previous" one
+        needed = 1 - (limit - 1) / current if current else 0
+        wait = (1 - elapsed + max(needed, 0)) * period
+    return max(1, math.ceil(wait))
+
+
+def _charge(scope: str, ident: str, storage) -> tuple:
+    """(0 or Retry-After seconds, (key, window) of the hit if it was counted)."""
+    limit, period = settings.RATE_LIMITS[scope]
+    now = time.time()
+    window, elapsed = divmod(now, period)
+    window, elapsed = int(window), elapsed / period
+    key = f"{scope}:{ident}"
+    try:
+        current, previous = storage.hit(key, window, ttl=2 * period)
+    except Exception:
+        return 0, None  # Fail open — a storage outage must not take the site down with it
+    if previous * (1 - elapsed) + current <= limit:
+        return 0, (key, window)
+    try:
+        storage.undo(key, window)
+    except Exception:
+        pass
+    metrics.incr(f"rate_limit.{scope}.denied")
+    return _retry_after(previous, current - 1, limit, period, elapsed), None
+
+
+def check(scope: str, ident: str, storage=None) -> int:
+    """Count one hit for `ident` against RATE_LIMITS[scope]. Returns 0 if allowed, else Retry-After seconds."""
+    return _charge(scope, ident, storage or get_storage())[0]
+
+
+def refund(request):
+    """Give back the hit @rate_limit counted for this request. Safe to call more than once."""
+    charged = getattr(request, "_rate_limit_charge", None)
+    if charged is None:
+        return
+    request._rate_limit_charge = None
+    storage, key, window = charged
+    try:
+        storage.undo(key, window)
+    except Exception:
+        pass
+
+
+def _too_many(request, retry_after):
+    return HttpResponse("Too many requests.", status=429)
+
+
+def rate_limit(scope: str, denied=None):
+    """
+    View decorator: one hit per request against RATE_LIMITS[scope], keyed by
+    client IP. Over the limit it returns denied(request, retry_after) — a plain
+    429 by default — with a Retry-After header. Works on sync and async views.
+    """
+    denied = denied or _too_many
+
+    def refuse(request, retry_after):
+        response = denied(request, retry_after)
+        response["Retry-After"] = str(retry_after)
+        return response
+
+    def charge(request) -> int:
+        storage = get_storage()
+        retry_after, charged = _charge(scope, get_client_ip(request), storage)
+        if charged:
+            request._rate_limit_charge = (storage, *charged)  # For refund()
+        return retry_after
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                # Every storage blocks (Redis, the ORM, a DB or Redis cache) — never on the event loop
+                retry_after = await sync_to_async(charge)(request)
+                if retry_after:
+                    return refuse(request, retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                retry_after = charge(request)
+                if retry_after:
+                    return refuse(request, retry_after)
+                return view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict:
+    return {scope: {"limit": f"{limit}/{period}s", "denied": metrics.get(f"rate_limit.{scope}.denied")}
+            for scope, (limit, period) in settings.RATE_LIMITS.items()}
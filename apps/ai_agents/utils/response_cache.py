@@ -0,0 +1,108 @@
+"""
+Reuse Sales Director answers to repeated questions.
+
+Keys combine the normalized user message, a hash of the sanitized history
+and a hash of the system prompt, so editing SALES_SYSTEM_PROMPT invalidates
+every stored answer. Only short messages in short conversations (at most
+CHAT_CACHE_MAX_TURNS earlier exchanges) are eligible — past that, replies
+depend too much on context to reuse.
+
+Entries live in a per-worker LRU (CHAT_CACHE_SIZE entries, CHAT_CACHE_TTL
+seconds); hit/miss and saved-token counters go through metrics so they add
+up across workers.
+
+    key = response_cache.key_for(message, history, SALES_SYSTEM_PROMPT)  # None if not eligible
+    reply = response_cache.get(key)
+    response_cache.put(key, reply, tokens=usage.total_tokens)
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+
+_entries = OrderedDict()  # key -> (expires_at, reply, tokens)
+_lock = threading.Lock()
+_prompt_version = None
+
+_PUNCTUATION = re.compile(r"[^\w\s₹]+")
+
+
+def _digest(value) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize(message: str) -> str:
+    """'How much is SEO??' and 'how much is seo' share an entry."""
+    return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+
+def prompt_version(system_prompt: str) -> str:
+    return _digest(system_prompt)
+
+
+def key_for(message: str, history: list, system_prompt: str):
+    """Cache key for this turn, or None when the conversation is too long or the message too long to reuse."""
+    if len(message) > settings.CHAT_CACHE_MAX_CHARS or len(history) > 2 * settings.CHAT_CACHE_MAX_TURNS:
+        return None
+    version = prompt_version(system_prompt)
+    _check_version(version)
+    return f"{version}:{_digest(history)}:{normalize(message)}"
+
+
+def _check_version(version: str):
+    global _prompt_version
+    with _lock:
+        if version != _prompt_version:
+            _entries.clear()  # Prompt changed — every stored answer is stale
+            _prompt_version = version
+
+
+def get(key):
+    if key is None:
+        return None
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] > time.time():
+            _entries.move_to_end(key)
+        elif entry:
+            del _entries[key]
+            entry = None
+    if entry is None:
+        metrics.incr("chat_cache.misses")
+        return None
+    metrics.incr("chat_cache.hits")
+    metrics.incr("chat_cache.saved_tokens", entry[2])
+    return entry[1]
+
+
+def put(key, reply: str, tokens: int = 0):
+    if key is None or not reply:
+        return
+    with _lock:
+        _entries[key] = (time.time() + settings.CHAT_CACHE_TTL, reply, tokens or 0)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.CHAT_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def stats() -> dict:
+    hits, misses = metrics.get("chat_cache.hits"), metrics.get("chat_cache.misses")
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        "saved_tokens": metrics.get("chat_cache.saved_tokens"),
+        "entries_this_worker": len(_entries),
+        "prompt_version": _prompt_version,
+    }
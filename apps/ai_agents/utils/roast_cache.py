@@ -0,0 +1,116 @@
+"""
+Roast results reused per canonical URL.
+
+Every successful roast stores its critique zlib-compressed on the RoastRequest
+row, with a fingerprint of the scraped page. For the next roast of the same
+canonical URL:
+
+  within ROAST_CACHE_FRESH  — serve the stored critique without scraping (a DB read)
+  within ROAST_CACHE_TTL    — scrape, and reuse the critique if the fingerprint matches
+  otherwise / page changed  — full scrape + LLM roast
+
+    key = roast_cache.url_key(url)
+    entry = roast_cache.lookup(key)       # or `await roast_cache.alookup(key)`
+    if roast_cache.is_fresh(entry): ...
+"""
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from ..models import RoastRequest
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid"}  # plus any utm_*
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """https://WWW.Example.com:443/a/?utm_source=x&b=2&a=1#top -> https://www.example.com/a?a=1&b=2"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def url_key(url: str) -> str:
+    return hashlib.sha256(canonical_url(url).encode("utf-8")).hexdigest()
+
+
+def fingerprint(scraped: dict) -> str:
+    """Stable hash of what the roast prompt actually sees."""
+    return hashlib.sha256(json.dumps(scraped, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compress(html: str) -> bytes:
+    return zlib.compress(html.encode("utf-8"), 6)
+
+
+def decompress(blob) -> str:
+    return zlib.decompress(bytes(blob)).decode("utf-8")
+
+
+def _latest(key: str):
+    return (
+        RoastRequest.objects
+        .filter(url_key=key, was_successful=True, result_compressed__isnull=False,
+                created_at__gte=timezone.now() - timedelta(seconds=settings.ROAST_CACHE_TTL))
+        .only("url_key", "page_fingerprint", "result_compressed", "created_at")
+        .order_by("-created_at")
+    )
+
+
+def lookup(key: str):
+    """Newest stored roast for this URL key within ROAST_CACHE_TTL, or None."""
+    return _latest(key).first()
+
+
+async def alookup(key: str):
+    return await _latest(key).afirst()
+
+
+def is_fresh(entry) -> bool:
+    fresh = entry is not None and entry.created_at >= timezone.now() - timedelta(seconds=settings.ROAST_CACHE_FRESH)
+    if fresh:
+        metrics.incr("roast_cache.fresh_hits")
+    return fresh
+
+
+def reuse(entry, page_fingerprint: str):
+    """Stored critique if the page is unchanged since it was roasted, else None."""
+    if entry is not None and entry.page_fingerprint == page_fingerprint:
+        metrics.incr("roast_cache.fingerprint_hits")
+        return decompress(entry.result_compressed)
+    metrics.incr("roast_cache.misses")
+    return None
+
+
+def record(roast_obj, key: str, critique_html: str, page_fingerprint: str, store: bool = True) -> list:
+    """
+    Fill the cache fields on roast_obj and return update_fields for save().
+    Fresh hits pass store=False — the source row already holds the blob.
+    """
+    roast_obj.was_successful = True
+    roast_obj.result_preview = critique_html[:200]
+    roast_obj.url_key = key
+    roast_obj.page_fingerprint = page_fingerprint
+    fields = ["was_successful", "result_preview", "url_key", "page_fingerprint"]
+    if store:
+        roast_obj.result_compressed = compress(critique_html)
+        fields.append("result_compressed")
+    return fields
+
+
+def stats() -> dict:
+    return {name: metrics.get(f"roast_cache.{name}") for name in ("fresh_hits", "fingerprint_hits", "misses")}
@@ -0,0 +1,183 @@
+"""
+DB-backed roast job queue — RoastRequest rows are the jobs, no broker needed.
+
+  queued  → claimed by `manage.py roast_worker` with a conditional UPDATE
+            (status/locked_until re-checked in the WHERE clause, so two
+            workers can't both win the same row)
+  running → locked_until = now + visibility(); a worker that dies
+            mid-job leaves the row claimable again once that passes
+  done / failed — terminal; transient failures go back to queued with an
+            exponential backoff until ROAST_JOB_MAX_ATTEMPTS. A job no
+            worker has claimed after ROAST_JOB_UNCLAIMED_TIMEOUT is failed
+            by the poll endpoint (no roast_worker running?)
+
+    job = roast_jobs.claim()
+    if job:
+        roast_jobs.process(job)
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import circuit_breaker, metrics, quota, roast_cache
+from .gpt_client import roast_website
+from .logger import log_failure
+from .pinned_transport import BlockedHost
+from .scraper import scrape_website
+from ..models import RoastRequest
+
+CLAIM_BATCH = 10
+VISIBILITY_MARGIN = 15  # Seconds on top of the slowest possible job — DB writes, retries inside the LLM deadline
+
+# Failure codes — each maps to a visitor-facing message in views._ROAST_MESSAGES
+SITE_DOWN, OVERBOOKED, UNREACHABLE = "site_down", "overbooked", "unreachable"
+
+
+def failure_code(exc: Exception) -> str:
+    """What to tell the visitor about this exception (see views._ROAST_MESSAGES)."""
+    if isinstance(exc, circuit_breaker.CircuitOpenError) and not exc.name.startswith("groq"):
+        return SITE_DOWN
+    if isinstance(exc, (quota.QuotaExceeded, circuit_breaker.CircuitOpenError)):
+        return OVERBOOKED
+    return UNREACHABLE
+
+
+def _retryable(exc: Exception) -> bool:
+    # Our own SSRF/URL checks and 4xx answers won't change on a retry
+    if isinstance(exc, (BlockedHost, ValueError)):
+        return False
+    return circuit_breaker.counts_as_failure(exc) or isinstance(exc, (quota.QuotaExceeded, circuit_breaker.CircuitOpenError))
+
+
+def visibility() -> int:
+    """Seconds a claimed job stays locked — never shorter than the slowest job, or a live one gets claimed twice."""
+    if settings.ROAST_JOB_VISIBILITY:
+        return settings.ROAST_JOB_VISIBILITY
+    fetch = {**settings.CIRCUIT_BREAKER_DEFAULTS, **settings.CIRCUIT_BREAKERS.get("scraper", {})}["max_timeout"]
+    return math.ceil(fetch + settings.SCRAPER_MAX_SECONDS + settings.LLM_DEADLINE["roast"] + VISIBILITY_MARGIN)
+
+
+def _claimable(now):
+    return (
+        (Q(status=RoastRequest.QUEUED) & (Q(locked_until__isnull=True) | Q(locked_until__lte=now)))
+        | Q(status=RoastRequest.RUNNING, locked_until__lte=now)
+    ) & Q(attempts__lt=settings.ROAST_JOB_MAX_ATTEMPTS)
+
+
+def claim():
+    """Lock the oldest claimable job for this worker, or return None."""
+    now = timezone.now()
+    candidates = list(
+        RoastRequest.objects.filter(_claimable(now)).order_by("created_at").values_list("pk", flat=True)[:CLAIM_BATCH]
+    )
+    for pk in candidates:
+        won = RoastRequest.objects.filter(_claimable(now), pk=pk).update(
+            status=RoastRequest.RUNNING,
+            locked_until=now + timedelta(seconds=visibility()),
+            attempts=F("attempts") + 1,
+        )
+        if won:
+            return RoastRequest.objects.get(pk=pk)
+    return None
+
+
+def claimed_job(url: str, ip: str, key: str):
+    """A new, unsaved job already claimed by the caller (inline roasts, bulk_roast) — workers leave it alone."""
+    return RoastRequest(
+        url=url, ip_address=ip, url_key=key, status=RoastRequest.RUNNING, attempts=1,
+        locked_until=timezone.now() + timedelta(seconds=visibility()),
+    )
+
+
+def expire_abandoned() -> int:
+    """Fail jobs whose last allowed attempt died mid-run (nothing will claim them again)."""
+    return RoastRequest.objects.filter(
+        status=RoastRequest.RUNNING,
+        locked_until__lte=timezone.now(),
+        attempts__gte=settings.ROAST_JOB_MAX_ATTEMPTS,
+    ).update(status=RoastRequest.FAILED, failure=UNREACHABLE, locked_until=None)
+
+
+def expire_unclaimed(job) -> bool:
+    """Fail `job` if it has waited ROAST_JOB_UNCLAIMED_TIMEOUT without any worker claiming it. True if it did."""
+    cutoff = timezone.now() - timedelta(seconds=settings.ROAST_JOB_UNCLAIMED_TIMEOUT)
+    if job.status != RoastRequest.QUEUED or job.attempts or job.created_at > cutoff:
+        return False
+    expired = RoastRequest.objects.filter(pk=job.pk, status=RoastRequest.QUEUED, attempts=0).update(
+        status=RoastRequest.FAILED, failure=OVERBOOKED, locked_until=None, last_error="Never claimed by a roast_worker",
+    )
+    if not expired:
+        return False  # A worker claimed it just now
+    job.status, job.failure = RoastRequest.FAILED, OVERBOOKED
+    metrics.incr("roast_jobs.unclaimed")
+    log_failure("roast_jobs.expire_unclaimed", "Queued roast never claimed — is roast_worker running?",
+                {"url": job.url, "job": str(job.pk)})
+    return True
+
+
+def execute(job, before_llm=None) -> tuple:
+    """
+    Scrape + roast one job, reusing the roast cache. Fills the result fields
+    on `job` and returns (critique_html, update_fields). Raises on failure.
+    `before_llm()` runs right before a Groq call (bulk_roast paces them with it).
+    """
+    key = roast_cache.url_key(job.url)
+    cached = roast_cache.lookup(key)
+    if roast_cache.is_fresh(cached):
+        # Stored on this row too — the poll endpoint reads the job's own result
+        critique_html = roast_cache.decompress(cached.result_compressed)
+        fields = roast_cache.record(job, key, critique_html, cached.page_fingerprint)
+    else:
+        scraped = scrape_website(job.url)
+        page_fingerprint = roast_cache.fingerprint(scraped)
+        critique_html = roast_cache.reuse(cached, page_fingerprint)
+        if critique_html is None:
+            if before_llm:
+                before_llm()
+            critique_html = roast_website(scraped)
+        fields = roast_cache.record(job, key, critique_html, page_fingerprint)
+    job.status = RoastRequest.DONE
+    job.locked_until = None
+    job.failure = ""  # Left over from an earlier attempt; last_error stays for the audit trail
+    return critique_html, fields + ["status", "locked_until", "failure"]
+
+
+def process(job, before_llm=None):
+    """Run a claimed job and settle it: done, back to queued with backoff, or failed."""
+    try:
+        _, fields = execute(job, before_llm)
+        metrics.incr("roast_jobs.done")
+    except Exception as e:
+        job.failure = failure_code(e)
+        job.last_error = str(e)[:1000]
+        if _retryable(e) and job.attempts < settings.ROAST_JOB_MAX_ATTEMPTS:
+            delay = settings.ROAST_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.status = RoastRequest.QUEUED
+            job.locked_until = timezone.now() + timedelta(seconds=delay)
+            metrics.incr("roast_jobs.retried")
+        else:
+            job.status = RoastRequest.FAILED
+            job.locked_until = None
+            metrics.incr("roast_jobs.failed")
+            if job.failure == UNREACHABLE:
+                log_failure("roast_jobs.process", str(e), {"url": job.url, "job": str(job.pk)}, exc=e)
+        fields = ["failure", "last_error", "status", "locked_until"]
+    # Only settle the row if we still hold it — a job that outlived its lock may have been re-claimed
+    RoastRequest.objects.filter(pk=job.pk, attempts=job.attempts).update(
+        **{name: getattr(job, name) for name in fields}
+    )
+
+
+def stats() -> dict:
+    counts = dict(
+        RoastRequest.objects.filter(status__in=[RoastRequest.QUEUED, RoastRequest.RUNNING])
+        .order_by().values_list("status").annotate(n=Count("pk"))
+    )
+    return {
+        "queued": counts.get(RoastRequest.QUEUED, 0),
+        "running": counts.get(RoastRequest.RUNNING, 0),
+        **{name: metrics.get(f"roast_jobs.{name}") for name in ("done", "retried", "failed", "unclaimed")},
+    }
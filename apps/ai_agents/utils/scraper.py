@@ -1,55 +1,147 @@
-import socket
-import ipaddress
+import asyncio
+import time
+import httpx
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
 
-PRIVATE_RANGES = [
-    ipaddress.ip_network("10.0.0.0/8"),
-    ipaddress.ip_network("172.16.0.0/12"),
-    ipaddress.ip_network("192.168.0.0/16"),
-    ipaddress.ip_network("127.0.0.0/8"),
-    ipaddress.ip_network("169.254.0.0/16"),  # AWS metadata
-    ipaddress.ip_network("::1/128"),
-]
+from django.conf import settings
 
+from . import circuit_breaker, html_extract, http_cache, metrics, pinned_transport
+from .aio import loop_local
 
-def _is_private_ip(hostname: str) -> bool:
-    """DNS-resolve hostname and check if it resolves to a private range. Prevents DNS rebinding SSRF."""
+USER_AGENT = "DIGITALLY-Roaster/1.0 (+https://digitally.in/roast)"
+CHUNK_SIZE = 64 * 1024
+
+
+def _fetch(url: str, timeout: float, headers: dict = None) -> requests.Response:
+    """Headers only — the body is streamed by _read() so it can be capped."""
+    resp = pinned_transport.get(url, timeout, headers={"User-Agent": USER_AGENT, **(headers or {})})
     try:
-        resolved = socket.getaddrinfo(hostname, None)[0][4][0]
-        ip = ipaddress.ip_address(resolved)
-        return any(ip in net for net in PRIVATE_RANGES)
-    except Exception:
-        return True  # Fail closed — if we can't resolve, block it
+        resp.raise_for_status()
+    except requests.HTTPError:
+        resp.close()
+        raise
+    return resp
+
+
+def _accept(extractor, chunk: bytes, deadline: float, sink: bytearray = None) -> bool:
+    """Feed one chunk within SCRAPER_MAX_BYTES; False once we should stop reading."""
+    room = settings.SCRAPER_MAX_BYTES - extractor.bytes_seen
+    extractor.feed(chunk[:room])
+    if sink is not None:
+        sink += chunk[:room]  # Exactly what the extractor saw — replayed on a cache hit
+    return not (extractor.done or len(chunk) >= room or time.monotonic() > deadline)
+
+
+def _charset(resp):
+    return html_extract.charset_from_content_type(resp.headers.get("Content-Type"))
+
+
+def _sink():
+    metrics.incr("scraper_cache.misses")
+    return bytearray() if http_cache.enabled() else None
+
+
+def _replay(entry) -> dict:
+    return html_extract.extract(entry.body, entry.encoding)
+
+
+def _read(resp: requests.Response, sink: bytearray = None) -> dict:
+    extractor = html_extract.get_extractor(_charset(resp))
+    deadline = time.monotonic() + settings.SCRAPER_MAX_SECONDS
+    try:
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if not _accept(extractor, chunk, deadline, sink):
+                break
+    finally:
+        resp.close()  # Stop the download — whatever is left is never read
+    return extractor.result()
+
+
+_async_client = loop_local(lambda: pinned_transport.async_client(headers={"User-Agent": USER_AGENT}))
+
+
+async def _afetch(url: str, timeout: float, headers: dict = None) -> httpx.Response:
+    resp = await pinned_transport.aget(_async_client(), url, timeout, headers=headers)
+    try:
+        if resp.status_code != 304:  # Unlike requests, httpx raises on 3xx — but a 304 answers our conditional GET
+            resp.raise_for_status()
+    except httpx.HTTPStatusError:
+        await resp.aclose()
+        raise
+    return resp
+
+
+async def _aread(resp: httpx.Response, sink: bytearray = None) -> dict:
+    extractor = html_extract.get_extractor(_charset(resp))
+    deadline = time.monotonic() + settings.SCRAPER_MAX_SECONDS
+    try:
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            if not _accept(extractor, chunk, deadline, sink):
+                break
+    finally:
+        await resp.aclose()
+    return await asyncio.to_thread(extractor.result)  # Buffered backends parse here
 
 
 def scrape_website(url: str) -> dict:
-    """Scrape a website and return structured data for the roast engine."""
-    parsed = urlparse(url)
-    if parsed.scheme not in ("http", "https"):
-        raise ValueError("Only HTTP/HTTPS URLs are allowed.")
-    if _is_private_ip(parsed.hostname):
-        raise ValueError("Private/internal URLs are not allowed.")
-
-    resp = requests.get(
-        url,
-        timeout=8,
-        headers={"User-Agent": "DIGITALLY-Roaster/1.0 (+https://digitally.in/roast)"},
-        allow_redirects=True,
-    )
-    resp.raise_for_status()
-
-    soup = BeautifulSoup(resp.text, "html.parser")
-    # Remove nav, footer, scripts — get body copy only
-    for tag in soup(["script", "style", "nav", "footer", "header"]):
-        tag.decompose()
-
-    return {
-        "title": (soup.title.string or "").strip()[:200] if soup.title else "",
-        "meta_desc": (soup.find("meta", attrs={"name": "description"}) or {}).get("content", "")[:300],
-        "h1_tags": [h.get_text(strip=True) for h in soup.find_all("h1")[:3]],
-        "h2_tags": [h.get_text(strip=True) for h in soup.find_all("h2")[:5]],
-        "body_text": soup.get_text(separator=" ", strip=True)[:2000],
-        "has_cta": bool(soup.find("button") or soup.find("a", class_=lambda c: c and "cta" in c.lower())),
-    }
+    """
+    Scrape a website and return structured data for the roast engine.
+    Reads at most SCRAPER_MAX_BYTES / SCRAPER_MAX_SECONDS, and stops as soon
+    as the extractor has enough (see html_extract.py). Every address the host
+    (and each redirect hop) resolves to must be public — see pinned_transport.py.
+    Pages still fresh in the HTTP cache aren't fetched; stale ones are
+    revalidated with a conditional GET (see http_cache.py).
+    """
+    host = pinned_transport.check_url(url)
+    pinned_transport.resolve_public(host)  # Reject before the breaker counts a call
+
+    entry = http_cache.get(url)
+    if entry and entry.fresh:
+        entry.served_fresh()
+        return _replay(entry)
+
+    # One breaker per host: a dead site fails fast instead of holding a worker for the full timeout
+    breaker = circuit_breaker.get(f"scraper:{host}", "scraper")
+    if entry:
+        resp = breaker.call(_fetch, entry.final_url, headers=entry.validators())
+        if resp.status_code == 304:
+            resp.content  # No body — reading it hands the connection back to the pool
+            resp.close()
+            http_cache.revalidated(entry, resp.headers)
+            return _replay(entry)
+    else:
+        resp = breaker.call(_fetch, url)
+
+    sink = _sink()
+    data = _read(resp, sink)
+    if sink:
+        http_cache.store(url, resp.url, resp.headers, bytes(sink), _charset(resp))
+    return data
+
+
+async def ascrape_website(url: str) -> dict:
+    """Async scrape_website() — DNS, fetch and incremental parsing on the event loop."""
+    host = pinned_transport.check_url(url)
+    await pinned_transport.aresolve_public(host)
+
+    entry = await asyncio.to_thread(http_cache.get, url)
+    if entry and entry.fresh:
+        await asyncio.to_thread(entry.served_fresh)
+        return await asyncio.to_thread(_replay, entry)
+
+    breaker = circuit_breaker.get(f"scraper:{host}", "scraper")
+    if entry:
+        resp = await breaker.acall(_afetch, entry.final_url, headers=entry.validators())
+        if resp.status_code == 304:
+            await resp.aread()
+            await resp.aclose()
+            await asyncio.to_thread(http_cache.revalidated, entry, resp.headers)
+            return await asyncio.to_thread(_replay, entry)
+    else:
+        resp = await breaker.acall(_afetch, url)
+
+    sink = await asyncio.to_thread(_sink)
+    data = await _aread(resp, sink)
+    if sink:
+        await asyncio.to_thread(http_cache.store, url, str(resp.url), resp.headers, bytes(sink), _charset(resp))
+    return data
@@ -1,20 +1,25 @@
 import json
-from datetime import timedelta
+import time
 
-from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_protect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
 from django.core.validators import URLValidator
 from django.core.exceptions import ValidationError
-from django.core.cache import cache
-from django.utils import timezone
+from django.template.loader import render_to_string
 from django.conf import settings
-from groq import Groq
 
 from .models import RoastRequest
-from .utils.scraper import scrape_website
-from .utils.gpt_client import roast_website
+from .utils.scraper import ascrape_website
+from .utils.gpt_client import aroast_website
 from .utils.logger import log_failure
+from .utils.pinned_transport import BlockedHost
+from .utils.rate_limit import rate_limit, refund
+from .utils import (
+    chat_sessions, circuit_breaker, intent_router, llm_client, metrics, pinned_transport, prompt_budget, quota,
+    response_cache, roast_cache, roast_jobs,
+)
 
 
 # ──────────────────────────────────────────────
@@ -50,117 +55,394 @@ RULES:
 - Sound like a sharp human, not a bot.
 """.strip()
 
-_groq_client = None
+_CHAT_BUSY = "The assistant is busy right now — try again in a minute."
+_CHAT_DOWN = "The assistant is temporarily unavailable."
+def _prepare_chat(request, ip):
+    """
+    Front half shared by the sync and async chat views: the stored conversation, the local intent router,
+    the response cache and the Groq breaker/quota check.
+    Returns (body, messages, cache_key, conversation, None), or
+    (None, None, None, None, response) when the turn is answered without calling Groq.
+    """
+    body = json.loads(request.body)
+    user_message = body.get("message", "").strip()[:500]
 
+    if not user_message:
+        return None, None, None, None, JsonResponse({"error": "Empty message."}, status=400)
 
-def _get_groq_client():
-    global _groq_client
-    if _groq_client is None:
-        _groq_client = Groq(api_key=settings.GROQ_API_KEY)
-    return _groq_client
+    # History lives server-side (utils/chat_sessions.py); a client-sent "history" is ignored
+    conversation = chat_sessions.load(body.get("conversation_id"))
+    messages = conversation.prompt(SALES_SYSTEM_PROMPT, user_message)
+
+    # Stock questions (pricing, services, booking) are answered from SERVICES in-process
+    answer = intent_router.route(user_message, conversation.turns)
+    if answer:
+        conversation.record(answer.reply)
+        return None, None, None, None, JsonResponse(
+            {"reply": answer.reply, "intent": answer.intent, "conversation_id": conversation.id}
+        )
+
+    # Repeat questions skip the LLM (and its quota); streaming clients accept a plain JSON reply too
+    cache_key = response_cache.key_for(user_message, conversation.history, SALES_SYSTEM_PROMPT)
+    cached = response_cache.get(cache_key)
+    if cached:
+        conversation.record(cached)
+        return None, None, None, None, JsonResponse(
+            {"reply": cached, "cached": True, "conversation_id": conversation.id}
+        )
+
+    if not llm_client.available() or not quota.reserve("groq"):
+        return None, None, None, None, JsonResponse({"error": _CHAT_BUSY}, status=503)
+    return body, messages, cache_key, conversation, None
+
+
+_CHAT_PARAMS = {"max_tokens": 200, "temperature": 0.7}
+
+
+def _finish_chat(elapsed, response, messages, cache_key, conversation):
+    """Back half shared by the chat views: latency, token accounting, response cache and the stored turn."""
+    metrics.observe("chat.total", elapsed)
+    reply = response.choices[0].message.content
+    prompt_budget.record("chat", messages, response.usage)
+    response_cache.put(cache_key, reply, response.usage.total_tokens if response.usage else 0)
+    conversation.record(reply)
+    return JsonResponse({"reply": reply, "conversation_id": conversation.id})
+
+
+def _chat_limited(request, retry_after):
+    return JsonResponse({"error": "You've reached the chat limit. Email us at hello@digitally.in."}, status=429)
 
 
 @csrf_protect
 @require_POST
+@rate_limit("chat", denied=_chat_limited)
 def chat_view(request):
-    """AI Chatbot endpoint — rate-limited, CSRF-protected. Powered by Groq."""
+    """
+    AI Chatbot endpoint — rate-limited, CSRF-protected. Powered by Groq.
+    Send `"stream": true` to get the reply as SSE `token` events followed by a `done` event with usage.
+    Every reply carries a conversation_id; send it back with the next message instead of the history.
+    """
     ip = get_client_ip(request)
+    try:
+        body, messages, cache_key, conversation, early = _prepare_chat(request, ip)
+        if early:
+            return early
 
-    # Rate limit: 20 messages/IP/hour
-    rate_key = f"chat_rate_{ip}"
-    count = cache.get(rate_key, 0)
-    if count >= 20:
-        return JsonResponse(
-            {"error": "You've reached the chat limit. Email us at hello@digitally.in."},
-            status=429,
-        )
-    cache.set(rate_key, count + 1, timeout=3600)
+        if body.get("stream"):
+            return _event_stream(_stream_chat(messages, ip, cache_key, conversation))
 
-    try:
-        body = json.loads(request.body)
-        user_message = body.get("message", "").strip()[:500]
-        raw_history = body.get("history", [])
-
-        if not user_message:
-            return JsonResponse({"error": "Empty message."}, status=400)
-
-        # Sanitize history — only allow role/content keys, valid roles
-        safe_history = [
-            {"role": m["role"], "content": str(m["content"])[:1000]}
-            for m in raw_history[-8:]
-            if m.get("role") in ("user", "assistant") and m.get("content")
-        ]
-
-        messages = [
-            {"role": "system", "content": SALES_SYSTEM_PROMPT},
-            *safe_history,
-            {"role": "user", "content": user_message},
-        ]
-
-        client = _get_groq_client()
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            max_tokens=200,
-            temperature=0.7,
-        )
-        reply = response.choices[0].message.content
-        return JsonResponse({"reply": reply})
+        started = time.perf_counter()
+        response = llm_client.complete("chat", messages, **_CHAT_PARAMS)
+        return _finish_chat(time.perf_counter() - started, response, messages, cache_key, conversation)
 
+    except circuit_breaker.CircuitOpenError:
+        return JsonResponse({"error": _CHAT_BUSY}, status=503)
     except Exception as e:
         log_failure("chat_view", str(e), {"ip": ip}, exc=e)
-        return JsonResponse(
-            {"error": "The assistant is temporarily unavailable."},
-            status=500,
-        )
+        return JsonResponse({"error": _CHAT_DOWN}, status=500)
+
+
+@rate_limit("chat", denied=_chat_limited)
+async def achat_view(request):
+    """
+    Async chat_view() for ASGI — the Groq round trip awaits on the event loop
+    instead of holding a worker thread. CSRF is enforced by CsrfViewMiddleware.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    ip = get_client_ip(request)
+    try:
+        # Session, router, response cache and quota are cache round trips (Redis in production) — off the loop
+        body, messages, cache_key, conversation, early = await sync_to_async(_prepare_chat)(request, ip)
+        if early:
+            return early
+
+        if body.get("stream"):
+            return _event_stream(_astream_chat(messages, ip, cache_key, conversation))
+
+        started = time.perf_counter()
+        response = await llm_client.acomplete("chat", messages, **_CHAT_PARAMS)
+        return await sync_to_async(_finish_chat)(time.perf_counter() - started, response, messages, cache_key, conversation)
+
+    except circuit_breaker.CircuitOpenError:
+        return JsonResponse({"error": _CHAT_BUSY}, status=503)
+    except Exception as e:
+        log_failure("achat_view", str(e), {"ip": ip}, exc=e)
+        return JsonResponse({"error": _CHAT_DOWN}, status=500)
+
+
+def _event_stream(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Don't let nginx hold tokens back
+    return response
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def _chunk_delta(chunk):
+    return chunk.choices[0].delta.content if chunk.choices else None
+
+
+def _chunk_usage(chunk):
+    # Groq reports usage on the final chunk under x_groq
+    usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None)
+    return usage.to_dict() if usage else None
+
+
+def _done_event(started, first_token, usage, messages, cache_key, conversation, parts):
+    reply = "".join(parts)
+    prompt_budget.record("chat", messages, usage)
+    response_cache.put(cache_key, reply, (usage or {}).get("total_tokens", 0))
+    conversation.record(reply)
+    total = time.perf_counter() - started
+    metrics.observe("chat.total", total)
+    return _sse("done", {
+        "conversation_id": conversation.id,
+        "usage": usage,
+        "ttft_ms": round(first_token * 1000) if first_token is not None else None,
+        "total_ms": round(total * 1000),
+    })
+
+
+def _stream_chat(messages, ip, cache_key, conversation):
+    """
+    Relay Groq deltas as they arrive. Model fallback happens before the first
+    chunk; a failure mid-stream is recorded against that model's breaker.
+    """
+    started = time.perf_counter()
+    first_token = None
+    usage = None
+    stream = None
+    parts = []
+    try:
+        stream = llm_client.complete("chat", messages, stream=True, **_CHAT_PARAMS)
+        for chunk in stream:
+            delta = _chunk_delta(chunk)
+            if delta:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    metrics.observe("chat.ttft", first_token)
+                parts.append(delta)
+                yield _sse("token", {"t": delta})
+            usage = _chunk_usage(chunk) or usage
+    except circuit_breaker.CircuitOpenError:
+        yield _sse("error", {"error": _CHAT_BUSY})
+        return
+    except Exception as e:
+        log_failure("chat_view.stream", str(e), {"ip": ip}, exc=e)
+        yield _sse("error", {"error": _CHAT_DOWN})
+        return
+    finally:
+        if stream is not None:
+            stream.close()  # Client went away or we finished — release the upstream connection
+
+    yield _done_event(started, first_token, usage, messages, cache_key, conversation, parts)
+
+
+async def _astream_chat(messages, ip, cache_key, conversation):
+    """Async _stream_chat() over AsyncGroq."""
+    started = time.perf_counter()
+    first_token = None
+    usage = None
+    stream = None
+    parts = []
+    try:
+        stream = await llm_client.acomplete("chat", messages, stream=True, **_CHAT_PARAMS)
+        async for chunk in stream:
+            delta = _chunk_delta(chunk)
+            if delta:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                    await sync_to_async(metrics.observe)("chat.ttft", first_token)
+                parts.append(delta)
+                yield _sse("token", {"t": delta})
+            usage = _chunk_usage(chunk) or usage
+    except circuit_breaker.CircuitOpenError:
+        yield _sse("error", {"error": _CHAT_BUSY})
+        return
+    except Exception as e:
+        log_failure("achat_view.stream", str(e), {"ip": ip}, exc=e)
+        yield _sse("error", {"error": _CHAT_DOWN})
+        return
+    finally:
+        if stream is not None:
+            await stream.close()
+
+    yield await sync_to_async(_done_event)(started, first_token, usage, messages, cache_key, conversation, parts)
 
 
 # ──────────────────────────────────────────────
 # FEATURE 3 — "Roast My Site" Tool
 # ──────────────────────────────────────────────
+_ROAST_LIMITED = (
+    '<p class="text-[#FF6B00] text-sm">You\'ve used 3 roasts this hour. '
+    "Come back later — or just email us.</p>"
+)
+_ROAST_BAD_URL = '<p class="text-red-400 text-sm">Enter a valid URL (include https://).</p>'
+_ROAST_SITE_DOWN = (
+    '<p class="text-red-400 text-sm">That site isn\'t responding right now. '
+    'Try again later or <a href="#contact" class="text-[#FF6B00] underline">contact us directly</a>.</p>'
+)
+_ROAST_OVERBOOKED = (
+    '<p class="text-[#FF6B00] text-sm">Our roaster is overbooked right now. '
+    "Try again in a few minutes — or just email us.</p>"
+)
+_ROAST_FAILED = (
+    '<p class="text-red-400 text-sm">We couldn\'t reach that site — it may be blocking scrapers. '
+    'Try another URL or <a href="#contact" class="text-[#FF6B00] underline">contact us directly</a>.</p>'
+)
+
+
+def _roast_limited(request, retry_after):
+    return HttpResponse(_ROAST_LIMITED)  # 200 so htmx swaps the message in
+
+
+def _valid_url(url) -> bool:
+    try:
+        URLValidator(schemes=["http", "https"])(url)
+        return True
+    except ValidationError:
+        return False
+
+
+_ROAST_MESSAGES = {
+    roast_jobs.SITE_DOWN: _ROAST_SITE_DOWN,
+    roast_jobs.OVERBOOKED: _ROAST_OVERBOOKED,
+    roast_jobs.UNREACHABLE: _ROAST_FAILED,
+}
+
+
+def _roast_result(critique_html):
+    return HttpResponse(render_to_string("partials/_roast_result.html", {"critique_html": critique_html}))
+
+
+def _roast_pending(job, status=200):
+    """Polling fragment — it re-requests itself until the job settles, then the result swaps in."""
+    return HttpResponse(
+        render_to_string("partials/_roast_pending.html", {"job": job, "poll_interval": settings.ROAST_POLL_INTERVAL}),
+        status=status,
+    )
+
+
+def _roast_failed(e):
+    return HttpResponse(_ROAST_MESSAGES[roast_jobs.failure_code(e)])
+
+
+def _fresh_roast(url, ip, key, cached):
+    """Serve a recent critique of the same page straight from the DB — no job, no scrape."""
+    roast_obj = RoastRequest(url=url, ip_address=ip, status=RoastRequest.DONE)
+    critique_html = roast_cache.decompress(cached.result_compressed)
+    roast_cache.record(roast_obj, key, critique_html, cached.page_fingerprint, store=False)
+    return roast_obj, critique_html
+
+
 @csrf_protect
 @require_POST
+@rate_limit("roast", denied=_roast_limited)
 def roast_view(request):
-    """Website roast endpoint — rate-limited, CSRF-protected, SSRF-safe."""
+    """
+    Website roast endpoint — rate-limited, CSRF-protected, SSRF-safe, cached per canonical URL.
+    Queues a job and answers 202 with a polling fragment; `manage.py roast_worker` does the work.
+    """
     url = request.POST.get("url", "").strip()
     ip = get_client_ip(request)
 
-    # Rate limit: 3 roasts/IP/hour (DB-tracked for audit)
-    one_hour_ago = timezone.now() - timedelta(hours=1)
-    recent_count = RoastRequest.objects.filter(
-        ip_address=ip, created_at__gte=one_hour_ago
-    ).count()
-    if recent_count >= 3:
-        return HttpResponse(
-            '<p class="text-[#FF6B00] text-sm">You\'ve used 3 roasts this hour. '
-            "Come back later — or just email us.</p>"
-        )
+    if not _valid_url(url):
+        refund(request)  # Rejected before any work — doesn't count against the visitor's roasts
+        return HttpResponse(_ROAST_BAD_URL)
+
+    key = roast_cache.url_key(url)
+    cached = roast_cache.lookup(key)
+    if roast_cache.is_fresh(cached):
+        roast_obj, critique_html = _fresh_roast(url, ip, key, cached)
+        roast_obj.save()
+        return _roast_result(critique_html)
 
-    validator = URLValidator(schemes=["http", "https"])
     try:
-        validator(url)
-    except ValidationError:
-        return HttpResponse(
-            '<p class="text-red-400 text-sm">Enter a valid URL (include https://).</p>'
-        )
+        pinned_transport.resolve_public(pinned_transport.check_url(url))  # Cached — the scrape reuses it
+    except BlockedHost:
+        refund(request)
+        return HttpResponse(_ROAST_FAILED)
 
-    roast_obj = RoastRequest.objects.create(url=url, ip_address=ip)
+    if settings.ROAST_USE_QUEUE:
+        job = RoastRequest.objects.create(url=url, ip_address=ip, url_key=key)
+        return _roast_pending(job, status=202)
+
+    job = roast_jobs.claimed_job(url, ip, key)
+    job.save()
     try:
-        scraped = scrape_website(url)
-        critique_html = roast_website(scraped)
-        roast_obj.was_successful = True
-        roast_obj.result_preview = critique_html[:200]
-        roast_obj.save(update_fields=["was_successful", "result_preview"])
-
-        return HttpResponse(
-            f'<div class="bg-[#0A0A0A] border border-white/10 rounded-2xl p-8 text-sm '
-            f'text-[#E0E0E0] leading-relaxed roast-output">'
-            f'<div class="overflow-x-auto">{critique_html}</div>'
-            f'</div>'
-        )
+        critique_html, fields = roast_jobs.execute(job)
+        job.save(update_fields=fields)
+        return _roast_result(critique_html)
     except Exception as e:
-        log_failure("roast_view", str(e), {"url": url, "ip": ip}, exc=e)
-        return HttpResponse(
-            '<p class="text-red-400 text-sm">We couldn\'t reach that site — it may be blocking scrapers. '
-            'Try another URL or <a href="#contact" class="text-[#FF6B00] underline">contact us directly</a>.</p>'
-        )
+        job.status, job.failure, job.last_error = RoastRequest.FAILED, roast_jobs.failure_code(e), str(e)[:1000]
+        job.save(update_fields=["status", "failure", "last_error"])
+        if job.failure == roast_jobs.UNREACHABLE:
+            log_failure("roast_view", str(e), {"url": url, "ip": ip}, exc=e)
+        return _roast_failed(e)
+
+
+@rate_limit("roast", denied=_roast_limited)
+async def aroast_view(request):
+    """Async roast_view() for ASGI — scrape and LLM call await; DB access goes through the async ORM."""
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    url = request.POST.get("url", "").strip()
+    ip = get_client_ip(request)
+
+    if not _valid_url(url):
+        await sync_to_async(refund)(request)
+        return HttpResponse(_ROAST_BAD_URL)
+
+    key = roast_cache.url_key(url)
+    cached = await roast_cache.alookup(key)
+    if await sync_to_async(roast_cache.is_fresh)(cached):
+        roast_obj, critique_html = _fresh_roast(url, ip, key, cached)
+        await roast_obj.asave()
+        return _roast_result(critique_html)
+
+    try:
+        await pinned_transport.aresolve_public(pinned_transport.check_url(url))
+    except BlockedHost:
+        await sync_to_async(refund)(request)
+        return HttpResponse(_ROAST_FAILED)
+
+    if settings.ROAST_USE_QUEUE:
+        job = await RoastRequest.objects.acreate(url=url, ip_address=ip, url_key=key)
+        return _roast_pending(job, status=202)
+
+    job = roast_jobs.claimed_job(url, ip, key)
+    await job.asave()
+    try:
+        scraped = await ascrape_website(url)
+        page_fingerprint = roast_cache.fingerprint(scraped)
+        critique_html = await sync_to_async(roast_cache.reuse)(cached, page_fingerprint) or await aroast_website(scraped)
+        fields = roast_cache.record(job, key, critique_html, page_fingerprint)
+        job.status, job.locked_until = RoastRequest.DONE, None
+        await job.asave(update_fields=fields + ["status", "locked_until"])
+        return _roast_result(critique_html)
+    except Exception as e:
+        job.status, job.failure, job.last_error = RoastRequest.FAILED, roast_jobs.failure_code(e), str(e)[:1000]
+        await job.asave(update_fields=["status", "failure", "last_error"])
+        if job.failure == roast_jobs.UNREACHABLE:
+            log_failure("aroast_view", str(e), {"url": url, "ip": ip}, exc=e)
+        return _roast_failed(e)
+
+
+@require_GET
+def roast_status(request, job_id):
+    """Polled by the pending fragment: same fragment while queued/running, then the result or the error."""
+    job = RoastRequest.objects.filter(pk=job_id).only(
+        "url", "status", "failure", "result_compressed", "attempts", "created_at"
+    ).first()
+    if job is None:
+        return HttpResponse(_ROAST_FAILED)  # 200 so htmx swaps it in and the polling stops
+    if job.status == RoastRequest.DONE and job.result_compressed:
+        return _roast_result(roast_cache.decompress(job.result_compressed))
+    roast_jobs.expire_unclaimed(job)  # Stops the polling when no worker is there to run it
+    if job.status == RoastRequest.FAILED:
+        return HttpResponse(_ROAST_MESSAGES.get(job.failure, _ROAST_FAILED))
+    return _roast_pending(job)
@@ -0,0 +1,9 @@
+"""
+Command Center flags — injected into every template via context processor.
+"""
+from django.conf import settings
+
+
+def live_stream_context(request):
+    """Whether command_center.js should open the /widgets/stream/ EventSource."""
+    return {"LIVE_STREAM_ENABLED": settings.LIVE_STREAM_ENABLED}
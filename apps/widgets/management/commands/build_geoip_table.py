@@ -0,0 +1,43 @@
+import csv
+import ipaddress
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.widgets.utils.geoip import write_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the offline GeoIP table from a CSV of IP ranges "
+        "(e.g. DB-IP 'IP to City Lite': ip_start, ip_end, ..., latitude, longitude)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--output", default=str(settings.GEOIP_TABLE_PATH))
+        parser.add_argument("--lat-col", type=int, default=-2, help="Latitude column index (default: second to last)")
+        parser.add_argument("--lon-col", type=int, default=-1, help="Longitude column index (default: last)")
+
+    def handle(self, *args, **options):
+        rows, skipped = [], 0
+        try:
+            with open(options["csv_path"], newline="", encoding="utf-8") as f:
+                for record in csv.reader(f):
+                    try:
+                        start, end = ipaddress.ip_address(record[0]), ipaddress.ip_address(record[1])
+                        lat, lon = float(record[options["lat_col"]]), float(record[options["lon_col"]])
+                    except (ValueError, IndexError):
+                        skipped += 1  # Header row or malformed line
+                        continue
+                    if start.version != 4:
+                        skipped += 1
+                        continue
+                    rows.append((int(start), int(end), lat, lon))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        count = write_table(rows, options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {count} IPv4 ranges to {options['output']} ({skipped} rows skipped)."
+        ))
@@ -5,4 +5,5 @@ app_name = "widgets"
 
 urlpatterns = [
     path("live/", views.live_widgets, name="live"),
+    path("stream/", views.live_stream, name="stream"),
 ]
@@ -0,0 +1,110 @@
+"""
+Offline IPv4 → coordinate lookup from a compact, sorted range table.
+
+Table layout (little-endian), built by `manage.py build_geoip_table`:
+  header  b"DGIP" | version u32 | count u32
+  records count × (start u32, end u32, lat f32, lon f32) — 16 bytes each, sorted by start
+
+The file is mmap'd read-only and bisected in place, so lookups make no
+network calls, the OS shares the pages between workers, and only the pages a
+search touches are resident. ~22 probes cover 4M ranges.
+"""
+import ipaddress
+import mmap
+import struct
+import sys
+import threading
+from bisect import bisect_right
+
+from django.conf import settings
+
+from apps.ai_agents.utils.logger import log_failure
+
+MAGIC = b"DGIP"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+_RECORD = struct.Struct("<IIff")
+_START = struct.Struct("<I")
+_NATIVE_LE = sys.byteorder == "little"
+
+
+class GeoIPTable:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a v{VERSION} GeoIP table")
+        if len(self._mm) < _HEADER.size + self.count * _RECORD.size:
+            raise ValueError(f"{path} is truncated")
+        # Strided u32 view over every record's start, so bisect runs in C without copying the table
+        self._view = self._starts = None
+        if _NATIVE_LE:
+            self._view = memoryview(self._mm)[:_HEADER.size + self.count * _RECORD.size].cast("I")
+            self._starts = self._view[3::4]
+
+    def lookup_int(self, ip: int):
+        """(lat, lon) for an IPv4 address as an int, or None if no range covers it."""
+        mm, base, size = self._mm, _HEADER.size, _RECORD.size
+        if self._starts is not None:
+            lo = bisect_right(self._starts, ip)  # Index after the last record whose start <= ip
+        else:
+            lo, hi = 0, self.count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if _START.unpack_from(mm, base + mid * size)[0] <= ip:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        if lo == 0:
+            return None
+        start, end, lat, lon = _RECORD.unpack_from(mm, base + (lo - 1) * size)
+        return (round(lat, 4), round(lon, 4)) if ip <= end else None
+
+    def lookup(self, ip: str):
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if addr.version != 4 or not addr.is_global:
+            return None  # IPv6 isn't in the table; private/loopback addresses have no location
+        return self.lookup_int(int(addr))
+
+    def close(self):
+        # Release every view over the mmap first, or close() raises BufferError while one is still exported
+        if self._starts is not None:
+            self._starts.release()
+            self._view.release()
+        self._mm.close()
+
+
+def write_table(rows, path: str) -> int:
+    """Write (start, end, lat, lon) rows — ints and floats — as a sorted table. Returns the record count."""
+    rows = rows if isinstance(rows, list) else list(rows)
+    rows.sort()
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(rows)))
+        for row in rows:
+            f.write(_RECORD.pack(*row))
+    return len(rows)
+
+
+_table = None
+_table_lock = threading.Lock()
+_unavailable = False
+
+
+def lookup(ip: str):
+    """(lat, lon) for a client IP using settings.GEOIP_TABLE_PATH, or None. Never raises."""
+    global _table, _unavailable
+    if _table is None and not _unavailable:
+        with _table_lock:
+            if _table is None and not _unavailable:
+                try:
+                    _table = GeoIPTable(settings.GEOIP_TABLE_PATH)
+                except (OSError, ValueError) as e:
+                    _unavailable = True  # Don't retry the open on every request
+                    log_failure("geoip table", str(e), {"path": str(settings.GEOIP_TABLE_PATH)})
+    if _table is None or not ip:
+        return None
+    return _table.lookup(ip)
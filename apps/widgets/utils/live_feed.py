@@ -0,0 +1,109 @@
+"""
+One shared snapshot producer per worker for the Command Center SSE stream.
+
+A single daemon thread rebuilds the versioned panels (see panels.py) every
+LIVE_STREAM_INTERVAL seconds while at least one client is connected, so N open
+streams cost one refresh cycle instead of N. The combined panel version
+doubles as the SSE event id — a client reconnecting with a matching
+Last-Event-ID (on any worker) is not sent the same snapshot again.
+
+WSGI streams block in wait_for_change(); ASGI streams await
+await_change(), which parks a future on the event loop instead of a thread.
+"""
+import asyncio
+import threading
+import time
+
+from apps.ai_agents.utils.logger import log_failure
+from .panels import combined_version
+
+
+class SnapshotFeed:
+    def __init__(self, build, interval: float):
+        self._build = build
+        self._interval = interval
+        self._cond = threading.Condition()
+        self._thread = None
+        self._subscribers = 0
+        self._waiters = set()  # (loop, future) of ASGI streams parked in await_change()
+        self.event_id = None
+        self.panels = {}
+
+    # ── subscriber bookkeeping ──
+    def subscribe(self):
+        with self._cond:
+            self._subscribers += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="widgets-live-feed", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers = max(self._subscribers - 1, 0)
+
+    @property
+    def subscribers(self) -> int:
+        return self._subscribers
+
+    # ── producer ──
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._subscribers == 0:
+                    self._thread = None
+                    return  # Nobody is listening — stop spending upstream calls
+            try:
+                self._publish(self._build())
+            except Exception as e:
+                log_failure("widgets live feed", str(e), exc=e)
+            time.sleep(self._interval)
+
+    def _publish(self, panels: dict):
+        event_id = combined_version(panels)
+        with self._cond:
+            if event_id != self.event_id:
+                self.event_id, self.panels = event_id, panels
+                self._cond.notify_all()
+                for loop, future in self._waiters:
+                    try:
+                        loop.call_soon_threadsafe(_wake, future)
+                    except RuntimeError:
+                        pass  # That loop has closed; its stream is gone
+
+    # ── consumer ──
+    def wait_for_change(self, seen_id, timeout: float):
+        """Block until a snapshot other than `seen_id` is available. Returns (event_id, panels) or None on timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.event_id is not None and self.event_id != seen_id, timeout=timeout)
+            if self.event_id is None or self.event_id == seen_id:
+                return None
+            return self.event_id, self.panels
+
+    async def await_change(self, seen_id, timeout: float):
+        """wait_for_change() for the event loop — same contract, no thread held while waiting."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self.event_id is not None and self.event_id != seen_id:
+                return self.event_id, self.panels
+            waiter = (loop, loop.create_future())
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait({waiter[1]}, timeout=timeout)
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+        with self._cond:
+            if self.event_id is None or self.event_id == seen_id:
+                return None
+            return self.event_id, self.panels
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def format_event(event_id: str, event: str, payload: str) -> str:
+    """Serialize one SSE message; multi-line payloads need a `data:` prefix per line."""
+    data = "\n".join(f"data: {line}" for line in payload.splitlines() or [""])
+    return f"id: {event_id}\nevent: {event}\n{data}\n\n"
@@ -0,0 +1,118 @@
+"""
+Stale-while-revalidate market snapshots, shared through the Django cache.
+
+Each instrument has these keys:
+  widgets:market:<id>            — latest snapshot, kept for MARKET_SNAPSHOT_STALE_TTL
+  widgets:market:<id>:last_good  — last successful quote, never expires
+  widgets:market:<id>:refresh    — refresh lock (cache.add), so only one refresh runs per instrument
+  widgets:market:<id>:backoff    — set after a failed refresh
+
+Readers always get whatever is cached right away. Instruments whose snapshot
+is older than MARKET_SNAPSHOT_FRESH_TTL are refreshed together in one
+background provider.get_quotes() call; failures keep the last good copy and
+back off for MARKET_REFRESH_BACKOFF seconds. Background refreshes stop while
+the provider's quota budget is degraded (see quota.py).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.ai_agents.utils import quota
+from apps.ai_agents.utils.logger import log_failure
+from . import tick_history
+from .providers import get_provider
+
+REFRESH_LOCK_TIMEOUT = 30  # seconds — longer than any single upstream call
+
+
+def _key(instrument_id: str, suffix: str = "") -> str:
+    return f"widgets:market:{instrument_id}{':' + suffix if suffix else ''}"
+
+
+def placeholder(m: dict) -> dict:
+    """Fallback card used when an instrument's quote is unavailable."""
+    return {
+        "id": m["id"], "label": m["label"], "sector": m["sector"],
+        "price_fmt": "---", "change_abs": "0.00", "up": True,
+    }
+
+
+def _to_item(m: dict, quote: dict, now: float) -> dict:
+    """Format a quote for the panels, filling change/range/sparkline from the instrument's tick history."""
+    ring = tick_history.record(m["id"], now, quote["price"])
+    change = quote["change_pct"]
+    if change is None:
+        change = ring.change_pct(now)  # e.g. crypto: the exchange-rate endpoint has no change figure
+    day_range = ring.intraday_range(now)
+    return {
+        "id": m["id"], "label": m["label"], "sector": m["sector"],
+        "price": quote["price"], "change_pct": change,
+        "price_fmt": f"{quote['price']:,.2f}",
+        "change_abs": f"{abs(change or 0):.2f}", "up": (change or 0) >= 0,
+        "low_fmt": f"{day_range[0]:,.2f}" if day_range else "",
+        "high_fmt": f"{day_range[1]:,.2f}" if day_range else "",
+        "spark": ring.sparkline(now),
+    }
+
+
+def refresh(instruments: list, executor=None) -> dict:
+    """
+    Fetch every instrument whose refresh lock we win in one provider call, fanned out on `executor`.
+    Returns {id: item} for the instruments that were refreshed successfully.
+    """
+    locked = [m for m in instruments if cache.add(_key(m["id"], "refresh"), 1, timeout=REFRESH_LOCK_TIMEOUT)]
+    if not locked:
+        return {}  # Other workers are already refreshing all of them
+    try:
+        quotes = get_provider().get_quotes(locked, executor)
+    except quota.QuotaExceeded:
+        quotes = {}
+    except Exception as e:
+        log_failure("market snapshot refresh", str(e), {"instruments": [m["id"] for m in locked]})
+        quotes = {}
+    finally:
+        cache.delete_many([_key(m["id"], "refresh") for m in locked])
+
+    now = time.time()
+    items, records = {}, {}
+    for m in locked:
+        quote = quotes.get(m["id"])
+        if quote is None:
+            cache.set(_key(m["id"], "backoff"), 1, timeout=settings.MARKET_REFRESH_BACKOFF)
+            continue
+        items[m["id"]] = _to_item(m, quote, now)
+        records[m["id"]] = {"item": items[m["id"]], "fetched_at": now}
+
+    if records:
+        cache.set_many({_key(i): r for i, r in records.items()}, timeout=settings.MARKET_SNAPSHOT_STALE_TTL)
+        cache.set_many({_key(i, "last_good"): r for i, r in records.items()}, timeout=None)
+    return items
+
+
+def get_items(instruments: list, executor) -> list:
+    """
+    Return one item per instrument (placeholder where nothing is cached), revalidating in the background.
+    Only instruments with no snapshot and no last-good copy are fetched inline.
+    """
+    keys = [_key(m["id"], s) for m in instruments for s in ("", "last_good", "refresh", "backoff")]
+    cached = cache.get_many(keys)
+
+    items, stale, cold = {}, [], []
+    for m in instruments:
+        record = cached.get(_key(m["id"])) or cached.get(_key(m["id"], "last_good"))
+        busy = _key(m["id"], "refresh") in cached or _key(m["id"], "backoff") in cached
+        if record is not None:
+            items[m["id"]] = record["item"]
+            if time.time() - record["fetched_at"] >= settings.MARKET_SNAPSHOT_FRESH_TTL and not busy:
+                stale.append(m)
+        elif not busy:
+            cold.append(m)
+
+    if cold:
+        items.update(refresh(cold, executor))
+    # Budget nearly spent? Skip the refresh and keep serving the cached snapshot.
+    if stale and not quota.degraded(get_provider().name):
+        executor.submit(refresh, stale, executor)
+
+    return [items.get(m["id"]) or placeholder(m) for m in instruments]
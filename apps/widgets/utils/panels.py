@@ -0,0 +1,114 @@
+"""
+Versioned Command Center panels.
+
+Every panel (ticker, market grid, weather, intel grid) is identified by a hash
+of the data it renders. Rendered HTML is cached per (panel, version), so an
+unchanged panel is never re-rendered, and clients that echo back the versions
+they already have only receive the panels that changed.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+RENDER_CACHE_TTL = 60 * 60  # seconds — versions are content hashes, so stale entries are never wrong
+
+# Panel name -> DOM id of the element its fragment swaps into
+PANEL_TARGETS = {
+    "ticker": "ticker-move-target",
+    "market": "panel-market-grid",
+    "weather": "panel-weather-big",
+    "intel": "panel-intel-grid",
+}
+
+
+def version_of(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+def render_ticker(items) -> str:
+    """Ticker strip — the item run is rendered once and repeated so the CSS marquee loops seamlessly."""
+    html = ""
+    for m in items:
+        color = "text-green-400" if m["up"] else "text-red-400"
+        html += f"""
+        <span class="inline-flex items-center gap-1.5 px-6 border-r border-white/5 text-[11px] tracking-wide">
+          <span class="text-[#666] uppercase">{m['label']}</span>
+          <span class="text-[#ddd] font-medium">{m['price_fmt']}</span>
+          <span class="{color} flex items-center gap-0.5 font-bold">
+            <svg width="8" height="8" viewBox="0 0 10 10" fill="none"><path d="{'M5 1 L9 7 L1 7 Z' if m['up'] else 'M5 9 L9 3 L1 3 Z'}" fill="currentColor"/></svg>
+            {m['change_abs']}%
+          </span>
+        </span>
+        """
+    return html * 2
+
+
+def _oob(panel: str, version: str, inner: str) -> str:
+    return f'<div id="{PANEL_TARGETS[panel]}" hx-swap-oob="innerHTML" data-version="{version}">{inner}</div>'
+
+
+def _render(panel: str, data) -> str:
+    if panel == "ticker":
+        return render_ticker(data)
+    if panel == "market":
+        return render_to_string("partials/_command_market_grid.html", {"mkts": data})
+    if panel == "intel":
+        return render_to_string("partials/_command_intel_grid.html", {"intel": data})
+    if panel == "weather":
+        return render_to_string("partials/_command_weather_big.html", {"weather": data["weather"]})
+    raise ValueError(f"Unknown panel: {panel}")
+
+
+def _weather_bar(data) -> str:
+    """Command-bar weather readout, shipped alongside the weather panel."""
+    weather = data["weather"]
+    html = (
+        f'<span id="bar-weather-icon" hx-swap-oob="innerHTML">{weather["icon_emoji"]}</span>'
+        f'<span id="bar-weather-temp" hx-swap-oob="innerHTML">{weather["temp"]}</span>'
+        f'<div id="bar-weather-desc" hx-swap-oob="innerHTML">{weather["description"]}</div>'
+    )
+    # Only name the city when it came from the visitor's location, not the fallback
+    if data.get("show_city"):
+        html += f'<span id="bar-weather-city" hx-swap-oob="innerHTML">{weather["city"]}</span>'
+    return html
+
+
+def build(data_by_panel: dict) -> dict:
+    """Return {panel: (version, oob_html)}, rendering only versions not already in the cache."""
+    panels = {}
+    for panel, data in data_by_panel.items():
+        version = version_of(data)
+        key = f"widgets:panel:{panel}:{version}"
+        html = cache.get(key)
+        if html is None:
+            html = _oob(panel, version, _render(panel, data))
+            if panel == "weather":
+                html += _weather_bar(data)
+            cache.set(key, html, timeout=RENDER_CACHE_TTL)
+        panels[panel] = (version, html)
+    return panels
+
+
+def combined_version(panels: dict) -> str:
+    return version_of({name: version for name, (version, _) in panels.items()})
+
+
+def changed(panels: dict, known: dict) -> str:
+    """Concatenated fragments for panels whose version differs from what the client already has."""
+    return "".join(html for name, (version, html) in panels.items() if known.get(name) != version)
+
+
+def parse_versions(raw: str) -> dict:
+    """Parse the `X-Panel-Versions` request header: "ticker=ab12,market=cd34"."""
+    known = {}
+    for part in (raw or "").split(","):
+        name, _, version = part.strip().partition("=")
+        if name in PANEL_TARGETS and version:
+            known[name] = version
+    return known
+
+
+def format_versions(panels: dict) -> str:
+    return ",".join(f"{name}={version}" for name, (version, _) in panels.items())
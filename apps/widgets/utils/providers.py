@@ -0,0 +1,171 @@
+"""
+Market-data providers for the Command Center.
+
+A provider turns a list of instruments (settings.MARKET_INSTRUMENTS) into
+quotes with one bulk call where the upstream supports it:
+
+    provider = get_provider()
+    provider.get_quotes(instruments, executor)  # -> {"sp500": {"price": 512.34, "change_pct": 0.84}, ...}
+
+`executor` is the caller's bounded pool (live_widgets' shared one); providers
+that fan out use it rather than starting threads of their own.
+Instruments missing from the result are treated as failed by market_cache.
+`change_pct` may be None when the upstream cannot supply it cheaply.
+Select the implementation with settings.MARKET_DATA_PROVIDER (dotted path).
+"""
+import hashlib
+import math
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from apps.ai_agents.utils import circuit_breaker, quota
+from apps.ai_agents.utils.logger import log_failure
+
+
+class MarketDataProvider:
+    """Interface — subclasses implement get_quotes()."""
+
+    name = "base"
+
+    def get_quotes(self, instruments: list, executor=None) -> dict:
+        raise NotImplementedError
+
+
+class AlphaVantageProvider(MarketDataProvider):
+    """
+    Alpha Vantage. Stocks/ETFs go through REALTIME_BULK_QUOTES (one call for up to
+    100 symbols, premium plans) when ALPHA_VANTAGE_BULK_QUOTES is on, otherwise
+    GLOBAL_QUOTE per symbol in parallel. Crypto has no bulk endpoint, so each pair
+    is one CURRENCY_EXCHANGE_RATE call, which carries no change figure.
+    """
+
+    name = "alpha_vantage"
+    BULK_LIMIT = 100
+
+    def get_quotes(self, instruments: list, executor=None) -> dict:
+        stocks = [m for m in instruments if m["sector"] != "Crypto"]
+        crypto = [m for m in instruments if m["sector"] == "Crypto"]
+
+        # Every upstream request for this refresh runs in parallel on the caller's pool: bulk batches and single quotes alike
+        if settings.ALPHA_VANTAGE_BULK_QUOTES:
+            calls = [(self._bulk_quotes, stocks[i:i + self.BULK_LIMIT]) for i in range(0, len(stocks), self.BULK_LIMIT)]
+            calls += [(self._single_quote, m) for m in crypto]
+        else:
+            calls = [(self._single_quote, m) for m in stocks + crypto]
+        if not calls:
+            return {}
+
+        quotes = {}
+        for result in self._run_all(calls, executor):
+            quotes.update(result)
+        return quotes
+
+    def _run_all(self, calls: list, executor) -> list:
+        """
+        Run calls on the shared pool, with this thread taking the first one.
+        Calls still queued when we get to them (pool saturated) run here too:
+        this thread is usually a pool worker itself, so waiting on work queued
+        behind it could deadlock the pool.
+        """
+        if executor is None or len(calls) == 1:
+            return [self._safe(*call) for call in calls]
+        futures = [executor.submit(self._safe, *call) for call in calls[1:]]
+        results = [self._safe(*calls[0])]
+        for future, call in zip(futures, calls[1:]):
+            results.append(self._safe(*call) if future.cancel() else future.result())
+        return results
+
+    def _safe(self, fetch, arg) -> dict:
+        try:
+            return fetch(arg)
+        except (quota.QuotaExceeded, circuit_breaker.CircuitOpenError):
+            return {}
+        except Exception as e:
+            log_failure("AlphaVantage error", str(e), {"request": arg})
+            return {}
+
+    def _get(self, params: dict) -> dict:
+        return circuit_breaker.get("alpha_vantage").call(self._request, params)
+
+    def _request(self, params: dict, timeout: float) -> dict:
+        if not quota.reserve("alpha_vantage"):
+            raise quota.QuotaExceeded("alpha_vantage")
+        params = {**params, "apikey": settings.ALPHA_VANTAGE_API_KEY}
+        r = requests.get(settings.ALPHA_VANTAGE_BASE_URL, params=params, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def _bulk_quotes(self, stocks: list) -> dict:
+        by_symbol = {m["ticker"]: m for m in stocks}
+        payload = self._get({"function": "REALTIME_BULK_QUOTES", "symbol": ",".join(by_symbol)})
+        rows = payload.get("data")
+        if not rows:
+            raise ValueError(f"No data: {str(payload)[:200]}")
+        quotes = {}
+        for row in rows:
+            m = by_symbol.get(row.get("symbol"))
+            if m is not None:
+                quotes[m["id"]] = {
+                    "price": float(row["close"]),
+                    "change_pct": float(str(row.get("change_percent", "0")).replace("%", "")),
+                }
+        return quotes
+
+    def _single_quote(self, m: dict) -> dict:
+        if m["sector"] == "Crypto":
+            payload = self._get({"function": "CURRENCY_EXCHANGE_RATE", "from_currency": m["ticker"], "to_currency": "USD"})
+            d = payload.get("Realtime Currency Exchange Rate", {})
+            if not d:
+                raise ValueError(f"No data: {str(payload)[:200]}")
+            return {m["id"]: {"price": float(d["5. Exchange Rate"]), "change_pct": None}}
+
+        payload = self._get({"function": "GLOBAL_QUOTE", "symbol": m["ticker"]})
+        d = payload.get("Global Quote", {})
+        if not d:
+            raise ValueError(f"No data: {str(payload)[:200]}")
+        return {m["id"]: {
+            "price": float(d["05. price"]),
+            "change_pct": float(d.get("10. change percent", "0").replace("%", "")),
+        }}
+
+
+class StubMarketProvider(MarketDataProvider):
+    """
+    Deterministic offline quotes for tests and load benchmarks — no network, no quota.
+    Prices drift along a slow sine wave seeded by the ticker, so repeated calls
+    within a minute return identical numbers. MARKET_STUB_DELAY simulates upstream latency.
+    """
+
+    name = "stub"
+
+    def get_quotes(self, instruments: list, executor=None) -> dict:
+        delay = getattr(settings, "MARKET_STUB_DELAY", 0)
+        if delay:
+            time.sleep(delay)
+        minute = int(time.time() // 60)
+        return {m["id"]: self._quote(m["ticker"], minute) for m in instruments}
+
+    @staticmethod
+    def _quote(ticker: str, minute: int) -> dict:
+        seed = int(hashlib.sha1(ticker.encode("utf-8")).hexdigest()[:8], 16)
+        base = 50 + seed % 5000
+        phase = (seed % 360) * math.pi / 180
+
+        def price_at(t):
+            return base * (1 + 0.03 * math.sin(t / 240 + phase))
+
+        now, day_ago = price_at(minute), price_at(minute - 1440)
+        return {"price": round(now, 2), "change_pct": round((now - day_ago) / day_ago * 100, 2)}
+
+
+@lru_cache(maxsize=None)
+def _load(path: str) -> MarketDataProvider:
+    return import_string(path)()
+
+
+def get_provider() -> MarketDataProvider:
+    return _load(settings.MARKET_DATA_PROVIDER)
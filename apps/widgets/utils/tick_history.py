@@ -0,0 +1,151 @@
+"""
+Per-instrument tick history in a compact array-backed ring buffer.
+
+Ticks come from quotes market_cache already fetches — no extra upstream
+calls. Each ring is two array('d') columns (timestamps, prices), 16 bytes per
+tick, and all window maths (bisect, slicing, min/max) runs over those arrays
+in C rather than over Python lists of dicts.
+
+Rings live in process memory and are persisted to the Django cache as raw
+bytes at most every TICK_PERSIST_INTERVAL seconds, so they survive restarts
+when the cache does (Redis in production).
+"""
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+_HEADER = struct.Struct("<III")  # capacity, head, size
+
+
+class TickRing:
+    __slots__ = ("capacity", "times", "prices", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.prices = array("d", bytes(8 * capacity))
+        self.head = 0  # Next slot to write
+        self.size = 0
+
+    def append(self, ts: float, price: float):
+        self.times[self.head] = ts
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    @property
+    def last_ts(self) -> float:
+        return self.times[self.head - 1] if self.size else 0.0
+
+    def series(self) -> tuple:
+        """(times, prices) as chronological array('d') copies."""
+        if self.size < self.capacity:
+            return self.times[:self.size], self.prices[:self.size]
+        h = self.head
+        return self.times[h:] + self.times[:h], self.prices[h:] + self.prices[:h]
+
+    def window(self, since: float) -> array:
+        times, prices = self.series()
+        return prices[bisect_left(times, since):]
+
+    # ── derived figures ──
+    def change_pct(self, now: float, period: float = 86400):
+        """Change from the oldest tick inside `period` to the latest one, or None with fewer than two ticks."""
+        prices = self.window(now - period)
+        if len(prices) < 2 or not prices[0]:
+            return None
+        return (prices[-1] - prices[0]) / prices[0] * 100
+
+    def intraday_range(self, now: float):
+        """(low, high) since 00:00 UTC, or None if there are no ticks today."""
+        prices = self.window(now - now % 86400)
+        if not prices:
+            return None
+        return min(prices), max(prices)
+
+    def sparkline(self, now: float, points: int = 24, width: int = 60, height: int = 24, period: float = 86400) -> str:
+        """SVG polyline `points` for the last `period`, downsampled by stride slicing."""
+        prices = self.window(now - period)
+        if len(prices) < 2:
+            return ""
+        step = max(len(prices) // points, 1)
+        sampled = prices[::-step][:points][::-1]  # Stride back from the latest tick so it is always included
+        lo, hi = min(sampled), max(sampled)
+        span = (hi - lo) or 1.0
+        dx = width / (len(sampled) - 1)
+        return " ".join(
+            f"{i * dx:.1f},{height - 2 - (p - lo) / span * (height - 4):.1f}" for i, p in enumerate(sampled)
+        )
+
+    # ── persistence ──
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.capacity, self.head, self.size) + self.times.tobytes() + self.prices.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "TickRing":
+        capacity, head, size = _HEADER.unpack_from(raw)
+        ring = cls(capacity)
+        body = 8 * capacity
+        ring.times = array("d", raw[_HEADER.size:_HEADER.size + body])
+        ring.prices = array("d", raw[_HEADER.size + body:_HEADER.size + 2 * body])
+        ring.head, ring.size = head, size
+        return ring
+
+
+_rings = {}
+_persisted_at = {}
+_lock = threading.Lock()
+
+
+def _key(instrument_id: str) -> str:
+    return f"widgets:ticks:{instrument_id}"
+
+
+def _load(instrument_id: str):
+    raw = cache.get(_key(instrument_id))
+    if raw is None:
+        return None
+    ring = TickRing.from_bytes(raw)
+    if ring.capacity != settings.TICK_HISTORY_CAPACITY:
+        # Capacity changed in settings — replay the persisted ticks into a ring of the new size
+        resized = TickRing(settings.TICK_HISTORY_CAPACITY)
+        for ts, price in zip(*ring.series()):
+            resized.append(ts, price)
+        ring = resized
+    return ring
+
+
+def get(instrument_id: str) -> TickRing:
+    with _lock:
+        ring = _rings.get(instrument_id)
+        if ring is None:
+            ring = _load(instrument_id) or TickRing(settings.TICK_HISTORY_CAPACITY)
+            _rings[instrument_id] = ring
+        return ring
+
+
+def record(instrument_id: str, ts: float, price: float) -> TickRing:
+    """Append one tick and persist the ring if TICK_PERSIST_INTERVAL has passed."""
+    ring = get(instrument_id)
+    with _lock:
+        persisted = _load(instrument_id)
+        if persisted is not None and persisted.last_ts > ring.last_ts:
+            ring = _rings[instrument_id] = persisted  # Another worker appended since we last looked
+        if ts > ring.last_ts:
+            ring.append(ts, price)
+        if ts - _persisted_at.get(instrument_id, 0) >= settings.TICK_PERSIST_INTERVAL:
+            cache.set(_key(instrument_id), ring.to_bytes(), timeout=None)
+            _persisted_at[instrument_id] = ts
+    return ring
+
+
+def flush():
+    """Persist every in-memory ring now (e.g. before a deploy)."""
+    with _lock:
+        cache.set_many({_key(i): ring.to_bytes() for i, ring in _rings.items()}, timeout=None)
+        _persisted_at.update({i: time.time() for i in _rings})
@@ -0,0 +1,99 @@
+"""
+Weather cached per lat/lon grid cell.
+
+Browser coordinates are snapped to a WEATHER_GRID_DEGREES grid (0.1° ≈ 11 km),
+so every visitor in the same area shares one cached OpenWeather response for
+WEATHER_CACHE_TTL seconds. Concurrent misses for a cell are coalesced: threads
+in one worker queue on the cell's lock, and other workers wait on a cache.add
+lock for the first fetch to land instead of calling upstream themselves. Cell
+locks are LOCK_STRIPES fixed stripes, so clients sending ever-new coordinates
+can't grow worker memory.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.ai_agents.utils import metrics
+from apps.ai_agents.utils.logger import log_failure
+
+FETCH_LOCK_TIMEOUT = 10  # seconds — longer than the upstream timeout
+LOCK_STRIPES = 64  # Cells that hash alike share a lock; they only queue behind each other's misses
+
+_cell_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def snap(lat, lon) -> tuple:
+    """Snap raw coordinates to the centre of their grid cell. Raises ValueError on junk input."""
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Coordinates out of range: {lat}, {lon}")
+    grid = settings.WEATHER_GRID_DEGREES
+    return round(round(lat / grid) * grid, 4), round(round(lon / grid) * grid, 4)
+
+
+def _cell_lock(key: str) -> threading.Lock:
+    return _cell_locks[hash(key) % LOCK_STRIPES]
+
+
+def _wait_for(key: str):
+    """Another worker holds the fetch lock — poll for its result until WEATHER_COALESCE_WAIT."""
+    deadline = time.monotonic() + settings.WEATHER_COALESCE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return None
+
+
+def get_weather(lat, lon, fetch):
+    """
+    Return weather for the grid cell containing (lat, lon), or None if unavailable.
+    `fetch(cell_lat, cell_lon)` is only called on a miss and may raise.
+    """
+    cell = snap(lat, lon)
+    key = f"widgets:weather:{cell[0]}:{cell[1]}"
+
+    data = cache.get(key)
+    if data is not None:
+        metrics.incr("weather_cache.hits")
+        return data
+
+    with _cell_lock(key):
+        data = cache.get(key)
+        if data is not None:
+            metrics.incr("weather_cache.coalesced")
+            return data
+
+        lock_key = f"{key}:fetch"
+        if not cache.add(lock_key, 1, timeout=FETCH_LOCK_TIMEOUT):
+            metrics.incr("weather_cache.coalesced")
+            return _wait_for(key)
+        metrics.incr("weather_cache.misses")
+        try:
+            data = fetch(*cell)
+        except Exception as e:
+            log_failure("widget_weather", str(e), {"cell": cell})
+            return None
+        finally:
+            cache.delete(lock_key)
+
+        if data is not None:
+            cache.set(key, data, timeout=settings.WEATHER_CACHE_TTL)
+        return data
+
+
+def stats() -> dict:
+    """Hit/miss counters across all workers — reported by `manage.py ops_report`."""
+    hits = metrics.get("weather_cache.hits")
+    misses = metrics.get("weather_cache.misses")
+    coalesced = metrics.get("weather_cache.coalesced")
+    lookups = hits + misses + coalesced
+    return {
+        "hits": hits,
+        "misses": misses,
+        "coalesced": coalesced,
+        "hit_rate": round((hits + coalesced) / lookups, 4) if lookups else 0.0,
+    }
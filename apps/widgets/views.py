@@ -1,166 +1,243 @@
 from django.shortcuts import render
-from django.template.loader import render_to_string
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.views.decorators.http import require_GET
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from datetime import datetime
 # import yfinance as yf -> Removed in favor of Alpha Vantage
 import requests
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from apps.ai_agents.utils.logger import log_failure
+from apps.ai_agents.utils.rate_limit import rate_limit
+from apps.ai_agents.utils import circuit_breaker, quota
+from apps.website.views import get_client_ip
+from .utils import geoip, market_cache, weather_cache
+from .utils import panels as panel_cache
+from .utils.live_feed import SnapshotFeed, format_event
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Shared bounded pool for upstream fetches — caps outbound concurrency per worker."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.WIDGETS_FETCH_WORKERS, thread_name_prefix="widgets-fetch"
+                )
+    return _executor
+
+
+def _result_or(future, fallback):
+    """Return a finished future's result, or the placeholder if it missed the deadline or failed."""
+    if future is not None and future.done() and future.exception() is None:
+        return future.result()
+    return fallback
+
 
 @require_GET
+@rate_limit("widgets")  # Each uncached hit can spend Alpha Vantage / OpenWeather quota
 def live_widgets(request):
     """Command Center data strip — serves high-fidelity ticker and panel data via OOB."""
     lat = request.GET.get("lat", "").strip()
     lon = request.GET.get("lon", "").strip()
+    if not (lat and lon):
+        # No browser geolocation — resolve the client IP against the offline GeoIP table
+        coords = geoip.lookup(get_client_ip(request))
+        if coords:
+            lat, lon = coords
     has_geo = bool(lat and lon)
 
-    # 1. Fetch Data
-    market_items = _get_market_items()
-    weather_data = _get_weather_data(lat, lon) if has_geo else _get_fallback_weather_data()
-    intel_data = _get_intel_data()
-
-    # 2. Render Fragments
-    ticker_html = _render_ticker_string(market_items)
-    market_grid_html = render_to_string("partials/_command_market_grid.html", {"mkts": market_items})
-    weather_big_html = render_to_string("partials/_command_weather_big.html", {"weather": weather_data})
-    intel_grid_html = render_to_string("partials/_command_intel_grid.html", {"intel": intel_data})
-
-    # 3. Construct OOB Response
-    # This updates the ticker in-place AND swaps other components OOB
-    response_html = f"""
-    {ticker_html}
-    <div id="panel-market-grid" hx-swap-oob="innerHTML">{market_grid_html}</div>
-    <div id="panel-weather-big" hx-swap-oob="innerHTML">{weather_big_html}</div>
-    <div id="panel-intel-grid" hx-swap-oob="innerHTML">{intel_grid_html}</div>
-    
-    <span id="bar-weather-icon" hx-swap-oob="innerHTML">{weather_data['icon_emoji']}</span>
-    <span id="bar-weather-temp" hx-swap-oob="innerHTML">{weather_data['temp']}</span>
-    <div id="bar-weather-desc" hx-swap-oob="innerHTML">{weather_data['description']}</div>
-    """
-    
-    # Also update city if it's not the fallback
-    if has_geo:
-        response_html += f'<span id="bar-weather-city" hx-swap-oob="innerHTML">{weather_data["city"]}</span>'
-
-    return HttpResponse(response_html)
-
-def _get_market_items():
-    """Fetch market data from Alpha Vantage (replacing Yahoo Finance)."""
-    # Alpha Vantage Free Tier: 25 calls/day. We must limit usage or Cache heavily.
-    # For this demo, we'll fetch a subset or mock if rate limited.
-    
-    api_key = settings.ALPHA_VANTAGE_API_KEY
-    base_url = "https://www.alphavantage.co/query"
-
-    # Mapping internal ID -> Alpha Vantage Symbol
-    # Note: AV symbols might differ. ^NSEI -> NIFTY (Requires global entitlement usually, assume US for now or standard items)
-    # AV Free tier is standard US stocks mostly. checking support for indices is tricky on free tier.
-    # Let's switch to standard US tech for reliability on free tier + Crypto.
-    mkts = [
-        {"id": "sp500", "label": "S&P 500", "ticker": "SPY", "sector": "US"}, # SPY ETF as proxy
-        {"id": "nasdaq", "label": "NASDAQ", "ticker": "QQQ", "sector": "US"}, # QQQ ETF as proxy
-        {"id": "btc", "label": "BTC/USD", "ticker": "BTC", "sector": "Crypto"}, # CURRENCY_EXCHANGE_RATE for crypto
-        {"id": "gold", "label": "GOLD", "ticker": "GLD", "sector": "Commod"}, # GLD ETF
-    ]
-    
-    results = []
-    for m in mkts:
+    # 1. Fetch Data — fan out every upstream call at once, bounded by one overall deadline
+    pool = _get_executor()
+    market_future = pool.submit(market_cache.get_items, settings.MARKET_INSTRUMENTS, pool)
+    weather_future = pool.submit(_get_weather_data, lat, lon) if has_geo else None
+    intel_future = pool.submit(_get_intel_data)
+
+    pending = [f for f in (market_future, weather_future, intel_future) if f is not None]
+    _, not_done = wait(pending, timeout=settings.WIDGETS_FETCH_DEADLINE)
+    if not_done:
+        # Stragglers keep running on the pool; this response just stops waiting for them.
+        log_failure("live_widgets", f"{len(not_done)} upstream fetch(es) missed the deadline",
+                    {"deadline": settings.WIDGETS_FETCH_DEADLINE})
+
+    market_items = _result_or(market_future, None) or [market_cache.placeholder(m) for m in settings.MARKET_INSTRUMENTS]
+    weather_data = _result_or(weather_future, _get_fallback_weather_data())
+    intel_data = _result_or(intel_future, _get_intel_data())
+
+    # 2. Render versioned panels (unchanged versions come straight from the render cache)
+    panels = panel_cache.build({
+        "ticker": market_items,
+        "market": market_items,
+        "weather": {"weather": weather_data, "show_city": has_geo},
+        "intel": intel_data,
+    })
+    etag = f'"{panel_cache.combined_version(panels)}"'
+
+    # 3. Delta response — only the panels the client doesn't already have
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        known = panel_cache.parse_versions(request.headers.get("X-Panel-Versions", ""))
+        delta = panel_cache.changed(panels, known)
+        response = HttpResponse(delta) if delta else HttpResponse(status=204)
+    response["ETag"] = etag
+    response["X-Panel-Versions"] = panel_cache.format_versions(panels)
+    response["Vary"] = "X-Panel-Versions"
+    response["Cache-Control"] = "no-cache"
+    return response
+
+# ──────────────────────────────────────────────
+# SSE stream — one shared producer per worker
+# ──────────────────────────────────────────────
+def _build_stream_panels():
+    """Ticker, market grid and intel grid panels. Weather stays per-visitor on /widgets/live/."""
+    pool = _get_executor()
+    market_items = market_cache.get_items(settings.MARKET_INSTRUMENTS, pool)
+    return panel_cache.build({"ticker": market_items, "market": market_items, "intel": _get_intel_data()})
+
+
+_feed = SnapshotFeed(_build_stream_panels, interval=settings.LIVE_STREAM_INTERVAL)
+_stream_slots = threading.BoundedSemaphore(settings.LIVE_STREAM_MAX_PER_WORKER)
+
+
+def _event_stream(last_event_id):
+    seen = last_event_id
+    known = {}  # Panel versions this client already has
+    opened = time.monotonic()
+    _feed.subscribe()
+    try:
+        yield f"retry: {settings.LIVE_STREAM_RETRY_MS}\n\n"
+        while time.monotonic() - opened < settings.LIVE_STREAM_MAX_AGE:
+            snapshot = _feed.wait_for_change(seen, timeout=settings.LIVE_STREAM_HEARTBEAT)
+            if snapshot is None:
+                yield ": ping\n\n"  # Heartbeat — keeps proxies from closing an idle stream
+                continue
+            seen, event, known = _snapshot_event(snapshot, known)
+            if event:
+                yield event
+        # Closing after LIVE_STREAM_MAX_AGE frees the slot; EventSource reconnects with Last-Event-ID.
+    finally:
+        _feed.unsubscribe()
+
+
+async def _aevent_stream(last_event_id):
+    """_event_stream() for ASGI — awaits the feed instead of blocking a thread per client."""
+    seen = last_event_id
+    known = {}
+    opened = time.monotonic()
+    _feed.subscribe()
+    try:
+        yield f"retry: {settings.LIVE_STREAM_RETRY_MS}\n\n"
+        while time.monotonic() - opened < settings.LIVE_STREAM_MAX_AGE:
+            snapshot = await _feed.await_change(seen, timeout=settings.LIVE_STREAM_HEARTBEAT)
+            if snapshot is None:
+                yield ": ping\n\n"
+                continue
+            seen, event, known = _snapshot_event(snapshot, known)
+            if event:
+                yield event
+    finally:
+        _feed.unsubscribe()
+
+
+def _snapshot_event(snapshot, known):
+    """(event id, SSE message with the panels that changed or "", panel versions the client now has)."""
+    event_id, panels = snapshot
+    delta = panel_cache.changed(panels, known)
+    known = {name: version for name, (version, _) in panels.items()}
+    return event_id, format_event(event_id, "panels", delta) if delta else "", known
+
+
+class _StreamSlot:
+    """Iterable wrapper whose close() — called by Django when the response ends — frees the stream slot."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._released = False
+
+    def __iter__(self):
+        return self._stream
+
+    def close(self):
+        self._stream.close()
+        self._release()
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            _stream_slots.release()
+
+
+class _AsyncStreamSlot(_StreamSlot):
+    """_StreamSlot for an async generator, so Django streams it under ASGI instead of buffering it."""
+
+    __iter__ = None  # Not iterable — Django falls back to __aiter__ and marks the response async
+
+    async def __aiter__(self):
         try:
-            # Different logic for Crypto vs Stock
-            if m["sector"] == "Crypto":
-                 params = {
-                    "function": "CURRENCY_EXCHANGE_RATE",
-                    "from_currency": m["ticker"],
-                    "to_currency": "USD",
-                    "apikey": api_key
-                }
-                 r = requests.get(base_url, params=params, timeout=3)
-                 data = r.json().get("Realtime Currency Exchange Rate", {})
-                 if not data: raise Exception("No data")
-                 
-                 price = float(data.get("5. Exchange Rate", 0))
-                 # AV doesn't give 'change' easily in this endpoint relative to close without more calls.
-                 # Mocking change for stability or deducing? 
-                 # Let's use GLOBAL_QUOTE which might work for crypto symbols too? checking... 
-                 # GLOBAL_QUOTE works for major pairs sometimes. Let's try GLOBAL_QUOTE for all first.
-            
-            # Universal GLOBAL_QUOTE attempt
-            params = {
-                "function": "GLOBAL_QUOTE",
-                "symbol": m["ticker"] + ("USD" if m["sector"] == "Crypto" else ""), # BTCUSD?
-                "apikey": api_key
-            }
-            # Correction: Alpha Vantage Crypto format is usually separate. 
-            # Let's stick to GLOBAL_QUOTE for SPY/QQQ/GLD. 
-            
-            if m["sector"] == "Crypto":
-                 # Use specific crypto endpoint just to be safe/standard
-                 params = {
-                    "function": "CURRENCY_EXCHANGE_RATE",
-                    "from_currency": m["ticker"],
-                    "to_currency": "USD",
-                    "apikey": api_key
-                }
-                 r = requests.get(base_url, params=params, timeout=3)
-                 d = r.json().get("Realtime Currency Exchange Rate", {})
-                 price = float(d.get("5. Exchange Rate", 0))
-                 # We can't easily get 'change' percentage from this single endpoint without history.
-                 # We'll just mock change for Crypto to avoid 2nd call (rate limit risk).
-                 change = random.uniform(-2.0, 2.0) 
-                 
-            else:
-                # Stock/ETF
-                r = requests.get(base_url, params=params, timeout=3)
-                d = r.json().get("Global Quote", {})
-                price = float(d.get("05. price", 0))
-                change = float(d.get("10. change percent", "0").replace("%", ""))
-
-            results.append({
-                "id": m["id"], "label": m["label"], "sector": m["sector"],
-                "price_fmt": f"{price:,.2f}",
-                "change_abs": f"{abs(change):.2f}", "up": change >= 0
-            })
-            
-        except Exception as e:
-            # Fallback data if API fails or rate limits
-            log_failure(f"AlphaVantage error for {m['ticker']}", str(e))
-            results.append({
-                "id": m["id"], "label": m["label"], "sector": m["sector"],
-                "price_fmt": "---", "change_abs": "0.00", "up": True
-            })
-
-    return results
-
-def _render_ticker_string(items):
-    html = ""
-    for _ in range(2):
-        for m in items:
-            color = "text-green-400" if m["up"] else "text-red-400"
-            arrow = "▲" if m["up"] else "▼"
-            html += f"""
-            <span class="inline-flex items-center gap-1.5 px-6 border-r border-white/5 text-[11px] tracking-wide">
-              <span class="text-[#666] uppercase">{m['label']}</span>
-              <span class="text-[#ddd] font-medium">{m['price_fmt']}</span>
-              <span class="{color} flex items-center gap-0.5 font-bold">
-                <svg width="8" height="8" viewBox="0 0 10 10" fill="none"><path d="{'M5 1 L9 7 L1 7 Z' if m['up'] else 'M5 9 L9 3 L1 3 Z'}" fill="currentColor"/></svg>
-                {m['change_abs']}%
-              </span>
-            </span>
-            """
-    return html
+            async for part in self._stream:
+                yield part
+        finally:
+            await self._stream.aclose()
+            self._release()  # Also here: a failed send skips response.close()
+
+    def close(self):
+        self._release()  # Django calls this from a worker thread; the generator is closed above
+
+
+@require_GET
+def live_stream(request):
+    """Command Center Server-Sent Events — pushes OOB panel updates from the shared snapshot feed."""
+    if not settings.LIVE_STREAM_ENABLED:
+        return HttpResponse(status=204)  # EventSource stops reconnecting on a 204
+    if not _stream_slots.acquire(blocking=False):
+        response = HttpResponse("Too many live streams on this worker.", status=503)
+        response["Retry-After"] = str(settings.LIVE_STREAM_RETRY_MS // 1000)
+        return response
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("lastEventId")
+    if isinstance(request, ASGIRequest):
+        stream = _AsyncStreamSlot(_aevent_stream(last_event_id))
+    else:
+        stream = _StreamSlot(_event_stream(last_event_id))
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Disable proxy buffering (nginx)
+    return response
 
 def _get_weather_data(lat, lon):
+    """Weather for the visitor's grid cell — served from weather_cache, fetched at most once per cell/TTL."""
+    try:
+        data = weather_cache.get_weather(lat, lon, _fetch_weather)
+    except ValueError:
+        data = None  # Unparseable coordinates from the query string
+    return data or _get_fallback_weather_data()
+
+def _fetch_weather(lat, lon):
+    if quota.degraded("openweather"):
+        return None
     try:
-        r = requests.get("https://api.openweathermap.org/data/2.5/weather",
-                         params={"lat": lat, "lon": lon, "appid": settings.WEATHER_API_KEY, "units": "metric"}, timeout=3)
-        r.raise_for_status()
-        d = r.json()
-        return {"city": d["name"], "country": d["sys"]["country"], "temp": round(d["main"]["temp"]), "feels_like": round(d["main"]["feels_like"]),
-                "description": d["weather"][0]["description"].title(), "humidity": d["main"]["humidity"], "wind_speed": d["wind"]["speed"],
-                "icon_emoji": _get_weather_emoji(d["weather"][0]["id"])}
-    except: return _get_fallback_weather_data()
+        return circuit_breaker.get("openweather").call(_request_weather, lat, lon)
+    except (quota.QuotaExceeded, circuit_breaker.CircuitOpenError):
+        return None  # Out of budget, or OpenWeather is failing — fast-fail to the placeholder
+
+def _request_weather(lat, lon, timeout):
+    if not quota.reserve("openweather"):
+        raise quota.QuotaExceeded("openweather")
+    r = requests.get(settings.WEATHER_API_BASE_URL,
+                     params={"lat": lat, "lon": lon, "appid": settings.WEATHER_API_KEY, "units": "metric"}, timeout=timeout)
+    r.raise_for_status()
+    d = r.json()
+    return {"city": d["name"], "country": d["sys"]["country"], "temp": round(d["main"]["temp"]), "feels_like": round(d["main"]["feels_like"]),
+            "description": d["weather"][0]["description"].title(), "humidity": d["main"]["humidity"], "wind_speed": d["wind"]["speed"],
+            "icon_emoji": _get_weather_emoji(d["weather"][0]["id"])}
 
 def _get_fallback_weather_data():
     return {"city": "Mumbai", "country": "IN", "temp": 31, "feels_like": 34, "description": "Partly Cloudy", "humidity": 72, "wind_speed": 14, "icon_emoji": "⛅", "uv_index": 8}
@@ -175,7 +252,8 @@ def _get_weather_emoji(code):
     return "⛅"
 
 def _get_intel_data():
-    sentiment = random.randint(65, 85)
+    # Seeded per minute so the panel version (and its rendered HTML) is stable between refreshes
+    sentiment = random.Random(int(time.time() // 60)).randint(65, 85)
     return {"sentiment": sentiment, "sentiment_dash": int(sentiment / 100 * 251), "neutral": 15, "bearish": 100 - sentiment - 15,
             "movers": [{"symbol": "RELIANCE", "exchange": "NSE", "change": "3.2", "up": True}, {"symbol": "TCS", "exchange": "NSE", "change": "2.1", "up": True},
                        {"symbol": "WIPRO", "exchange": "NSE", "change": "1.4", "up": False}, {"symbol": "INFY", "exchange": "NSE", "change": "1.8", "up": True}],
@@ -0,0 +1,19 @@
+"""
+DIGITALLY — Offline benchmarks.
+Run from the repo root, e.g. `python -m benchmarks.bench_live_widgets`.
+"""
+import os
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+def setup_django():
+    """Boot Django with dev settings so benchmarks can call views directly."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.development")
+    import django
+
+    django.setup()
@@ -0,0 +1,86 @@
+"""
+Concurrent /ai/chat/ throughput: sync (gunicorn gthread, WSGI) vs async (uvicorn, ASGI).
+
+    python -m benchmarks.bench_chat_concurrency --delay 1.0 --concurrency 200 --requests 600
+
+Both stacks run one worker process against the same local fake Groq server
+(see benchmarks/stubs.py) that answers every completion after --delay seconds.
+The sync stack can hold at most --threads calls in flight; the async stack
+awaits them all on one event loop.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.servers import free_port, start_app, stop
+from benchmarks.stubs import StubUpstream
+
+CSRF = "b" * 32  # Unmasked secret: accepted when cookie and header match
+
+
+def _message(i: int) -> str:
+    # Unique per request, so neither the response cache nor the intent router answers for the fake LLM
+    return f"We're opening bakery number {i} next spring — which marketing should we start with, and why?"
+
+
+async def _load(url: str, total: int, concurrency: int, stream: bool) -> dict:
+    latencies, errors = [], 0
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=300, cookies={"csrftoken": CSRF}) as client:
+        async def one(i):
+            nonlocal errors
+            async with gate:
+                t0 = time.perf_counter()
+                resp = await client.post(url, json={"message": _message(i), "stream": stream}, headers={
+                    "X-CSRFToken": CSRF,
+                    # A distinct client per request so the 20/hour chat limit doesn't kick in
+                    "X-Forwarded-For": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                })
+                if resp.status_code != 200 or b"event: error" in resp.content:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - t0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        "ok": len(latencies), "errors": errors, "elapsed": elapsed,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(ordered),
+        "p95": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay", type=float, default=1.0, help="Fake LLM latency per completion (s)")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads for the sync stack")
+    parser.add_argument("--stream", action="store_true", help="Use the token-streaming chat mode")
+    parser.add_argument("--stacks", default="sync,async")
+    args = parser.parse_args()
+
+    with StubUpstream(delay=args.delay, token_delay=0.01) as llm:
+        print(f"fake LLM delay {args.delay:.2f}s, {args.requests} chats at concurrency {args.concurrency}\n")
+        for stack in args.stacks.split(","):
+            port = free_port()
+            proc = start_app(stack, port, {"GROQ_BASE_URL": llm.groq_url}, threads=args.threads)
+            try:
+                r = asyncio.run(_load(f"http://127.0.0.1:{port}/ai/chat/", args.requests, args.concurrency, args.stream))
+            finally:
+                stop(proc)
+            print(f"{stack:<6} {r['rps']:7.1f} chats/s  p50 {r['p50']:.2f}s  p95 {r['p95']:.2f}s  "
+                  f"ok {r['ok']}  errors {r['errors']}  ({r['elapsed']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Offline GeoIP lookup latency and memory over a synthetic range table.
+
+    python -m benchmarks.bench_geoip --ranges 2000000 --lookups 200000
+
+Builds a table of evenly spaced IPv4 ranges in a temp file, mmaps it and
+times random lookups. RSS is reported before and after the lookups to show
+that only the touched pages become resident.
+"""
+import argparse
+import os
+import random
+import resource
+import tempfile
+import time
+
+from benchmarks import setup_django
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ranges", type=int, default=2_000_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from apps.widgets.utils.geoip import GeoIPTable, write_table
+
+    span = 2**32 // args.ranges
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "geoip.bin")
+        t0 = time.perf_counter()
+        write_table(
+            ((i * span, i * span + span - 2, rng.uniform(-60, 70), rng.uniform(-180, 180)) for i in range(args.ranges)),
+            path,
+        )
+        build_s = time.perf_counter() - t0
+        size_mb = os.path.getsize(path) / 2**20
+
+        rss_before = _rss_mb()
+        table = GeoIPTable(path)
+        ips = [rng.randrange(2**32) for _ in range(args.lookups)]
+        t0 = time.perf_counter()
+        hits = sum(1 for ip in ips if table.lookup_int(ip) is not None)
+        elapsed = time.perf_counter() - t0
+        rss_after = _rss_mb()
+        table.close()
+
+    print(f"table: {args.ranges:,} ranges, {size_mb:.1f} MiB on disk, built in {build_s:.1f}s")
+    print(f"lookups: {args.lookups:,} in {elapsed:.3f}s — {elapsed / args.lookups * 1e6:.2f} µs/lookup, {hits:,} hits")
+    print(f"rss: {rss_before:.1f} MiB before, {rss_after:.1f} MiB after "
+          f"(peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB incl. build)")
+
+
+if __name__ == "__main__":
+    main()
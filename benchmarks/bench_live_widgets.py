@@ -0,0 +1,74 @@
+"""
+/widgets/live/ wall time: sequential upstream calls vs the concurrent fan-out.
+
+    python -m benchmarks.bench_live_widgets --delay 0.5 --runs 5
+
+Both paths hit the same local stub (see benchmarks/stubs.py), so the only
+difference is scheduling: sequential costs the sum of the calls, the fan-out
+costs roughly the slowest single call. "cold" clears the market snapshot
+and weather caches before every run; "warm" serves both straight from the cache.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.5, help="Stub upstream latency per call (s)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--bulk", action="store_true", help="Use REALTIME_BULK_QUOTES for the ETFs")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import RequestFactory, override_settings
+    from apps.widgets import views
+    from apps.widgets.utils.providers import AlphaVantageProvider
+    from benchmarks.stubs import StubUpstream
+
+    factory = RequestFactory()
+
+    with StubUpstream(delay=args.delay) as stub, override_settings(
+        ALPHA_VANTAGE_BASE_URL=stub.alpha_vantage_url,
+        WEATHER_API_BASE_URL=stub.weather_url,
+        WIDGETS_FETCH_DEADLINE=args.delay * 4,
+        UPSTREAM_QUOTAS={},  # Stub calls are free — don't let the budget skew timings
+        MARKET_DATA_PROVIDER="apps.widgets.utils.providers.AlphaVantageProvider",
+        ALPHA_VANTAGE_BULK_QUOTES=args.bulk,
+    ):
+        instruments = settings.MARKET_INSTRUMENTS
+        provider = AlphaVantageProvider()
+
+        def sequential():
+            for m in instruments:
+                provider._single_quote(m)
+            views._fetch_weather("19.07", "72.87")
+            views._get_intel_data()
+
+        def fan_out():
+            request = factory.get("/widgets/live/", {"lat": "19.07", "lon": "72.87"})
+            response = views.live_widgets(request)
+            assert response.status_code == 200
+
+        def fan_out_cold():
+            cache.clear()
+            fan_out()
+
+        upstream_calls = len(instruments) + 1
+        print(f"stub delay {args.delay:.3f}s x {upstream_calls} upstream calls, {args.runs} runs\n")
+        for label, fn in (("sequential", sequential), ("fan-out cold", fan_out_cold), ("fan-out warm", fan_out)):
+            timings = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - t0)
+            print(f"{label:<14} median {statistics.median(timings):.3f}s  "
+                  f"min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Rate limiter under contention: how many hits get through, and what a check costs.
+
+    python -m benchmarks.bench_rate_limit --workers 4 --threads 8 --hits 200 --limit 100
+    python -m benchmarks.bench_rate_limit --redis-url redis://127.0.0.1:6379/15
+
+Every worker process runs `threads` threads that all hammer one client key
+with `hits` checks each, inside a single window. A correct shared limiter
+admits exactly --limit; anything above that is the limit leaking:
+
+  legacy — the old chat check: cache.get() then cache.set() on the per-process LocMemCache
+  cache  — rate_limit over LocMemCache (atomic, but still one counter per process)
+  db     — rate_limit over RateLimitCounter rows in a throwaway SQLite file
+  redis  — rate_limit over one MULTI per check (only with --redis-url)
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks import setup_django
+
+PERIOD = 3600
+
+
+def _legacy_check(key: str, limit: int) -> bool:
+    from django.core.cache import cache
+
+    count = cache.get(key, 0)
+    if count >= limit:
+        return False
+    cache.set(key, count + 1, timeout=PERIOD)
+    return True
+
+
+def _worker(strategy: str, args, results):
+    """One worker process: `threads` threads, `hits` checks each. Reports (allowed, errors, latencies)."""
+    from django.conf import settings
+    from django.db import connections
+    from apps.ai_agents.utils import rate_limit
+
+    settings.RATE_LIMITS = {"bench": (args.limit, PERIOD)}
+    storage = None if strategy == "legacy" else rate_limit.STORAGES[strategy]()
+    allowed, errors, latencies = [0], [0], []
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    class Counting:
+        """Pass-through that counts storage errors — check() fails open on them."""
+
+        def hit(self, *a, **kw):
+            try:
+                return storage.hit(*a, **kw)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                raise
+
+        def undo(self, *a, **kw):
+            storage.undo(*a, **kw)
+
+    counting = Counting()
+
+    def run():
+        local_allowed, local_latencies = 0, []
+        start.wait()
+        for _ in range(args.hits):
+            t0 = time.perf_counter()
+            if strategy == "legacy":
+                ok = _legacy_check("chat_rate_bench", args.limit)
+            else:
+                ok = rate_limit.check("bench", "203.0.113.7", counting) == 0
+            local_latencies.append(time.perf_counter() - t0)
+            local_allowed += ok
+        connections.close_all()
+        with lock:
+            allowed[0] += local_allowed
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=run) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((allowed[0], errors[0], latencies))
+
+
+def _run(strategy: str, args) -> dict:
+    from django.core.cache import cache
+    from django.db import connections
+    from apps.ai_agents.models import RateLimitCounter
+
+    cache.clear()
+    RateLimitCounter.objects.all().delete()
+    connections.close_all()  # Children get fresh connections
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(strategy, args, results)) for _ in range(args.workers)]
+    t0 = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    out = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(x for _, _, lat in out for x in lat)
+    return {
+        "allowed": sum(a for a, _, _ in out),
+        "errors": sum(e for _, e, _ in out),
+        "checks_per_s": len(latencies) / elapsed,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="Processes, like gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per process")
+    parser.add_argument("--hits", type=int, default=200, help="Checks per thread")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    tmp = tempfile.mkdtemp()
+    settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+    settings.DATABASES["default"].setdefault("OPTIONS", {})["timeout"] = 30
+    call_command("migrate", verbosity=0)
+
+    strategies = ["legacy", "cache", "db"]
+    if args.redis_url:
+        settings.RATE_LIMIT_REDIS_URL = args.redis_url
+        strategies.append("redis")
+
+    total = args.workers * args.threads * args.hits
+    print(f"{args.workers} workers × {args.threads} threads × {args.hits} checks = {total:,} checks, "
+          f"limit {args.limit}\n")
+    print(f"{'storage':<8} {'allowed':>8} {'errors':>7} {'checks/s':>10} {'p50':>9} {'p99':>9}")
+    for strategy in strategies:
+        r = _run(strategy, args)
+        print(f"{strategy:<8} {r['allowed']:>8} {r['errors']:>7} {r['checks_per_s']:>10,.0f} "
+              f"{r['p50_us']:>7.0f}µs {r['p99_us']:>7.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Roast scraper extraction: latency and peak RSS per parser backend over saved pages.
+
+    python -m benchmarks.bench_scraper --corpus benchmarks/corpus
+
+The corpus is any directory of saved *.html pages (e.g. `curl -so benchmarks/corpus/site.html https://...`);
+it is searched recursively and is not checked in. Each backend runs in its own
+subprocess so peak RSS is measured in isolation. Pages are read from disk in
+64 KB chunks the way scrape_website() reads the network:
+
+  legacy — whole body, BeautifulSoup(html.parser) over the full document (the old path)
+  bs4    — same extraction, but capped at SCRAPER_MAX_BYTES
+  lxml   — capped, parsed by libxml2
+  stream — capped, incremental tokenizer that stops once it has enough content
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import BASE_DIR, setup_django
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _pages(corpus: str, limit: int) -> list:
+    return sorted(str(p) for p in Path(corpus).rglob("*.htm*"))[:limit or None]
+
+
+def _legacy(path: str) -> tuple:
+    from bs4 import BeautifulSoup
+
+    with open(path, "rb") as f:
+        body = f.read()
+    soup = BeautifulSoup(body.decode("utf-8", errors="replace"), "html.parser")
+    for tag in soup(["script", "style", "nav", "footer", "header"]):
+        tag.decompose()
+    soup.get_text(separator=" ", strip=True)[:2000]
+    return len(body), len(body)
+
+
+def _streamed(path: str, parser: str) -> tuple:
+    from django.conf import settings
+    from apps.ai_agents.utils import html_extract
+
+    extractor = html_extract.get_extractor(name=parser)
+    size = Path(path).stat().st_size
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            room = settings.SCRAPER_MAX_BYTES - extractor.bytes_seen
+            extractor.feed(chunk[:room])
+            if extractor.done or len(chunk) >= room:
+                break
+    extractor.result()
+    return extractor.bytes_seen, size
+
+
+def _worker(parser: str, pages: list):
+    """Runs in the subprocess: time every page, report peak RSS above the post-import baseline."""
+    setup_django()
+    from apps.ai_agents.utils import html_extract  # noqa: F401 — import cost stays out of the delta
+
+    if parser == "lxml":
+        import lxml.html  # noqa: F401
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings, read, total = [], 0, 0
+    for path in pages:
+        t0 = time.perf_counter()
+        n, size = _legacy(path) if parser == "legacy" else _streamed(path, parser)
+        timings.append(time.perf_counter() - t0)
+        read, total = read + n, total + size
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"timings": timings, "read": read, "total": total, "rss_kb": peak - baseline}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=str(BASE_DIR / "benchmarks" / "corpus"))
+    parser.add_argument("--limit", type=int, default=0, help="Only the first N pages (sorted by path)")
+    parser.add_argument("--parsers", default="legacy,bs4,lxml,stream")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = _pages(args.corpus, args.limit)
+    if args.worker:
+        _worker(args.worker, pages)
+        return
+    if not pages:
+        sys.exit(f"No .html pages under {args.corpus} — save some real pages there first.")
+
+    sizes = sorted(Path(p).stat().st_size for p in pages)
+    print(f"{len(pages)} pages, median {sizes[len(sizes) // 2] / 1024:.0f} KB, largest {sizes[-1] / 1024:.0f} KB\n")
+    print(f"{'parser':<8} {'median':>9} {'p95':>9} {'total':>8} {'read':>6} {'peak RSS':>10}")
+    for name in args.parsers.split(","):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_scraper", "--worker", name,
+             "--corpus", args.corpus, "--limit", str(args.limit)],
+            cwd=BASE_DIR, capture_output=True, text=True,
+        )
+        if out.returncode:
+            print(f"{name:<8} failed: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        t = sorted(r["timings"])
+        print(f"{name:<8} {statistics.median(t) * 1000:7.2f}ms {t[int(len(t) * 0.95)] * 1000:7.2f}ms "
+              f"{sum(t):7.2f}s {r['read'] / r['total']:6.0%} {r['rss_kb'] / 1024:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
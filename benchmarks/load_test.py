@@ -0,0 +1,268 @@
+"""
+Load-test every endpoint against local fakes: p50/p95/p99 latency and throughput per endpoint, saved as JSON.
+
+    python -m benchmarks.load_test --stack async --requests 300 --concurrency 50
+    python -m benchmarks.load_test --llm-error-rate 0.05 --compare benchmarks/results/load-async-20261018-101500.json
+
+Starts the fake Groq / Alpha Vantage / OpenWeather server (benchmarks/stubs.py)
+and a static site farm (benchmarks/site_farm.py), migrates a throwaway SQLite
+database, and runs the app under gunicorn (sync) or uvicorn (async) with
+benchmarks.settings pointed at all of them. Nothing leaves the machine.
+
+Each endpoint gets --requests requests at --concurrency. Every request comes
+from its own X-Forwarded-For address, so the per-client rate limits don't
+cut the run short:
+
+  chat         POST /ai/chat/, JSON reply; distinct messages, so each one reaches the fake LLM
+  chat_stream  POST /ai/chat/ with stream: true, timed to the done event (plus time to first token)
+  roast        POST /ai/roast/ over --sites farm URLs, run inline; --roast-queue starts
+               roast_worker and times each job until its result is polled; --site-tls
+               serves the farm over HTTPS
+  widgets      GET /widgets/live/ with varying coordinates
+
+A request is ok when it gets a 2xx with no error event or error fragment.
+Latency percentiles cover ok requests only. Results are written to
+benchmarks/results/load-<stack>-<timestamp>.json. With --compare, the change
+against an earlier file is printed as well.
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks import BASE_DIR
+from benchmarks.servers import free_port, manage, start_app, start_command, stop
+from benchmarks.site_farm import SiteFarm
+from benchmarks.stubs import StubUpstream
+
+CSRF = "b" * 32  # Unmasked secret: accepted when cookie and header match
+ENDPOINTS = ("chat", "chat_stream", "roast", "widgets")
+RESULTS_DIR = BASE_DIR / "benchmarks" / "results"
+ROAST_POLL = 0.25  # seconds between status polls with --roast-queue
+
+_POLL_URL = re.compile(rb'hx-get="([^"]+)"')
+
+
+def _client_ip(i: int) -> str:
+    return f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+
+
+def _message(i: int, endpoint: str) -> str:
+    # Unique per request and endpoint, so the response cache never answers for the fake LLM
+    return f"We're planning {endpoint} launch number {i} for a bakery chain — where would you start?"
+
+
+def _percentile(ordered: list, q: float) -> float:
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def _summary(requests: int, latencies: list, statuses: dict, elapsed: float, ttfts=None) -> dict:
+    ordered = sorted(latencies) or [0.0]
+    summary = {
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": requests - len(latencies),
+        "status": dict(sorted(statuses.items())),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+        "latency_ms": {
+            "p50": _ms(_percentile(ordered, 0.50)),
+            "p95": _ms(_percentile(ordered, 0.95)),
+            "p99": _ms(_percentile(ordered, 0.99)),
+            "mean": _ms(statistics.fmean(ordered)),
+            "max": _ms(ordered[-1]),
+        },
+    }
+    if ttfts:
+        ordered = sorted(ttfts)
+        summary["ttft_ms"] = {q: _ms(_percentile(ordered, p)) for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+    return summary
+
+
+class _Driver:
+    def __init__(self, base_url: str, farm: SiteFarm, args):
+        self.base_url = base_url
+        self.farm = farm
+        self.args = args
+
+    async def run(self, endpoint: str) -> dict:
+        latencies, ttfts, statuses = [], [], {}
+        gate = asyncio.Semaphore(self.args.concurrency)
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        request = getattr(self, f"_{endpoint}")
+
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.args.timeout,
+                                     cookies={"csrftoken": CSRF}) as client:
+            async def one(i):
+                async with gate:
+                    started = time.perf_counter()
+                    try:
+                        status, ok, ttft = await request(client, i, started)
+                    except httpx.HTTPError as e:
+                        status, ok, ttft = type(e).__name__, False, None
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+                    if ok:
+                        latencies.append(time.perf_counter() - started)
+                        if ttft is not None:
+                            ttfts.append(ttft)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(self.args.requests)))
+            elapsed = time.perf_counter() - started
+        return _summary(self.args.requests, latencies, statuses, elapsed, ttfts)
+
+    def _headers(self, i: int) -> dict:
+        return {"X-CSRFToken": CSRF, "X-Forwarded-For": _client_ip(i)}
+
+    async def _chat(self, client, i, started):
+        resp = await client.post("/ai/chat/", headers=self._headers(i), json={"message": _message(i, "chat")})
+        return resp.status_code, resp.is_success and "reply" in resp.json(), None
+
+    async def _chat_stream(self, client, i, started):
+        ttft, done, failed = None, False, False
+        async with client.stream("POST", "/ai/chat/", headers=self._headers(i), json={
+            "message": _message(i, "stream"), "stream": True,
+        }) as resp:
+            async for chunk in resp.aiter_bytes():
+                if ttft is None and b"event: token" in chunk:
+                    ttft = time.perf_counter() - started
+                done = done or b"event: done" in chunk or b'"reply"' in chunk  # Cached replies come back as JSON
+                failed = failed or b"event: error" in chunk
+        return resp.status_code, resp.is_success and done and not failed, ttft
+
+    async def _roast(self, client, i, started):
+        resp = await client.post("/ai/roast/", headers=self._headers(i), data={"url": self.farm.url(i)})
+        status, body = resp.status_code, resp.content
+        while resp.is_success and (poll := _POLL_URL.search(body)):
+            await asyncio.sleep(ROAST_POLL)
+            resp = await client.get(poll.group(1).decode(), headers=self._headers(i))
+            body = resp.content
+        return status, resp.is_success and b"roast-output" in body, None
+
+    async def _widgets(self, client, i, started):
+        resp = await client.get("/widgets/live/", headers=self._headers(i), params={
+            "lat": f"{8 + i % 29}.{i % 10}", "lon": f"{68 + i % 29}.{i % 10}",
+        })
+        return resp.status_code, resp.is_success, None
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print(results: dict, baseline=None):
+    print(f"\n{'endpoint':<12} {'ok':>9} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results["endpoints"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<12} {r['ok']:>4}/{r['requests']:<4} {r['throughput_rps']:>8.1f} "
+              f"{lat['p50']:>9.1f} {lat['p95']:>9.1f} {lat['p99']:>9.1f}")
+        before = (baseline or {}).get("endpoints", {}).get(name)
+        if before:
+            def change(new, old):
+                return f"{(new - old) / old:+.0%}" if old else "n/a"
+            print(f"{'  vs base':<12} {'':>9} {change(r['throughput_rps'], before['throughput_rps']):>8} "
+                  + " ".join(f"{change(lat[q], before['latency_ms'][q]):>9}" for q in ("p50", "p95", "p99")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stack", choices=("sync", "async"), default="async")
+    parser.add_argument("--threads", type=int, default=8, help="gthread threads for the sync stack")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request (s)")
+    parser.add_argument("--llm-delay", type=float, default=0.8, help="Fake LLM latency per completion (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.4, help="Extra random fake LLM latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Pause between streamed chunks (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--llm-error-status", type=int, default=503)
+    parser.add_argument("--api-delay", type=float, default=0.3, help="Fake Alpha Vantage/OpenWeather latency (s)")
+    parser.add_argument("--sites", type=int, default=100, help="Sites in the farm (roasts cycle through them)")
+    parser.add_argument("--site-delay", type=float, default=0.2, help="Site farm latency per page (s)")
+    parser.add_argument("--site-error-rate", type=float, default=0.0)
+    parser.add_argument("--site-tls", action="store_true", help="Serve the site farm over HTTPS (self-signed)")
+    parser.add_argument("--roast-queue", action="store_true", help="Queue roasts and run roast_worker")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/load-<stack>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoint(s): {', '.join(sorted(unknown))}")
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    started_at = datetime.now(timezone.utc)
+
+    with (
+        tempfile.TemporaryDirectory(prefix="digitally-load-") as tmp,
+        StubUpstream(delay=args.llm_delay, jitter=args.llm_jitter, token_delay=args.token_delay,
+                     error_rate=args.llm_error_rate, error_status=args.llm_error_status) as llm,
+        StubUpstream(delay=args.api_delay) as apis,
+        SiteFarm(sites=args.sites, delay=args.site_delay, error_rate=args.site_error_rate, tls=args.site_tls) as farm,
+    ):
+        env = {
+            "LOADTEST_DB": str(Path(tmp) / "load.sqlite3"),
+            "SCRAPER_CACHE_DIR": str(Path(tmp) / "scraper-cache"),
+            "GROQ_BASE_URL": llm.groq_url,
+            "ALPHA_VANTAGE_BASE_URL": apis.alpha_vantage_url,
+            "WEATHER_API_BASE_URL": apis.weather_url,
+            "WEATHER_API_KEY": "stub",
+            "ROAST_USE_QUEUE": str(args.roast_queue),
+            "SCRAPER_CA_BUNDLE": farm.ca_file,
+        }
+        manage("migrate", "-v0", env=env)
+        port = free_port()
+        app = start_app(args.stack, port, env, threads=args.threads)
+        worker = start_command("roast_worker", env=env) if args.roast_queue and "roast" in endpoints else None
+        try:
+            driver = _Driver(f"http://127.0.0.1:{port}", farm, args)
+            results = {}
+            for name in endpoints:
+                print(f"{name}: {args.requests} requests at concurrency {args.concurrency}…")
+                results[name] = asyncio.run(driver.run(name))
+        finally:
+            if worker:
+                stop(worker)
+            stop(app)
+        upstreams = {
+            "llm": {"hits": llm.hits, "errors": llm.errors},
+            "apis": {"hits": apis.hits},
+            "site_farm": farm.stats(),
+        }
+
+    report = {
+        "run": {
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "stack": args.stack,
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "upstreams": upstreams,
+        "endpoints": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load-{args.stack}-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    _print(report, baseline)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
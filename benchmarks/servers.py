@@ -0,0 +1,76 @@
+"""
+Launch the app under a real server in a subprocess, for benchmarks that need HTTP end to end.
+
+    port = free_port()
+    proc = start_app("async", port, {"GROQ_BASE_URL": llm.groq_url})
+    ...
+    stop(proc)
+
+"sync" is gunicorn gthread (WSGI) with `threads` threads, "async" is uvicorn
+(ASGI); both run one worker process with benchmarks.settings unless `env`
+says otherwise.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks import BASE_DIR
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _env(extra=None) -> dict:
+    return {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+        "GROQ_API_KEY": "stub",
+        **(extra or {}),
+    }
+
+
+def manage(*args, env=None):
+    """Run a manage.py command with the same environment the app server gets."""
+    subprocess.run([sys.executable, "manage.py", *args], cwd=BASE_DIR, env=_env(env), check=True)
+
+
+def start_app(stack: str, port: int, env=None, threads: int = 8) -> subprocess.Popen:
+    env = _env({"AI_ASYNC_VIEWS": "True" if stack == "async" else "False", **(env or {})})
+    if stack == "async":
+        cmd = [sys.executable, "-m", "uvicorn", "config.asgi:application",
+               "--port", str(port), "--log-level", "warning", "--backlog", "4096"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "config.wsgi:application", "-k", "gthread",
+               "--workers", "1", "--threads", str(threads), "--bind", f"127.0.0.1:{port}",
+               "--backlog", "4096", "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/ai/chat/", timeout=1)  # 405 once Django is up
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{stack} server did not start")
+
+
+def start_command(*args, env=None) -> subprocess.Popen:
+    """A long-running manage.py command (e.g. roast_worker) next to the app server."""
+    return subprocess.Popen([sys.executable, "manage.py", *args], cwd=BASE_DIR, env=_env(env))
+
+
+def stop(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
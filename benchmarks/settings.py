@@ -0,0 +1,20 @@
+"""
+Settings for app servers the benchmarks launch in a subprocess:
+dev settings without upstream budgets, so the stub's latency is the only limit.
+"""
+from config.settings.development import *  # noqa: F401, F403
+
+DEBUG = False
+UPSTREAM_QUOTAS = {}
+SCRAPER_ALLOW_PRIVATE_HOSTS = True  # Roasts target benchmarks/site_farm.py on 127.0.0.1
+CHAT_ROUTER_ENABLED = env.bool("CHAT_ROUTER_ENABLED", default=False)  # Every chat reaches the fake LLM
+
+# benchmarks/load_test.py migrates a throwaway database per run
+if env("LOADTEST_DB", default=""):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": env("LOADTEST_DB"),
+            "OPTIONS": {"timeout": 30},  # App threads and roast_worker share one SQLite file
+        }
+    }
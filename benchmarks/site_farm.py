@@ -0,0 +1,186 @@
+"""
+A farm of static sites for the roast scraper, served from 127.0.0.1.
+
+Site n lives at /site/<n>/ and is generated deterministically: a title,
+meta description, headings, an optional CTA, and filler paragraphs padded
+to one of a few page sizes (PAGE_SIZES, picked by n). Every page carries an
+ETag and Last-Modified and answers conditional GETs with 304. Cache-Control
+is max-age=`max_age`, or no-cache when it is 0, so the scraper's HTTP cache
+revalidates. Responses are delayed by `delay` seconds, and a fraction
+`error_rate` of them are 500s.
+
+The scraper refuses private addresses unless SCRAPER_ALLOW_PRIVATE_HOSTS is
+on, which benchmarks.settings does.
+
+With tls=True the farm serves HTTPS at https://localhost:<port>/ with a
+self-signed certificate for "localhost" only (made with the openssl CLI).
+Point SCRAPER_CA_BUNDLE at `farm.ca_file` so the scraper trusts it. The
+certificate doesn't cover 127.0.0.1, so a transport that dials the pinned
+address but forgets the hostname fails the TLS check.
+
+    with SiteFarm(sites=100, delay=0.2) as farm:
+        urls = farm.urls
+"""
+import hashlib
+import random
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+from benchmarks.stubs import _StubServer
+
+PAGE_SIZES = (8 * 1024, 60 * 1024, 400 * 1024)  # Bytes — landing page, typical, bloated
+LAST_MODIFIED = formatdate(1_700_000_000, usegmt=True)
+
+_WORDS = (
+    "growth brand digital agency strategy launch customers design social content search local "
+    "results campaign audience conversion premium service marketing website team project"
+).split()
+
+
+def page(n: int) -> bytes:
+    rng = random.Random(n)
+    size = PAGE_SIZES[n % len(PAGE_SIZES)]
+
+    def sentence(words: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+    head = [
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">",
+        f"<title>Site {n} — {sentence(4)}</title>",
+        f"<meta name=\"description\" content=\"{sentence(14)}\">" if n % 5 else "",
+        "<style>body{font-family:sans-serif}</style><script>window.dataLayer=[];</script>",
+        "</head><body><nav><a href=\"/\">Home</a> <a href=\"/about\">About</a></nav>",
+        f"<h1>{sentence(5)}</h1>",
+        *(f"<h2>{sentence(3)}</h2><p>{sentence(30)}</p>" for _ in range(3)),
+        "<a class=\"btn\" href=\"/contact\">Get a free quote</a>" if n % 3 else "",
+    ]
+    html = "".join(head)
+    filler = []
+    while len(html) + sum(map(len, filler)) < size:
+        filler.append(f"<p>{sentence(40)}</p>")
+    return (html + "".join(filler) + "<footer>© Site farm</footer></body></html>").encode("utf-8")
+
+
+class _FarmHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like real sites
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.delay)
+        server.hits += 1
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "site" or not parts[1].isdigit() or int(parts[1]) >= server.sites:
+            return self._send(404, b"Not found")
+        if random.random() < server.error_rate:
+            server.errors += 1
+            return self._send(500, b"Internal Server Error")
+
+        body = server.pages.get(parts[1])
+        if body is None:
+            body = server.pages.setdefault(parts[1], page(int(parts[1])))
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": LAST_MODIFIED,
+            "Cache-Control": f"max-age={server.max_age}" if server.max_age else "no-cache",
+        }
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            return self._send(304, b"", headers)
+        self._send(200, body, {"Content-Type": "text/html; charset=utf-8", **headers})
+
+    def _send(self, status: int, body: bytes, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _TLSFarmServer(_StubServer):
+    def __init__(self, address, handler, context: ssl.SSLContext):
+        super().__init__(address, handler)
+        self.context = context
+
+    def get_request(self):
+        sock, address = super().get_request()
+        # The handshake runs on the handler thread's first read, not in the accept loop
+        return self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False), address
+
+
+def _self_signed(directory: Path, hostname: str) -> tuple:
+    """(certificate, key) paths for a throwaway self-signed certificate covering `hostname` only."""
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "2",
+         "-keyout", str(key), "-out", str(cert), "-subj", f"/CN={hostname}",
+         "-addext", f"subjectAltName=DNS:{hostname}"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class SiteFarm:
+    """Threaded HTTP(S) server with `sites` generated sites — use as a context manager."""
+
+    def __init__(self, sites: int = 100, delay: float = 0.0, error_rate: float = 0.0, max_age: int = 0,
+                 tls: bool = False):
+        self._certs = None
+        if tls:
+            self._certs = Path(tempfile.mkdtemp(prefix="site-farm-tls-"))
+            cert, key = _self_signed(self._certs, "localhost")
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(cert, key)
+            self.server = _TLSFarmServer(("127.0.0.1", 0), _FarmHandler, context)
+        else:
+            self.server = _StubServer(("127.0.0.1", 0), _FarmHandler)
+        self.server.sites = sites
+        self.server.delay = delay
+        self.server.error_rate = error_rate
+        self.server.max_age = max_age
+        self.server.pages = {}
+        self.server.hits = self.server.errors = self.server.not_modified = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        if self._certs:
+            return f"https://localhost:{port}"  # The name the certificate is for; it resolves to 127.0.0.1
+        return f"http://{host}:{port}"
+
+    @property
+    def ca_file(self) -> str:
+        """The self-signed certificate, for SCRAPER_CA_BUNDLE (tls=True only)."""
+        return str(self._certs / "cert.pem") if self._certs else ""
+
+    def url(self, n: int) -> str:
+        return f"{self.base_url}/site/{n % self.server.sites}/"
+
+    @property
+    def urls(self) -> list:
+        return [self.url(n) for n in range(self.server.sites)]
+
+    def stats(self) -> dict:
+        return {"hits": self.server.hits, "errors": self.server.errors, "not_modified": self.server.not_modified}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._certs:
+            shutil.rmtree(self._certs, ignore_errors=True)
@@ -0,0 +1,219 @@
+"""
+Local stand-ins for the upstreams: Alpha Vantage, OpenWeather and Groq's
+OpenAI-compatible chat completions endpoint (POST, optionally streamed).
+Every response is delayed by `delay` seconds plus up to `jitter` more, so
+benchmarks can model a slow upstream. A fraction `error_rate` of requests is
+answered with `error_status` instead (503 by default; 429 carries Retry-After).
+
+Run it on its own to point a dev server at it:
+
+    python -m benchmarks.stubs --port 8100 --delay 0.8 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _alpha_vantage_payload(params):
+    fn = params.get("function", "")
+    if fn == "REALTIME_BULK_QUOTES":
+        return {"endpoint": "Realtime Bulk Quotes", "data": [
+            {"symbol": symbol, "close": "512.3400", "change_percent": "0.8421"}
+            for symbol in params.get("symbol", "").split(",") if symbol
+        ]}
+    if fn == "CURRENCY_EXCHANGE_RATE":
+        return {"Realtime Currency Exchange Rate": {
+            "1. From_Currency Code": params.get("from_currency", "BTC"),
+            "5. Exchange Rate": "64250.12000000",
+        }}
+    return {"Global Quote": {
+        "01. symbol": params.get("symbol", ""),
+        "05. price": "512.3400",
+        "10. change percent": "0.8421%",
+    }}
+
+
+def _weather_payload(params):
+    return {
+        "name": "Stubville", "sys": {"country": "IN"},
+        "main": {"temp": 29.4, "feels_like": 32.1, "humidity": 70},
+        "weather": [{"id": 802, "description": "scattered clouds"}],
+        "wind": {"speed": 11.0},
+    }
+
+
+def _completion_payload(body):
+    return {
+        "id": "stub-completion", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": STUB_REPLY}}],
+        "usage": {"prompt_tokens": 120, "completion_tokens": len(STUB_REPLY.split()), "total_tokens": 120 + len(STUB_REPLY.split())},
+    }
+
+
+def _completion_chunk(body, delta, finish_reason=None):
+    return {
+        "id": "stub-completion", "object": "chat.completion.chunk", "created": int(time.time()),
+        "model": body.get("model", "stub"), "x_groq": None,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+STUB_REPLY = "Happy to help — our SEO retainer starts from ₹10,000/month and covers on-page work and GMB."
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def _wait_or_fail(self) -> bool:
+        """Sleep the configured latency; True if this request was answered with an injected error."""
+        server = self.server
+        time.sleep(server.delay + random.uniform(0, server.jitter))
+        server.hits += 1
+        if random.random() >= server.error_rate:
+            return False
+        server.errors += 1
+        payload = json.dumps({"error": {"message": "Injected stub failure", "type": "stub_error"}}).encode("utf-8")
+        self.send_response(server.error_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if server.error_status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(payload)
+        return True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if self._wait_or_fail():
+            return
+
+        if parsed.path.startswith("/weather"):
+            body = _weather_payload(params)
+        else:
+            body = _alpha_vantage_payload(params)
+        payload = json.dumps(body).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self._wait_or_fail():
+            return
+
+        if not body.get("stream"):
+            payload = json.dumps(_completion_payload(body)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        # Streamed: one SSE chunk per word, then [DONE]; HTTP/1.0 so the close ends the body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        words = STUB_REPLY.split(" ")
+        for i, word in enumerate(words):
+            chunk = _completion_chunk(body, {"content": word if i == 0 else " " + word})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        final = _completion_chunk(body, {}, "stop")
+        final["x_groq"] = {"id": "stub", "usage": _completion_payload(body)["usage"]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+    def log_message(self, *args):
+        pass  # Keep benchmark output clean
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # Load benchmarks open hundreds of connections at once
+
+
+class StubUpstream:
+    """Threaded HTTP stub on 127.0.0.1 — use as a context manager."""
+
+    def __init__(self, delay: float = 0.0, token_delay: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, port: int = 0):
+        self.server = _StubServer(("127.0.0.1", port), _StubHandler)
+        self.server.delay = delay
+        self.server.token_delay = token_delay
+        self.server.jitter = jitter
+        self.server.error_rate = error_rate
+        self.server.error_status = error_status
+        self.server.hits = 0
+        self.server.errors = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def alpha_vantage_url(self) -> str:
+        return f"{self.base_url}/query"
+
+    @property
+    def weather_url(self) -> str:
+        return f"{self.base_url}/weather"
+
+    @property
+    def groq_url(self) -> str:
+        return self.base_url  # The Groq SDK appends /openai/v1/chat/completions
+
+    @property
+    def hits(self) -> int:
+        return self.server.hits
+
+    @property
+    def errors(self) -> int:
+        return self.server.errors
+
+    def set_delay(self, delay: float):
+        self.server.delay = delay
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fake Groq / Alpha Vantage / OpenWeather upstreams.")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--delay", type=float, default=0.0, help="Latency per response (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Pause between streamed chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    with StubUpstream(delay=args.delay, token_delay=args.token_delay, jitter=args.jitter,
+                      error_rate=args.error_rate, error_status=args.error_status, port=args.port) as stub:
+        print(f"GROQ_BASE_URL={stub.groq_url}")
+        print(f"ALPHA_VANTAGE_BASE_URL={stub.alpha_vantage_url}")
+        print(f"WEATHER_API_BASE_URL={stub.weather_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+DIGITALLY — ASGI Configuration
+Serves the async chat/roast views, e.g.
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+os.environ.setdefault("AI_ASYNC_VIEWS", "True")
+application = get_asgi_application()
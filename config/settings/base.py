@@ -3,6 +3,7 @@ DIGITALLY — Base Django Settings
 Shared across all environments.
 """
 import os
+import tempfile
 from pathlib import Path
 import environ
 
@@ -64,6 +65,7 @@ TEMPLATES = [
                 "django.contrib.messages.context_processors.messages",
                 "apps.website.context_processors.services_context",
                 "apps.website.context_processors.contact_form_context",
+                "apps.widgets.context_processors.live_stream_context",
             ],
         },
     },
@@ -104,6 +106,183 @@ GROQ_API_KEY = env("GROQ_API_KEY", default="")
 WEATHER_API_KEY = env("WEATHER_API_KEY", default="")
 ALPHA_VANTAGE_API_KEY = env("ALPHA_VANTAGE_API_KEY", default="DEY9N80JGIKMYWZB")
 
+# Upstream endpoints (overridable so benchmarks can point at local stubs)
+ALPHA_VANTAGE_BASE_URL = env("ALPHA_VANTAGE_BASE_URL", default="https://www.alphavantage.co/query")
+WEATHER_API_BASE_URL = env("WEATHER_API_BASE_URL", default="https://api.openweathermap.org/data/2.5/weather")
+GROQ_BASE_URL = env("GROQ_BASE_URL", default="https://api.groq.com")
+
+# Sales Director response cache — repeated questions in short conversations
+# reuse a stored answer instead of a full LLM call (see ai_agents/utils/response_cache.py).
+CHAT_CACHE_SIZE = env.int("CHAT_CACHE_SIZE", default=512)  # entries per worker
+CHAT_CACHE_TTL = env.int("CHAT_CACHE_TTL", default=6 * 60 * 60)  # seconds
+CHAT_CACHE_MAX_TURNS = env.int("CHAT_CACHE_MAX_TURNS", default=1)  # earlier exchanges allowed
+CHAT_CACHE_MAX_CHARS = env.int("CHAT_CACHE_MAX_CHARS", default=200)  # longer messages are never cached
+
+# Roast scraper limits: the page body is streamed and reading stops at whichever
+# comes first — enough content extracted, SCRAPER_MAX_BYTES, or SCRAPER_MAX_SECONDS.
+# SCRAPER_PARSER picks the extraction backend: "stream" (stdlib, incremental),
+# "lxml" (needs `pip install lxml`) or "bs4" (see ai_agents/utils/html_extract.py).
+SCRAPER_MAX_BYTES = env.int("SCRAPER_MAX_BYTES", default=1024 * 1024)
+SCRAPER_MAX_SECONDS = env.float("SCRAPER_MAX_SECONDS", default=10.0)
+SCRAPER_PARSER = env("SCRAPER_PARSER", default="stream")
+
+# Scraper transport (ai_agents/utils/pinned_transport.py): validated DNS answers
+# are cached per host and connections dial exactly those addresses.
+SCRAPER_DNS_TTL = env.int("SCRAPER_DNS_TTL", default=300)  # seconds
+SCRAPER_POOL_SIZE = env.int("SCRAPER_POOL_SIZE", default=10)  # keep-alive connections per host
+SCRAPER_MAX_REDIRECTS = env.int("SCRAPER_MAX_REDIRECTS", default=5)
+# Lets the scraper reach private/loopback addresses — only for load tests
+# against benchmarks/site_farm.py. production.py always turns it off.
+SCRAPER_ALLOW_PRIVATE_HOSTS = env.bool("SCRAPER_ALLOW_PRIVATE_HOSTS", default=False)
+# CA file trusted instead of the public roots — only for the site farm's
+# self-signed HTTPS sites. production.py always clears it.
+SCRAPER_CA_BUNDLE = env("SCRAPER_CA_BUNDLE", default="")
+
+# On-disk HTTP cache for scraped pages (ai_agents/utils/http_cache.py): fresh
+# entries skip the fetch, stale ones are revalidated with a conditional GET.
+# Set SCRAPER_CACHE_DIR to an empty string to turn it off.
+SCRAPER_CACHE_DIR = env("SCRAPER_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "digitally-scraper-cache"))
+SCRAPER_CACHE_MAX_BYTES = env.int("SCRAPER_CACHE_MAX_BYTES", default=50 * 1024 * 1024)
+
+# Roast cache per canonical URL (see ai_agents/utils/roast_cache.py): inside the
+# fresh window a stored critique is served without re-scraping; up to the TTL it
+# is reused only if the re-scraped page fingerprint still matches.
+ROAST_CACHE_FRESH = env.int("ROAST_CACHE_FRESH", default=15 * 60)  # seconds
+ROAST_CACHE_TTL = env.int("ROAST_CACHE_TTL", default=24 * 60 * 60)  # seconds
+
+# Per-client rate limits, (requests, period seconds) over a sliding window —
+# see apps/ai_agents/utils/rate_limit.py. Storage: "cache" (the default cache;
+# shared once REDIS_URL is set), "redis" (RATE_LIMIT_REDIS_URL) or "db".
+RATE_LIMITS = {
+    "chat": (20, 60 * 60),
+    "roast": (3, 60 * 60),
+    "widgets": (30, 60),  # The Command Center polls every 120s; this leaves room for many tabs behind one NAT
+}
+RATE_LIMIT_STORAGE = env("RATE_LIMIT_STORAGE", default="cache")
+RATE_LIMIT_REDIS_URL = env("RATE_LIMIT_REDIS_URL", default=env("REDIS_URL", default=""))
+
+# Groq models, in order of preference (see apps/ai_agents/utils/llm_client.py).
+# A model whose recent p95 misses LLM_LATENCY_SLO for the purpose is tried
+# after the others; every call gives up after LLM_DEADLINE seconds.
+LLM_MODELS = env.list("LLM_MODELS", default=["llama-3.3-70b-versatile", "llama-3.1-8b-instant"])
+LLM_LATENCY_SLO = {"chat": 4.0, "roast": 15.0}  # seconds, full completion
+LLM_DEADLINE = {"chat": 20.0, "roast": 45.0}  # seconds, all attempts included
+LLM_MAX_ATTEMPTS = env.int("LLM_MAX_ATTEMPTS", default=3)
+LLM_RETRY_BACKOFF = 0.5  # seconds; attempt n sleeps up to BACKOFF * 2^(n-1), jittered
+LLM_PROBE_EVERY = 20  # Every Nth call keeps LLM_MODELS order so a demoted model is re-measured
+
+# Prompt budgets, in (locally estimated) tokens: a stored conversation keeps
+# its newest turns up to CHAT_HISTORY_TOKENS; the scraped page sent for a
+# roast is trimmed to ROAST_INPUT_TOKENS.
+CHAT_HISTORY_TOKENS = env.int("CHAT_HISTORY_TOKENS", default=600)
+ROAST_INPUT_TOKENS = env.int("ROAST_INPUT_TOKENS", default=700)
+
+# Chat conversations are stored server-side in the default cache (see
+# apps/ai_agents/utils/chat_sessions.py). Older turns fold into a rolling
+# summary of at most CHAT_SUMMARY_CHARS; idle conversations expire.
+CHAT_SESSION_TTL = env.int("CHAT_SESSION_TTL", default=2 * 60 * 60)  # seconds since the last message
+CHAT_SUMMARY_CHARS = env.int("CHAT_SUMMARY_CHARS", default=600)
+
+# Local intent router (apps/ai_agents/utils/intent_router.py): short stock
+# questions whose intent scores at least CHAT_ROUTER_MIN_CONFIDENCE (TF-IDF
+# cosine, 0–1) get a templated answer from SERVICES instead of a Groq call.
+CHAT_ROUTER_ENABLED = env.bool("CHAT_ROUTER_ENABLED", default=True)
+CHAT_ROUTER_MIN_CONFIDENCE = env.float("CHAT_ROUTER_MIN_CONFIDENCE", default=0.75)
+CHAT_ROUTER_MAX_WORDS = env.int("CHAT_ROUTER_MAX_WORDS", default=12)
+
+# Roast job queue — /ai/roast/ enqueues a RoastRequest and returns a polling
+# fragment; `manage.py roast_worker` runs the scrape + LLM call. Off by default:
+# where no worker process runs (Vercel), queued roasts would never finish, so
+# the request does the work inline. Turn it on only next to a roast_worker.
+ROAST_USE_QUEUE = env.bool("ROAST_USE_QUEUE", default=False)
+ROAST_JOB_MAX_ATTEMPTS = env.int("ROAST_JOB_MAX_ATTEMPTS", default=3)
+# Seconds a claimed job stays locked. 0 derives it from the worst case: the
+# scraper's fetch timeout + SCRAPER_MAX_SECONDS + LLM_DEADLINE["roast"] + a margin.
+ROAST_JOB_VISIBILITY = env.int("ROAST_JOB_VISIBILITY", default=0)
+ROAST_JOB_RETRY_DELAY = env.int("ROAST_JOB_RETRY_DELAY", default=5)  # seconds, doubled per attempt
+ROAST_POLL_INTERVAL = env.int("ROAST_POLL_INTERVAL", default=2)  # seconds between htmx polls
+ROAST_JOB_UNCLAIMED_TIMEOUT = env.int("ROAST_JOB_UNCLAIMED_TIMEOUT", default=60)  # seconds before an unclaimed job fails
+
+# Serve /ai/chat/ and /ai/roast/ with the async views (httpx + AsyncGroq).
+# config/asgi.py turns this on; under WSGI the sync views stay in place.
+AI_ASYNC_VIEWS = env.bool("AI_ASYNC_VIEWS", default=False)
+
+# Command Center fan-out — all upstream fetches for one /widgets/live/ hit
+# run on a shared bounded pool and must finish within one overall deadline.
+WIDGETS_FETCH_WORKERS = env.int("WIDGETS_FETCH_WORKERS", default=8)
+WIDGETS_FETCH_DEADLINE = env.float("WIDGETS_FETCH_DEADLINE", default=3.5)  # seconds
+
+# Market data — provider and the instruments shown in the ticker and market grid.
+# AV free tier is mostly standard US stocks; ETFs stand in for indices.
+MARKET_DATA_PROVIDER = env(
+    "MARKET_DATA_PROVIDER", default="apps.widgets.utils.providers.AlphaVantageProvider"
+)  # or apps.widgets.utils.providers.StubMarketProvider for offline runs
+ALPHA_VANTAGE_BULK_QUOTES = env.bool("ALPHA_VANTAGE_BULK_QUOTES", default=False)  # REALTIME_BULK_QUOTES is premium-only
+MARKET_STUB_DELAY = env.float("MARKET_STUB_DELAY", default=0.0)  # StubMarketProvider latency (s)
+MARKET_INSTRUMENTS = [
+    {"id": "sp500", "label": "S&P 500", "ticker": "SPY", "sector": "US"},  # SPY ETF as proxy
+    {"id": "nasdaq", "label": "NASDAQ", "ticker": "QQQ", "sector": "US"},  # QQQ ETF as proxy
+    {"id": "btc", "label": "BTC/USD", "ticker": "BTC", "sector": "Crypto"},  # CURRENCY_EXCHANGE_RATE
+    {"id": "gold", "label": "GOLD", "ticker": "GLD", "sector": "Commod"},  # GLD ETF
+]
+
+# Market snapshots (stale-while-revalidate in the Django cache).
+# 4 instruments refreshed every 4h = 24 Alpha Vantage calls/day, inside the 25/day free tier
+# (with ALPHA_VANTAGE_BULK_QUOTES the three ETFs cost one call, so the TTL can drop).
+MARKET_SNAPSHOT_FRESH_TTL = env.int("MARKET_SNAPSHOT_FRESH_TTL", default=4 * 3600)
+MARKET_SNAPSHOT_STALE_TTL = env.int("MARKET_SNAPSHOT_STALE_TTL", default=24 * 3600)
+MARKET_REFRESH_BACKOFF = env.int("MARKET_REFRESH_BACKOFF", default=15 * 60)  # after a failed refresh
+
+# Command Center SSE stream (/widgets/stream/). Off by default: under WSGI each
+# open stream holds a worker thread for up to LIVE_STREAM_MAX_AGE, which starves
+# sync gunicorn workers and can't outlive a serverless (Vercel) function. Turn
+# it on only behind gthread workers, or under ASGI (config/asgi.py), where
+# streams are async generators and hold no thread while idle. While it is off,
+# the page polls /widgets/live/ instead.
+LIVE_STREAM_ENABLED = env.bool("LIVE_STREAM_ENABLED", default=False)
+LIVE_STREAM_INTERVAL = env.float("LIVE_STREAM_INTERVAL", default=15.0)  # seconds between snapshot rebuilds
+LIVE_STREAM_HEARTBEAT = 20.0  # seconds of silence before a `: ping` comment
+LIVE_STREAM_MAX_AGE = 300  # seconds before a stream is closed and the client reconnects
+LIVE_STREAM_RETRY_MS = 5000
+LIVE_STREAM_MAX_PER_WORKER = env.int("LIVE_STREAM_MAX_PER_WORKER", default=32)
+
+# Weather cached per lat/lon grid cell (see apps/widgets/utils/weather_cache.py)
+WEATHER_GRID_DEGREES = env.float("WEATHER_GRID_DEGREES", default=0.1)  # ≈ 11 km cells
+WEATHER_CACHE_TTL = env.int("WEATHER_CACHE_TTL", default=10 * 60)  # OpenWeather refreshes ~every 10 min
+WEATHER_COALESCE_WAIT = 2.0  # seconds another worker waits for an in-flight fetch of the same cell
+
+# Circuit breakers for outbound calls (see apps/ai_agents/utils/circuit_breaker.py).
+# Timeouts adapt to 2× observed p95 latency within [min_timeout, max_timeout].
+CIRCUIT_BREAKER_DEFAULTS = {
+    "failure_rate": 0.5,  # Trip when half the calls in the window fail...
+    "min_calls": 5,       # ...once at least this many calls were made
+    "window": 60,         # seconds
+    "open_for": 30,       # seconds before a half-open probe is allowed
+    "timeout": 3.0, "min_timeout": 0.5, "max_timeout": 5.0,
+}
+CIRCUIT_BREAKERS = {
+    "alpha_vantage": {"timeout": 3.0},
+    "openweather": {"timeout": 3.0},
+    "groq": {"timeout": 20.0, "min_timeout": 5.0, "max_timeout": 30.0},
+    "scraper": {"timeout": 8.0, "min_timeout": 2.0, "max_timeout": 8.0, "min_calls": 3},  # one breaker per host
+}
+
+# Offline GeoIP table for visitors without browser geolocation (manage.py build_geoip_table)
+GEOIP_TABLE_PATH = env("GEOIP_TABLE_PATH", default=str(BASE_DIR / "data" / "geoip.bin"))
+
+# Tick history (see apps/widgets/utils/tick_history.py) — 16 bytes per tick per instrument
+TICK_HISTORY_CAPACITY = env.int("TICK_HISTORY_CAPACITY", default=2048)
+TICK_PERSIST_INTERVAL = env.int("TICK_PERSIST_INTERVAL", default=60)  # seconds between cache writes
+
+# Upstream quota budgets shared by every worker (see apps/ai_agents/utils/quota.py).
+# Counters live in the default cache — point REDIS_URL at a shared Redis in production.
+UPSTREAM_QUOTAS = {
+    "alpha_vantage": {"per_minute": 5, "per_day": 25},       # Free tier
+    "openweather": {"per_minute": 60, "per_day": 30000},     # Free tier: 60/min, 1M/month
+    "groq": {"per_minute": 30, "per_day": 1000},             # llama-3.3-70b free tier
+}
+UPSTREAM_QUOTA_DEGRADE_AT = 0.9  # Stop optional refreshes at 90% of any window
+
 # django-axes config
 AXES_FAILURE_LIMIT = 10
 AXES_COOLOFF_TIME = 1  # 1 hour lockout
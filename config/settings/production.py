@@ -34,16 +34,30 @@ else:
     }
 
 
-# Cache — Redis for production
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "digitally-prod-cache",
-        # Switch to Redis when available:
-        # "BACKEND": "django_redis.cache.RedisCache",
-        # "LOCATION": env("REDIS_URL", default="redis://127.0.0.1:6379/1"),
+# Cache — Redis for production (quota budgets and market snapshots must be shared across workers)
+REDIS_URL = env("REDIS_URL", default=None)
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
     }
-}
+else:
+    # Per-process fallback — counters are only shared within one worker
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "digitally-prod-cache",
+        }
+    }
+
+# Rate limits must be shared across workers: the cache when it's Redis, else the database
+RATE_LIMIT_STORAGE = env("RATE_LIMIT_STORAGE", default="cache" if REDIS_URL else "db")
+
+SCRAPER_ALLOW_PRIVATE_HOSTS = False  # The SSRF guard stays on, whatever the environment says
+SCRAPER_CA_BUNDLE = ""  # Public roots only
 
 # Static files - Whitenoise
 if "whitenoise.middleware.WhiteNoiseMiddleware" not in MIDDLEWARE:
@@ -1,11 +1,12 @@
 /**
  * DIGITALLY — AI Sales Director
- * Stateful chat with CSRF-protected backend calls.
+ * CSRF-protected backend calls; replies stream in token by token. The conversation
+ * itself is stored server-side — we only keep its id and send the new message.
  */
 (function () {
     'use strict';
 
-    let history = [];
+    let conversationId = null;
     let isOpen = false;
 
     window.toggleChat = function () {
@@ -31,8 +32,6 @@
         // Typing indicator
         const typingId = appendTyping(messages);
 
-        history.push({ role: 'user', content: text });
-
         try {
             const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value
                 || getCookie('csrftoken');
@@ -42,18 +41,42 @@
                     'Content-Type': 'application/json',
                     'X-CSRFToken': csrfToken,
                 },
-                body: JSON.stringify({ message: text, history: history.slice(-10) }),
+                body: JSON.stringify({ message: text, conversation_id: conversationId, stream: true }),
             });
 
-            const data = await res.json();
-            removeTyping(typingId);
-
-            if (res.ok) {
-                history.push({ role: 'assistant', content: data.reply });
-                appendBubble(messages, 'agent', data.reply);
-            } else {
-                appendBubble(messages, 'agent', data.error || 'Something went wrong. Try again.');
+            // Errors (rate limit, busy) still come back as plain JSON
+            if (!(res.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                const data = await res.json();
+                removeTyping(typingId);
+                if (res.ok) {
+                    conversationId = data.conversation_id || conversationId;
+                    appendBubble(messages, 'agent', data.reply);
+                } else {
+                    appendBubble(messages, 'agent', data.error || 'Something went wrong. Try again.');
+                }
+                return;
             }
+
+            let reply = '';
+            let bubble = null;
+            await readEvents(res, (event, data) => {
+                if (event === 'token') {
+                    if (!bubble) {
+                        removeTyping(typingId);
+                        bubble = appendBubble(messages, 'agent', '');
+                    }
+                    reply += data.t;
+                    bubble.textContent = reply;
+                    messages.scrollTop = messages.scrollHeight;
+                } else if (event === 'error') {
+                    removeTyping(typingId);
+                    appendBubble(messages, 'agent', data.error);
+                } else if (event === 'done') {
+                    removeTyping(typingId);
+                    conversationId = data.conversation_id || conversationId;
+                }
+            });
+            removeTyping(typingId);
         } catch {
             removeTyping(typingId);
             appendBubble(messages, 'agent', 'Connection error. Please refresh and try again.');
@@ -75,6 +98,31 @@
             : `<div class="bg-[#FF6B00]/10 border border-[#FF6B00]/20 rounded-2xl rounded-tr-sm px-4 py-3 text-sm text-white max-w-[80%] leading-relaxed">${escapeHtml(text)}</div>`;
         container.appendChild(wrapper);
         container.scrollTop = container.scrollHeight;
+        return wrapper.lastElementChild;
+    }
+
+    // Minimal SSE reader over a fetch body — EventSource can't POST.
+    async function readEvents(res, onEvent) {
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let split;
+            while ((split = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, split);
+                buffer = buffer.slice(split + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
     }
 
     function appendTyping(container) {
@@ -6,11 +6,14 @@
 const CommandCenter = {
     isExpanded: false,
     currentTab: 'markets',
+    panelVersions: '',
+    streaming: false,  // While the SSE stream is open, the 120s /widgets/live/ poll is skipped
 
     init() {
         console.log("Command Center initialized.");
         this.bindEvents();
         this.startTime();
+        if (document.getElementById('command-bar')?.dataset.liveStream === 'on') this.startStream();
     },
 
     bindEvents() {
@@ -33,6 +36,21 @@ const CommandCenter = {
                 this.switchTab(target);
             }
         });
+
+        // /widgets/live/ only returns panels whose version differs from what we already render
+        document.body.addEventListener('htmx:configRequest', (e) => {
+            if (e.detail.path !== '/widgets/live/') return;
+            if (this.panelVersions) e.detail.headers['X-Panel-Versions'] = this.panelVersions;
+            if (window._geo && window._geo.lat !== undefined) {
+                e.detail.parameters.lat = window._geo.lat;
+                e.detail.parameters.lon = window._geo.lon;
+            }
+        });
+        document.body.addEventListener('htmx:afterRequest', (e) => {
+            if (e.detail.pathInfo?.requestPath !== '/widgets/live/' || !e.detail.successful) return;
+            const versions = e.detail.xhr.getResponseHeader('X-Panel-Versions');
+            if (versions) this.panelVersions = versions;
+        });
     },
 
     togglePanel(force) {
@@ -63,6 +81,35 @@ const CommandCenter = {
         });
     },
 
+    /**
+     * Live panel updates over Server-Sent Events (/widgets/stream/).
+     * Each "panels" event carries hx-swap-oob fragments; we apply them by id.
+     * EventSource resends Last-Event-ID on reconnect, so unchanged payloads are skipped server-side.
+     */
+    startStream() {
+        if (!window.EventSource) return;
+
+        const source = new EventSource('/widgets/stream/');
+        source.addEventListener('panels', (e) => this.applyOob(e.data));
+        source.onopen = () => { this.streaming = true; };
+        source.onerror = () => {
+            this.streaming = false;  // Polling covers the gap until EventSource reconnects
+            // CLOSED means the server refused (e.g. 503 stream cap) — back off before trying again
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(() => this.startStream(), 30000);
+            }
+        };
+    },
+
+    applyOob(html) {
+        const tpl = document.createElement('template');
+        tpl.innerHTML = html;
+        tpl.content.querySelectorAll('[hx-swap-oob]').forEach(fragment => {
+            const target = document.getElementById(fragment.id);
+            if (target) target.innerHTML = fragment.innerHTML;
+        });
+    },
+
     startTime() {
         const istEl = document.getElementById('clk-ist');
         const utcEl = document.getElementById('clk-utc');